@@ -14,11 +14,19 @@
 # OR (2) TO PROVIDE TECHNICAL SUPPORT TO USERS.
 
 import os
+import copy
+import time
+import tempfile
 import datetime
+import multiprocessing
 import numpy as np
 from pytz import timezone
-from .util.ek60_raw_file import RawSimradFile, SimradEOF
+from .util.ek60_raw_file import RawSimradFile, RawSimradMmapFile, SimradEOF
 from .util.nmea_data import nmea_data
+from .util.date_conversion import nt_to_datetime64
+from .util import datagram_index
+from .util import data_cache
+from .util import power_conversion
 from ..ping_data import PingData
 from ..processing.processed_data import ProcessedData
 from ..processing import line
@@ -33,10 +41,10 @@ class EK60(object):
     channel, or create ProcessedData objects containing.
 
     Attributes:
-        start_time: Start_time is a datetime object that defines the start
-            time of the data within the EK60 class
-        end_time: End_time is a datetime object that defines the end time of
-            the data within the EK60 class
+        start_time: Start_time is a numpy datetime64[ms] object that defines
+            the start time of the data within the EK60 class
+        end_time: End_time is a numpy datetime64[ms] object that defines the
+            end time of the data within the EK60 class
         start_ping: Start_ping is an integer that defines the first ping of the
             data within the EK60 class.
         end_ping: End_ping is an integer that defines the last ping of
@@ -56,6 +64,30 @@ class EK60(object):
             the NMEA data from the data files.
         read_incremental; Boolean value controlling whether files are read
             incrementally or all at once. The default value is False.
+        read_block_pings: Integer specifying the number of pings in each
+            block when reading incrementally.
+        read_block_seconds: Float specifying the time span in seconds of each
+            block when reading incrementally. None to only limit blocks by
+            ping count.
+        read_follow: Boolean value controlling whether the last file read is
+            followed as it is written by the sounder.
+        read_poll_interval: Float specifying the number of seconds to wait
+            between checks for new data when following.
+        read_follow_timeout: Float specifying the number of seconds without
+            new data after which we stop following. None to follow until the
+            generator is closed.
+        read_prescan: Boolean value controlling whether the files are scanned
+            before they are read so the data arrays can be allocated at
+            their final size.
+        read_compact: Boolean value controlling whether the power and angle
+            data are stored as the indexed values found in the raw files
+            (see RawData).
+        read_ragged: Boolean value controlling whether the samples of each
+            ping are stored end to end without padding pings to the length
+            of the longest ping (see RawData).
+        read_storage_path: String containing the path to a directory where
+            the power and angle data are stored in disk backed arrays.  None
+            to store the data in memory (see RawData).
         read_angles: Boolean control variable to set whether or not to store
             angle data.
         read_power: Boolean control variable to set whether or not to store
@@ -82,9 +114,32 @@ class EK60(object):
         read_channel_ids = List of strings specifying the channel_ids
             (i,e, 'GPT  38 kHz 009072033fa2 1-1 ES38B') of the channels to
             read. An empty list will result in all channels being read.
+        read_backend: String specifying how .raw files are accessed. 'buffered'
+            reads files through a buffered reader. 'mmap' memory maps the
+            files and parses datagrams without copying them.
+        read_use_index: Boolean value controlling whether a datagram index is
+            used to seek directly to the datagrams within the time and ping
+            bounds being read.
+        read_index_dir: Directory to store datagram index files in. If None,
+            index files are stored next to the .raw files.
+        read_bulk: Boolean value controlling whether RAW datagrams are decoded
+            in bulk. When True, the sample datagrams of each file are decoded
+            with vectorized operations instead of one datagram at a time.
+        read_workers: Integer specifying the number of processes used to read
+            .raw files. When greater than 1, files are read concurrently and
+            merged in time order.
+        read_cache_dir: Directory used to cache the decoded data of .raw
+            files. If None, the decoded data are not cached.
+        read_cache_size: Integer specifying the maximum size of the cache in
+            bytes. The least recently used entries are deleted when the cache
+            exceeds this size. None for no limit.
     """
 
 
+    # The number of RAW datagrams read per block when decoding in bulk.
+    BULK_BLOCK_SIZE = 5000
+
+
     def __init__(self):
         """Initializes EK60 class object.
 
@@ -134,6 +189,41 @@ class EK60(object):
         # Specify if we should read files incrementally or all at once.
         self.read_incremental = False
 
+        # When reading incrementally, read_raw yields blocks of pings.  A
+        # block ends when it contains read_block_pings pings or spans
+        # read_block_seconds seconds.  Either can be set to None to disable
+        # that limit.
+        self.read_block_pings = 1000
+        self.read_block_seconds = None
+
+        # read_follow enables following files as they are written.  The last
+        # file is polled every read_poll_interval seconds for new data and we
+        # move on to newer files as the sounder creates them.  We stop after
+        # read_follow_timeout seconds without new data.
+        self.read_follow = False
+        self.read_poll_interval = 1.0
+        self.read_follow_timeout = None
+
+        # read_prescan controls whether we scan the datagram headers of the
+        # files before reading them.  The scan determines the number of
+        # pings and samples we will read from each channel so the data
+        # arrays can be allocated once, at their final size.
+        self.read_prescan = False
+
+        # read_compact controls whether RawData objects store the indexed
+        # power and angle values instead of converting them to power in dB
+        # and electrical angles when they are read.
+        self.read_compact = False
+
+        # read_ragged controls whether RawData objects store the samples of
+        # each ping in 1d buffers instead of 2d arrays padded to the length
+        # of the longest ping.
+        self.read_ragged = False
+
+        # read_storage_path sets the directory of the files backing the
+        # sample data arrays.  If None, the arrays are held in memory.
+        self.read_storage_path = None
+
         # Define an internal state variable that is set when we initiate
         # incremental reading.
         self._is_reading = False
@@ -177,17 +267,61 @@ class EK60(object):
         # channels being read.
         self.read_channel_ids = []
 
+        # read_backend specifies how files are accessed. 'buffered' uses the
+        # io.BufferedReader based RawSimradFile. 'mmap' memory maps the file
+        # and parses datagrams in place.  If a file cannot be mapped, the
+        # buffered reader is used.
+        self.read_backend = 'buffered'
+
+        # read_use_index controls whether a datagram index is used when
+        # reading.  The index is built by a header only scan of the file the
+        # first time it is read and is stored in a sidecar file in
+        # read_index_dir (or next to the .raw file if read_index_dir is None).
+        # When reading a subset of a file the index allows us to seek
+        # directly to the datagrams we need.
+        self.read_use_index = False
+        self.read_index_dir = None
+
+        # read_bulk controls whether sample datagrams are decoded in bulk.
+        # Bulk decoding locates the RAW datagrams of a file using a datagram
+        # index, reads them as a block and copies the sample data into the
+        # RawData arrays using vectorized operations (see
+        # RawData.append_pings).
+        self.read_bulk = False
+
+        # read_workers sets the number of processes used to read .raw files.
+        # When greater than 1, each .raw file is read into its own EK60
+        # object in a process pool and the results are merged in time order.
+        self.read_workers = 1
+
+        # read_cache_dir sets the directory where the decoded data of each
+        # .raw file are cached.  Cached files are loaded instead of parsed
+        # when they are read again with the same options.  read_cache_size
+        # limits the size of the cache in bytes.
+        self.read_cache_dir = None
+        self.read_cache_size = None
+
         # This is the internal per file channel map, which maps the channels
         # in the file to the channels being read.  This map is only valid for
         # the file currently being read.  This property should not be altered
         # or used.
         self._channel_map = {}
 
-        # This maps channel id's to channel number and is used to map bottom
-        # detections to specific channels.  This list differs from the other
-        # lists of ids as it contains all ids in the file, not just the ones
-        # we're storing.
-        self._file_channel_map = []
+        # This maps channel id's to the index of the channel in the file and
+        # is used to map bottom detections to specific channels.  This
+        # dictionary differs from the other lists of ids as it contains all
+        # ids in the file, not just the ones we're storing.
+        self._file_channel_map = {}
+
+        # This collects the bottom detections read from .bot and .out files,
+        # keyed by channel ID.  The detections are added to the RawData
+        # objects at the end of read_raw (see _add_bottom_detections).
+        self._bottom_detections = {}
+
+        # This stores the results of the pre-scan for the channels whose
+        # arrays have not been allocated yet.  It is only valid during a call
+        # to read_raw.
+        self._prescan_channels = {}
 
 
     def read_bot(self, bot_files):
@@ -220,7 +354,12 @@ class EK60(object):
                  max_sample_count=None, start_time=None, end_time=None,
                  start_ping=None, end_ping=None, frequencies=None,
                  channel_ids=None, time_format_string='%Y-%m-%d %H:%M:%S',
-                 incremental=None, start_sample=None, end_sample=None):
+                 incremental=None, start_sample=None, end_sample=None,
+                 backend=None, index=None, index_dir=None, bulk=None,
+                 workers=None, block_pings=None, block_seconds=None,
+                 follow=None, poll_interval=None, follow_timeout=None,
+                 prescan=None, compact=None, ragged=None, storage_path=None,
+                 cache_dir=None, cache_size=None):
         """Reads one or more Simrad EK60 ES60/70 .raw files.
 
         This method also reads .out and .bot files, but you must read the
@@ -255,12 +394,80 @@ class EK60(object):
                 start and end time arguments. Format is used to create datetime
                 objects start and end time strings
             incremental (bool): A value of True indicates object will read
-                files incrementally. Otherwise, files are read in their
-                entirety.
+                files incrementally. read_raw then returns a generator that
+                reads the files one block of pings at a time. Otherwise,
+                files are read in their entirety.
             start_sample (int): Specify starting sample number if not
                 reading from first sample.
             end_sample (int): Specify ending sample number if not
                 reading to last sample.
+            backend (str): Set to 'mmap' to memory map the files and parse
+                the datagrams without copying them or 'buffered' to use
+                buffered file reads. Files that cannot be mapped are read
+                using the buffered reader.
+            index (bool): Set to True to use a datagram index when reading.
+                The index is created on the first read of a file and stored
+                in a sidecar file. Subsequent reads of the file will seek
+                directly to the datagrams within the time and ping bounds.
+            index_dir (str): The directory to store datagram index sidecar
+                files in. If not set, the index files are stored next to the
+                .raw files.
+            bulk (bool): Set to True to decode the sample datagrams of each
+                file in bulk using vectorized operations.
+            workers (int): The number of processes used to read the .raw
+                files. When greater than 1, the .raw files are read
+                concurrently and the results are merged in time order. .bot
+                and .out files are read after the .raw files. Files are read
+                sequentially when reading a range of ping numbers since ping
+                numbers span files.
+            block_pings (int): The number of pings in each block when reading
+                incrementally.
+            block_seconds (float): The time span of each block, in seconds,
+                when reading incrementally. If both block_pings and
+                block_seconds are set, a block ends when either limit is
+                reached.
+            follow (bool): Set to True to follow files that are still being
+                written. This implies incremental reading. After the last
+                file has been read, it is polled for new pings and reading
+                continues with newer .raw files in the same directory as the
+                sounder creates them. If raw_files is a directory, the newest
+                .raw file in the directory is followed.
+            poll_interval (float): The time, in seconds, to wait between
+                checks for new data when following.
+            follow_timeout (float): Stop following when no new data have been
+                written for this many seconds. If not set, files are followed
+                until the generator is closed.
+            prescan (bool): Set to True to scan the datagram headers of the
+                files before reading them. The number of pings and samples
+                that will be read from each channel are determined by the
+                scan and the data arrays are allocated once instead of
+                being grown as pings are read. See scan_raw.
+            compact (bool): Set to True to store power and angle data as
+                the indexed values from the raw file, using a third of the
+                memory. The values are converted when they are retrieved.
+            ragged (bool): Set to True to store the samples of each ping
+                without padding them to the length of the longest ping.
+                This saves memory when the number of samples varies from
+                ping to ping.
+            storage_path (str): Set to the path of a directory to store the
+                power and angle data in memory mapped files in that
+                directory instead of in memory.  This allows reading more
+                data than fit in memory.
+            cache_dir (str): Set to the path of a directory to cache the
+                decoded data of each .raw file in.  Files that are in the
+                cache and have not changed are loaded from the cache instead
+                of being parsed.  The cache is not used when reading a range
+                of ping numbers since ping numbers span files.
+            cache_size (int): The maximum size of the cache in bytes.  The
+                least recently used entries are deleted when the cache is
+                larger than this.
+
+        Returns:
+            When reading incrementally, a generator that yields the raw_data
+            dictionary after each block of pings is read. Otherwise None.
+
+        Raises:
+            ValueError: The backend is not 'buffered' or 'mmap'.
         """
 
         # Update the reading state variables.
@@ -290,122 +497,1000 @@ class EK60(object):
             self.read_channel_ids = channel_ids
         if incremental:
             self.read_incremental = incremental
-
-        #TODO:  Implement incremental reading.
-        #       This is going to take some re-org since we can't simply
-        #       iterate thru the list of files. We need to be able to read a
-        #       subset of data from a file and if required open the next
-        #       file in the list and continue reading the subset.
+        if backend:
+            if backend not in ['buffered', 'mmap']:
+                raise ValueError("Unknown backend '" + str(backend) +
+                                 "'. The backend must be 'buffered' or "
+                                 "'mmap'.")
+            self.read_backend = backend
+        if index is not None:
+            self.read_use_index = bool(index)
+        if index_dir:
+            self.read_index_dir = index_dir
+        if bulk is not None:
+            self.read_bulk = bool(bulk)
+        if workers:
+            self.read_workers = int(workers)
+
+        if block_pings:
+            self.read_block_pings = int(block_pings)
+        if block_seconds:
+            self.read_block_seconds = block_seconds
+        if follow is not None:
+            self.read_follow = bool(follow)
+        if poll_interval:
+            self.read_poll_interval = poll_interval
+        if follow_timeout:
+            self.read_follow_timeout = follow_timeout
+        if prescan is not None:
+            self.read_prescan = bool(prescan)
+        if compact is not None:
+            self.read_compact = bool(compact)
+        if ragged is not None:
+            self.read_ragged = bool(ragged)
+        if storage_path:
+            self.read_storage_path = storage_path
+        if cache_dir:
+            self.read_cache_dir = cache_dir
+        if cache_size:
+            self.read_cache_size = int(cache_size)
+
+        # When following a directory, start with the newest .raw file.
+        if (self.read_follow and isinstance(raw_files, str) and
+                os.path.isdir(raw_files)):
+            raw_files = sorted(os.path.join(raw_files, f) for f in
+                               os.listdir(raw_files) if
+                               f.lower().endswith('.raw'))[-1:]
 
         # Ensure that the raw_files argument is a list.
         if isinstance(raw_files, str):
             raw_files = [raw_files]
 
+        # When reading incrementally, return a generator that reads the
+        # files one block at a time.
+        if self.read_incremental or self.read_follow:
+            return self._read_raw_incremental(raw_files)
+
         # Initialize a file counter.
         n_files = 0
 
+        # Read the .raw files in parallel if requested.  Ping numbers span
+        # files so we can only do this when we're not reading a range of
+        # pings.
+        file_indexes = {}
+        if (self.read_cache_dir and self.read_start_ping is None and
+                self.read_end_ping is None):
+            n_files, raw_files = self._read_raw_cached(raw_files)
+        elif (self.read_workers > 1 and self.read_start_ping is None and
+                self.read_end_ping is None):
+            n_files, raw_files = self._read_raw_parallel(raw_files)
+
+        # Otherwise scan the files if requested so we can allocate the data
+        # arrays at their final size.  We keep the datagram indexes created
+        # by the scan to use when reading.
+        elif self.read_prescan:
+            self._prescan_channels, file_indexes = self._scan_raw(raw_files)
+
         # Iterate through the list of .raw files to read.
         for filename in raw_files:
 
             # Read data from the file and add to self.raw_data.  Then read the
             # configuration datagrams.  The CON0 datagram will come first.  If
             # this is an ME70 .raw file, the CON1 datagram will follow.
-            with RawSimradFile(filename, 'r') as fid:
-
-                # Read the CON0 configuration datagram.
-                config_datagram = fid.read(1)
-                config_datagram['timestamp'] = \
-                        np.datetime64(config_datagram['timestamp'], '[ms]')
-                if n_files == 0:
-                    self.start_time = config_datagram['timestamp']
-
-                # Create a mapping of channel numbers to channel IDs for all
-                # transceivers in the file.
-                self._file_channel_map = [None] * \
-                    config_datagram['transceiver_count']
-                for idx in config_datagram['transceivers'].keys():
-                    self._file_channel_map[idx-1] = \
-                        config_datagram['transceivers'][idx]['channel_id']
-
-                # Check if reading an ME70 file with a CON1 datagram.
-                next_datagram = fid.peek()
-                if next_datagram == 'CON1':
-                    CON1_datagram = fid.read(1)
+            with self._open_raw_file(filename) as fid:
+
+                # Read the configuration datagrams and set up the channels.
+                self._read_config(fid, filename, n_files)
+
+                # Get the datagram index if we're using one.  Bulk reading
+                # requires an index so we build one in memory if we're not
+                # using sidecar files.
+                if filename in file_indexes and (self.read_use_index or
+                                                 self.read_bulk):
+                    file_index = file_indexes[filename]
+                elif self.read_use_index:
+                    file_index = datagram_index.get_index(fid, filename,
+                            index_dir=self.read_index_dir)
+                elif self.read_bulk:
+                    file_index = fid.build_index()
                 else:
-                    CON1_datagram = None
-
-                # Check if a RawData object for this channel needs to be
-                # created.
-                self._channel_map = {}
-                for channel in config_datagram['transceivers']:
-                    # Get the channel ID.
-                    channel_id = config_datagram['transceivers'][channel][
-                        'channel_id']
-
-                    # Check if we are reading this channel.
-                    if (self.read_channel_ids and channel_id not in
-                            self.read_channel_ids):
-                        # There are specific channel IDs specified and this
-                        # is *NOT* one of them, so continue.
-                        continue
-
-                    # Check if we are reading this frequency.
-                    frequency = config_datagram['transceivers'][channel][
-                        'frequency']
-                    if self.read_frequencies and frequency not in \
-                            self.read_frequencies:
-                        # There are specific frequencies specified and this
-                        # is *NOT* one of them, so continue.
-                        continue
-
-                    # Check if a RawData object exists for this channel.  If
-                    # not, create it, add it to the list of channel_ids,
-                    # and update the public channel id map.
-                    if channel_id not in self.raw_data:
-                        self.raw_data[channel_id] = RawData(channel_id,
-                                store_power=self.read_power,
-                                store_angles=self.read_angles,
-                                max_sample_number=self.read_max_sample_count)
-
-                        self.channel_ids.append(channel_id)
-
-                        self.n_channels += 1
-                        self.channel_id_map[self.n_channels] = channel_id
-
-                    # Update the internal mapping of channel number to
-                    # channel ID used when reading the datagrams.  This
-                    # mapping is only valid for the current file that is
-                    # being read.
-                    self._channel_map[channel] = channel_id
-
-                    # Create a channel_metadata object to store this channel's
-                    # configuration and rawfile metadata.
-                    metadata = ChannelMetadata(filename,
-                                config_datagram['transceivers'][channel],
-                                config_datagram['survey_name'],
-                                config_datagram['transect_name'],
-                                config_datagram['sounder_name'],
-                                config_datagram['version'],
-                                self.raw_data[channel_id].n_pings,
-                                config_datagram['timestamp'],
-                                extended_configuration=CON1_datagram)
-
-                    # Update the channel_metadata property of the RawData
-                    # object.
-                    self.raw_data[channel_id].current_metadata = metadata
+                    file_index = None
 
                 # Read the rest of the datagrams.
-                self._read_datagrams(fid, self.read_incremental)
+                self._read_datagrams(fid, index=file_index)
 
                 n_files += 1
 
+        # Discard the scan results of channels that weren't read.
+        self._prescan_channels = {}
+
         # Trim excess data from arrays after reading.
         for channel_id in self.channel_ids:
             self.raw_data[channel_id].trim()
         self.nmea_data.trim()
 
+        # Add the bottom detections from any .bot or .out files.
+        self._add_bottom_detections()
+
+
+    def scan_raw(self, raw_files):
+        """Scans .raw files and returns the size of the data they contain.
+
+        Only the datagram headers are read.  The current read options (the
+        read_* attributes or the options last passed to read_raw) are applied
+        so the results describe the data that read_raw would store.  This can
+        be used to estimate the memory required to read a set of files before
+        reading them.
+
+        Args:
+            raw_files (list): List containing full paths to the .raw files to
+                be scanned.
+
+        Returns:
+            A dictionary keyed by channel ID.  Each value is a dictionary
+            containing n_pings (the number of pings that would be read),
+            n_samples (the number of samples of the data arrays), n_values
+            (the total number of samples of the pings) and nbytes (the
+            estimated size of the channel's data arrays in bytes).
+        """
+
+        if isinstance(raw_files, str):
+            raw_files = [raw_files]
+
+        return self._scan_raw(raw_files)[0]
+
+
+    def _scan_raw(self, raw_files):
+        """Scans the datagram headers of .raw files.
+
+        Args:
+            raw_files (list): List containing full paths to the files.
+
+        Returns:
+            A tuple (channels, file_indexes) where channels is the dictionary
+            returned by scan_raw and file_indexes is a dictionary, keyed by
+            filename, of the datagram indexes of the files.
+        """
+
+        channels = {}
+        file_indexes = {}
+        n_pings = self.n_pings
+
+        for filename in raw_files:
+            with self._open_raw_file(filename) as fid:
+
+                # Read the configuration datagram and skip the ME70 CON1
+                # datagram if present.
+                config_datagram = fid.read(1)
+                try:
+                    if fid.peek()['type'] == 'CON1':
+                        fid.skip()
+                except SimradEOF:
+                    pass
+
+                # Map the channel numbers we're reading to channel IDs.
+                channel_map = {}
+                for channel in config_datagram['transceivers']:
+                    transceiver = config_datagram['transceivers'][channel]
+                    if self._is_read_channel(transceiver):
+                        channel_map[channel] = transceiver['channel_id']
+
+                # Get the datagram index.
+                if self.read_use_index:
+                    file_index = datagram_index.get_index(fid, filename,
+                            index_dir=self.read_index_dir)
+                else:
+                    file_index = fid.build_index()
+                file_indexes[filename] = file_index
+
+                # Apply the read bounds.
+                index, times, ping_number, keep_raw = \
+                    self._select_indexed_datagrams(file_index[
+                        file_index['offset'] >= fid._tell_bytes()], n_pings,
+                        channel_map)
+                if index.shape[0] > 0:
+                    n_pings = int(ping_number[-1])
+
+                # Count the pings and find the largest ping of each channel.
+                for channel, channel_id in channel_map.items():
+                    this_channel = keep_raw & (index['channel'] == channel)
+                    info = channels.setdefault(channel_id, {'n_pings': 0,
+                            'n_samples': 0, 'n_values': 0})
+                    if np.any(this_channel):
+                        count = index['count'][this_channel].astype('int64')
+                        if self.read_max_sample_count:
+                            count = np.minimum(count,
+                                               self.read_max_sample_count)
+                        info['n_pings'] += int(np.count_nonzero(this_channel))
+                        info['n_samples'] = max(info['n_samples'],
+                                                int(count.max()))
+                        info['n_values'] += int(count.sum())
+
+        # The data arrays are as tall as the largest ping unless the number
+        # of samples is fixed by read_max_sample_count.
+        for info in channels.values():
+            if self.read_max_sample_count and info['n_pings'] > 0:
+                info['n_samples'] = self.read_max_sample_count
+            info['nbytes'] = RawData.array_nbytes(info['n_pings'],
+                    info['n_samples'], store_power=self.read_power,
+                    store_angles=self.read_angles, compact=self.read_compact,
+                    n_values=info['n_values'] if self.read_ragged else None)
+
+        return channels, file_indexes
+
+
+    def _read_raw_incremental(self, raw_files):
+        """Reads .raw files incrementally, one block of pings at a time.
+
+        This generator reads the files in order and yields the raw_data
+        dictionary each time a block of pings has been read.  Blocks span
+        file boundaries.  After the block is yielded, the RawData objects
+        and the NMEA data are replaced with new, empty objects and reading
+        continues where it left off.  The channel and ping state (channel
+        maps, ping numbers and the current channel metadata) is carried
+        from block to block.
+
+        When following (read_follow is True), the last file is not closed
+        at its end.  It is polled every read_poll_interval seconds for new
+        datagrams and the pings read so far are yielded each time we catch up
+        with the sounder, so a block can be smaller than read_block_pings and
+        the channels of the most recent ping may be split between two
+        blocks.  When a newer .raw file appears in the same directory we
+        finish the current file and continue with the new one.  Following
+        ends when no data have been written for read_follow_timeout seconds.
+
+        Datagram indexes, bulk decoding and parallel reading are not used
+        when reading incrementally.
+
+        Args:
+            raw_files (list): List containing full paths to the files to be
+                read.
+
+        Yields:
+            The raw_data dictionary, keyed by channel ID, containing the
+            RawData objects for the current block.
+        """
+
+        # Convert the block time span to a timedelta64 we can compare to
+        # the datagram times.
+        if self.read_block_seconds:
+            block_span = np.timedelta64(
+                    int(self.read_block_seconds * 1000), 'ms')
+        else:
+            block_span = None
+
+        self._is_reading = True
+        block_start_ping = None
+        block_start_time = None
+
+        # When following, we add files to the list as the sounder creates
+        # them.
+        raw_files = list(raw_files)
+        n_files = 0
+
+        try:
+            while n_files < len(raw_files):
+                filename = raw_files[n_files]
+                with self._open_follow_file(filename) as fid:
+
+                    # Read the configuration datagrams and set up the
+                    # channels.  A file we're following may not contain the
+                    # configuration datagram yet.
+                    while not self._follow_config(fid, filename, n_files):
+                        time.sleep(self.read_poll_interval)
+
+                    last_data_time = time.time()
+                    while True:
+                        # Peek at the next datagram to see if it starts a new
+                        # block.  A block ends before the first datagram of a
+                        # ping that would exceed the block size.
+                        try:
+                            header = fid.peek()
+                        except SimradEOF:
+                            # Move on to the next file unless we're following
+                            # the last file in the list.
+                            if (not self.read_follow or
+                                    n_files < len(raw_files) - 1):
+                                break
+
+                            # Hand the pings we have to the caller.
+                            if block_start_ping is not None:
+                                yield self._end_block()
+                                block_start_ping = None
+
+                            # If the sounder has started a new file, check
+                            # this file one more time for datagrams written
+                            # before it was closed, then move on.
+                            next_file = self._next_raw_file(filename)
+                            if next_file is not None:
+                                raw_files.append(next_file)
+                                continue
+
+                            # Stop if no new data has been written within
+                            # the timeout.
+                            if (self.read_follow_timeout is not None and
+                                    time.time() - last_data_time >
+                                    self.read_follow_timeout):
+                                break
+
+                            # Wait for more data.
+                            time.sleep(self.read_poll_interval)
+                            continue
+
+                        last_data_time = time.time()
+
+                        if (header['type'].startswith('RAW') and
+                                header['channel'] == 1 and
+                                header['size'] >= 16 and
+                                (header['low_date'], header['high_date']) !=
+                                (0, 0)):
+                            ping_time = nt_to_datetime64(header['low_date'],
+                                                         header['high_date'])
+                            ping_number = self.n_pings + 1
+                            if self._in_read_bounds(ping_time, ping_number):
+                                if block_start_ping is None:
+                                    block_start_ping = ping_number
+                                    block_start_time = ping_time
+                                elif ((self.read_block_pings and ping_number -
+                                       block_start_ping >=
+                                       self.read_block_pings) or
+                                      (block_span is not None and ping_time -
+                                       block_start_time >= block_span)):
+                                    yield self._end_block()
+                                    block_start_ping = ping_number
+                                    block_start_time = ping_time
+
+                        # Read the datagram.
+                        if not self._read_next_datagram(fid):
+                            break
+
+                n_files += 1
+
+            # Yield the last, partial block.
+            if block_start_ping is not None:
+                yield self._end_block()
+
+        finally:
+            self._is_reading = False
+
+
+    def _open_follow_file(self, filename):
+        """Opens a raw file for incremental reading.
+
+        Files we may follow are opened with the buffered reader since a
+        memory mapping can't grow with the file.
+
+        Args:
+            filename (str): The full path to the file to open.
+
+        Returns:
+            A RawSimradFile (or RawSimradMmapFile) object.
+        """
+
+        if self.read_follow:
+            return RawSimradFile(filename, 'r', follow=True)
+        else:
+            return self._open_raw_file(filename)
+
+
+    def _follow_config(self, fid, filename, n_files):
+        """Reads the configuration datagrams of a file that may be growing.
+
+        Args:
+            fid (file object): Pointer to the newly opened RawSimradFile
+                object.
+            filename (str): The full path to the file.
+            n_files (int): The number of files read so far.
+
+        Returns:
+            False if the configuration datagram has not been written yet,
+            otherwise True.
+        """
+
+        try:
+            self._read_config(fid, filename, n_files)
+        except SimradEOF:
+            if not self.read_follow:
+                raise
+            return False
+
+        return True
+
+
+    @staticmethod
+    def _next_raw_file(filename):
+        """Returns the .raw file that follows filename in its directory.
+
+        The sounder names files using the time they were created so the next
+        file is the first .raw file whose name sorts after filename.
+
+        Args:
+            filename (str): The full path to the current file.
+
+        Returns:
+            The full path to the next file or None if there is no newer file.
+        """
+
+        path, name = os.path.split(os.path.abspath(filename))
+        newer = [f for f in os.listdir(path) if f.lower().endswith('.raw')
+                 and f > name]
+        if newer:
+            return os.path.join(path, min(newer))
+        else:
+            return None
+
+
+    def _in_read_bounds(self, ping_time, ping_number):
+        """Checks if a ping is within the time and ping read bounds.
+
+        Args:
+            ping_time (datetime64): The ping time.
+            ping_number (int): The ping number.
+
+        Returns:
+            True if the ping is within the read bounds.
+        """
+
+        if self.read_start_time is not None and \
+                ping_time < self.read_start_time:
+            return False
+        if self.read_end_time is not None and ping_time > self.read_end_time:
+            return False
+        if self.read_start_ping is not None and \
+                ping_number < self.read_start_ping:
+            return False
+        if self.read_end_ping is not None and ping_number > self.read_end_ping:
+            return False
+
+        return True
+
+
+    def _end_block(self):
+        """Finishes the current incremental read block and starts the next.
+
+        The data arrays of the current block are trimmed.  New, empty RawData
+        and nmea_data objects are created to hold the next block.  The
+        current channel metadata of each channel is copied to the new RawData
+        objects so pings read from the rest of the current file have the
+        correct metadata.
+
+        Returns:
+            The raw_data dictionary for the block that was just read.
+        """
+
+        # Trim the block's arrays.  Channels that don't have any pings in
+        # this block won't have their arrays allocated.
+        block = self.raw_data
+        for channel_id in self.channel_ids:
+            if block[channel_id].n_pings > 0:
+                block[channel_id].trim()
+        self.nmea_data.trim()
+        self._add_bottom_detections()
+
+        # Create the objects for the next block.
+        self.raw_data = {}
+        for channel_id in self.channel_ids:
+            old_data = block[channel_id]
+            new_data = RawData(channel_id, store_power=old_data.store_power,
+                    store_angles=old_data.store_angles,
+                    max_sample_number=old_data.max_sample_number,
+                    compact=old_data.compact, ragged=old_data.ragged,
+                    storage_path=old_data.storage_path)
+
+            # The ping numbers stored in the metadata are relative to the
+            # RawData object so we need a new copy for the new block.
+            if old_data.current_metadata is not None:
+                metadata = copy.copy(old_data.current_metadata)
+                metadata.start_ping = new_data.n_pings
+                metadata.end_ping = 0
+                new_data.current_metadata = metadata
+
+            self.raw_data[channel_id] = new_data
+        self.nmea_data = nmea_data()
+
+        return block
+
 
-    def _read_datagrams(self, fid, incremental):
+    def _read_config(self, fid, filename, n_files):
+        """Reads the configuration datagrams at the start of a file.
+
+        The CON0 datagram will come first.  If this is an ME70 .raw file, the
+        CON1 datagram will follow.  RawData objects are created for new
+        channels and the ChannelMetadata of each channel being read is
+        updated.
+
+        Args:
+            fid (file object): Pointer to the newly opened RawSimradFile
+                object.
+            filename (str): The full path to the file.
+            n_files (int): The number of files read so far.
+        """
+
+        # Read the CON0 configuration datagram.
+        config_datagram = fid.read(1)
+        if n_files == 0:
+            self.start_time = config_datagram['timestamp']
+
+        # Create a mapping of channel numbers to channel IDs for all
+        # transceivers in the file.
+        self._file_channel_map = {}
+        for idx in config_datagram['transceivers'].keys():
+            self._file_channel_map[config_datagram['transceivers'][idx][
+                    'channel_id']] = idx - 1
+
+        # Check if reading an ME70 file with a CON1 datagram.
+        try:
+            next_datagram = fid.peek()
+        except SimradEOF:
+            # The file only contains the configuration datagram.
+            next_datagram = {'type': None}
+        if next_datagram['type'] == 'CON1':
+            CON1_datagram = fid.read(1)
+        else:
+            CON1_datagram = None
+
+        # Check if a RawData object for this channel needs to be
+        # created.
+        self._channel_map = {}
+        for channel in config_datagram['transceivers']:
+            # Get the channel ID.
+            channel_id = config_datagram['transceivers'][channel][
+                'channel_id']
+
+            # Check if we are reading this channel.
+            if not self._is_read_channel(
+                    config_datagram['transceivers'][channel]):
+                continue
+
+            # Check if a RawData object exists for this channel.  If
+            # not, create it, add it to the list of channel_ids,
+            # and update the public channel id map.
+            if channel_id not in self.raw_data:
+                self.raw_data[channel_id] = RawData(channel_id,
+                        store_power=self.read_power,
+                        store_angles=self.read_angles,
+                        max_sample_number=self.read_max_sample_count,
+                        compact=self.read_compact, ragged=self.read_ragged,
+                        storage_path=self.read_storage_path)
+
+                self.channel_ids.append(channel_id)
+
+                self.n_channels += 1
+                self.channel_id_map[self.n_channels] = channel_id
+
+            # Update the internal mapping of channel number to
+            # channel ID used when reading the datagrams.  This
+            # mapping is only valid for the current file that is
+            # being read.
+            self._channel_map[channel] = channel_id
+
+            # Create a channel_metadata object to store this channel's
+            # configuration and rawfile metadata.
+            metadata = ChannelMetadata(filename,
+                        config_datagram['transceivers'][channel],
+                        config_datagram['survey_name'],
+                        config_datagram['transect_name'],
+                        config_datagram['sounder_name'],
+                        config_datagram['version'],
+                        self.raw_data[channel_id].n_pings,
+                        config_datagram['timestamp'],
+                        extended_configuration=CON1_datagram)
+
+            # Update the channel_metadata property of the RawData
+            # object.
+            self.raw_data[channel_id].current_metadata = metadata
+
+            # If we pre-scanned the files, allocate the arrays for all of
+            # the pings we're reading from this channel now.
+            if channel_id in self._prescan_channels:
+                channel_info = self._prescan_channels.pop(channel_id)
+                self.raw_data[channel_id].reserve(channel_info['n_pings'],
+                        channel_info['n_samples'],
+                        n_values=channel_info['n_values'])
+
+
+    def _is_read_channel(self, transceiver):
+        """Checks if a channel is being read.
+
+        Args:
+            transceiver (dict): The configuration of the channel from the
+                CON0 datagram.
+
+        Returns:
+            True if the channel passes the channel ID and frequency filters.
+        """
+
+        # Check if we are reading this channel.
+        if (self.read_channel_ids and transceiver['channel_id'] not in
+                self.read_channel_ids):
+            # There are specific channel IDs specified and this is *NOT* one
+            # of them.
+            return False
+
+        # Check if we are reading this frequency.
+        if (self.read_frequencies and transceiver['frequency'] not in
+                self.read_frequencies):
+            # There are specific frequencies specified and this is *NOT* one
+            # of them.
+            return False
+
+        return True
+
+
+    def _read_options(self):
+        """Returns a dictionary of the properties that control reading.
+
+        This is used to configure the EK60 objects used to read files in
+        worker processes.
+        """
+
+        options = {}
+        for name in ['read_power', 'read_angles', 'read_max_sample_count',
+                     'read_start_time', 'read_end_time', 'read_start_sample',
+                     'read_end_sample', 'read_frequencies', 'read_channel_ids',
+                     'read_backend', 'read_use_index', 'read_index_dir',
+                     'read_bulk', 'read_compact', 'read_ragged']:
+            options[name] = getattr(self, name)
+
+        return options
+
+
+    def _read_raw_parallel(self, raw_files):
+        """Reads .raw files concurrently and merges the results.
+
+        Each .raw file is read into a new EK60 object in a process pool. The
+        results are then merged into this object in time order (by file
+        start time).
+
+        Args:
+            raw_files (list): List containing full paths to data files to be
+                read.
+
+        Returns:
+            The number of files read and a list of the files that were not
+            read (.bot and .out files). These must be read sequentially after
+            the .raw data have been merged.
+        """
+
+        # Split the list into .raw files and bottom files.
+        bottom_files = [f for f in raw_files if
+                        os.path.splitext(f)[1].lower() in ['.bot', '.out']]
+        raw_files = [f for f in raw_files if f not in bottom_files]
+
+        # Nothing to gain if we don't have multiple .raw files.
+        if len(raw_files) < 2:
+            return 0, raw_files + bottom_files
+
+        # Read the files.
+        results = self._read_raw_files(raw_files)
+
+        # Merge the results in time order. sorted is stable so files with
+        # the same start time are merged in the order they were provided.
+        results = sorted(results, key=lambda r: r.start_time)
+        self._merge_readers(results)
+
+        return len(raw_files), bottom_files
+
+
+    def _read_raw_files(self, raw_files):
+        """Reads .raw files into new EK60 objects.
+
+        The files are read in a process pool if read_workers is greater
+        than 1.
+
+        Args:
+            raw_files (list): List containing full paths to the .raw files.
+
+        Returns:
+            A list of EK60 objects containing the data from each file.
+        """
+
+        options = self._read_options()
+        if self.read_workers < 2 or len(raw_files) < 2:
+            return [_read_raw_file((f, options)) for f in raw_files]
+
+        pool = multiprocessing.Pool(min(self.read_workers, len(raw_files)))
+        try:
+            return pool.map(_read_raw_file, [(f, options) for f in raw_files])
+        finally:
+            pool.close()
+            pool.join()
+
+
+    def _read_raw_cached(self, raw_files):
+        """Reads .raw files using the decoded data cache.
+
+        Each .raw file is loaded from the cache in read_cache_dir if it is
+        there.  Otherwise it is read into a new EK60 object which is added
+        to the cache.  The results are then merged into this object in the
+        order the files were provided.
+
+        Args:
+            raw_files (list): List containing full paths to data files to be
+                read.
+
+        Returns:
+            The number of files read and a list of the files that were not
+            read (.bot and .out files). These must be read sequentially after
+            the .raw data have been merged.
+        """
+
+        # Split the list into .raw files and bottom files.
+        bottom_files = [f for f in raw_files if
+                        os.path.splitext(f)[1].lower() in ['.bot', '.out']]
+        raw_files = [f for f in raw_files if f not in bottom_files]
+
+        # The cache is keyed by the options that change the decoded data.
+        options = self._read_options()
+        for name in ['read_backend', 'read_use_index', 'read_index_dir',
+                     'read_bulk']:
+            del options[name]
+
+        # Load the cached files.
+        readers = []
+        for filename in raw_files:
+            entry = data_cache.load_cached(filename, options,
+                                           self.read_cache_dir)
+            if entry is not None:
+                reader = EK60()
+                reader._set_cache_entry(*entry)
+                entry = reader
+            readers.append(entry)
+
+        # Read the files that aren't in the cache and add them to the cache.
+        missing = [n for n, reader in enumerate(readers) if reader is None]
+        results = self._read_raw_files([raw_files[n] for n in missing])
+        for n, reader in zip(missing, results):
+            arrays, values = reader._get_cache_entry()
+            data_cache.save_cached(raw_files[n], options, arrays, values,
+                    self.read_cache_dir, max_size=self.read_cache_size)
+            readers[n] = reader
+
+        self._merge_readers(readers)
+
+        return len(raw_files), bottom_files
+
+
+    def _get_cache_entry(self):
+        """Returns the data of this object as a decoded data cache entry.
+
+        The RawData sample and ping arrays are returned by name.  The
+        ChannelMetadata objects of each channel, the NMEA data and the
+        properties used by _merge_readers are returned as plain values so
+        the entry can be stored without pickling any objects.  This is used
+        on the per file EK60 objects of _read_raw_cached.
+
+        Returns:
+            A tuple (arrays, values) of the dictionaries passed to
+            data_cache.save_cached.
+        """
+
+        arrays = {}
+        channels = []
+        for n, channel_id in enumerate(self.channel_ids):
+            raw = self.raw_data[channel_id]
+            prefix = 'raw%d.' % n
+
+            # Store the data arrays.  The sample buffers of ragged objects
+            # aren't data attributes.
+            names = [name for name in raw._data_attributes
+                     if name != 'channel_metadata' and hasattr(raw, name)]
+            if raw.ragged:
+                names += [name for name in ['power', 'angles_alongship_e',
+                          'angles_athwartship_e'] if hasattr(raw, name)]
+            for name in names:
+                arrays[prefix + name] = np.asarray(getattr(raw, name))
+
+            # Store the ChannelMetadata objects once and the index of the
+            # object of each ping.
+            if hasattr(raw, 'channel_metadata'):
+                starts, ends, metadata, segment_index = \
+                        raw._get_metadata_segments()
+            else:
+                metadata = []
+                segment_index = np.arange(0)
+            unique = []
+            segment_object = []
+            for meta in metadata + [raw.current_metadata]:
+                for m, other in enumerate(unique):
+                    if other is meta:
+                        break
+                else:
+                    m = len(unique)
+                    if meta is not None:
+                        unique.append(meta)
+                segment_object.append(-1 if meta is None else m)
+            current = segment_object.pop()
+            object_index = np.array(segment_object, dtype='int32')
+            arrays[prefix + 'metadata_index'] = object_index[segment_index]
+
+            channels.append({'channel_id': channel_id,
+                             'store_power': raw.store_power,
+                             'store_angles': raw.store_angles,
+                             'max_sample_number': raw.max_sample_number,
+                             'compact': raw.compact,
+                             'ragged': raw.ragged,
+                             'names': names,
+                             'n_pings': raw.n_pings,
+                             'n_samples': raw.n_samples,
+                             'sample_dtype': raw.sample_dtype,
+                             'buffer_end': raw._buffer_end,
+                             'current_metadata': current,
+                             'metadata': [None if meta is None else
+                                          vars(meta) for meta in unique]})
+
+        # Store the NMEA data.
+        n_raw = self.nmea_data.n_raw
+        arrays['nmea.times'] = self.nmea_data.nmea_times[:n_raw]
+        arrays['nmea.text'] = np.array(
+                [str(text) for text in self.nmea_data.raw_datagrams[:n_raw]],
+                dtype='U')
+
+        values = {'start_time': self.start_time,
+                  'end_time': self.end_time,
+                  'start_ping': self.start_ping,
+                  'end_ping': self.end_ping,
+                  'n_pings': self.n_pings,
+                  'channels': channels,
+                  'channel_map': list(self._channel_map.items()),
+                  'file_channel_map': list(self._file_channel_map.items())}
+
+        return arrays, values
+
+
+    def _set_cache_entry(self, arrays, values):
+        """Restores the data of a decoded data cache entry.
+
+        This rebuilds the RawData, ChannelMetadata and NMEA data objects of
+        an entry created by _get_cache_entry in this (new) object.
+
+        Args:
+            arrays (dict): The arrays of the entry.
+            values (dict): The values of the entry.
+        """
+
+        self.start_time = values['start_time']
+        self.end_time = values['end_time']
+        self.start_ping = values['start_ping']
+        self.end_ping = values['end_ping']
+        self.n_pings = values['n_pings']
+        self._channel_map = dict(values['channel_map'])
+        self._file_channel_map = dict(values['file_channel_map'])
+
+        for n, channel in enumerate(values['channels']):
+            prefix = 'raw%d.' % n
+            channel_id = channel['channel_id']
+            raw = RawData(channel_id, store_power=channel['store_power'],
+                          store_angles=channel['store_angles'],
+                          max_sample_number=channel['max_sample_number'],
+                          compact=channel['compact'],
+                          ragged=channel['ragged'])
+
+            # Rebuild the ChannelMetadata objects.
+            metadata = []
+            for fields in channel['metadata']:
+                if fields is None:
+                    metadata.append(None)
+                    continue
+                meta = ChannelMetadata.__new__(ChannelMetadata)
+                meta.__dict__.update(fields)
+                metadata.append(meta)
+            if 'ping_time' in channel['names']:
+                object_index = arrays[prefix + 'metadata_index']
+                raw.channel_metadata = np.empty(object_index.shape[0],
+                                                dtype='object')
+                for m, meta in enumerate(metadata):
+                    raw.channel_metadata[object_index == m] = meta
+            if channel['current_metadata'] >= 0:
+                raw.current_metadata = metadata[channel['current_metadata']]
+
+            # Restore the data arrays.
+            for name in channel['names']:
+                setattr(raw, name, arrays[prefix + name])
+                if (name not in raw._data_attributes and not (raw.ragged and
+                        name in ['power', 'angles_alongship_e',
+                                 'angles_athwartship_e'])):
+                    raw._data_attributes.append(name)
+            raw.n_pings = channel['n_pings']
+            raw.n_samples = channel['n_samples']
+            raw.sample_dtype = channel['sample_dtype']
+            raw._buffer_end = channel['buffer_end']
+
+            self.raw_data[channel_id] = raw
+            self.channel_ids.append(channel_id)
+            self.n_channels += 1
+            self.channel_id_map[self.n_channels] = channel_id
+
+        # Rebuild the NMEA data.  The stored datagrams don't have
+        # duplicates.
+        for time, text in zip(arrays['nmea.times'], arrays['nmea.text']):
+            self.nmea_data.add_datagram(time, str(text),
+                                        allow_duplicates=True)
+
+
+    def _merge_readers(self, readers):
+        """Merges the data from other EK60 objects into this object.
+
+        The data are appended in the order provided. Ping numbers and the
+        ping ranges of the ChannelMetadata objects are offset so the result
+        is the same as if the files had been read sequentially by this object.
+
+        Args:
+            readers (list): List of EK60 objects to merge.
+        """
+
+        # Collect the RawData objects for each channel while updating our
+        # properties.
+        channel_data = {}
+        for n, reader in enumerate(readers):
+            if n == 0:
+                self.start_time = reader.start_time
+            if reader.end_time is not None:
+                self._update_end_time(reader.end_time)
+
+            # Offset the ping numbers by the number of pings read so far.
+            if reader.start_ping and not self.start_ping:
+                self.start_ping = reader.start_ping + self.n_pings
+            if reader.end_ping:
+                self.end_ping = reader.end_ping + self.n_pings
+            self.n_pings += reader.n_pings
+
+            for channel_id in reader.channel_ids:
+                # Check if a RawData object exists for this channel.  If not,
+                # create it, add it to the list of channel_ids, and update
+                # the public channel id map.
+                if channel_id not in self.raw_data:
+                    self.raw_data[channel_id] = RawData(channel_id,
+                            store_power=self.read_power,
+                            store_angles=self.read_angles,
+                            max_sample_number=self.read_max_sample_count,
+                            compact=self.read_compact,
+                            ragged=self.read_ragged,
+                            storage_path=self.read_storage_path)
+
+                    self.channel_ids.append(channel_id)
+
+                    self.n_channels += 1
+                    self.channel_id_map[self.n_channels] = channel_id
+
+                channel_data.setdefault(channel_id, []).append(
+                        reader.raw_data[channel_id])
+
+            # Add the NMEA data.
+            self.nmea_data.append(reader.nmea_data)
+
+            # The file channel maps are those of the last file read.
+            self._file_channel_map = reader._file_channel_map
+            self._channel_map = reader._channel_map
+
+        # Now append the data to our RawData objects.
+        for channel_id in channel_data:
+            self.raw_data[channel_id].append_raw_data(
+                    channel_data[channel_id])
+
+
+    def _open_raw_file(self, filename):
+        """Opens a raw file using the current read backend.
+
+        Args:
+            filename (str): The full path to the file to open.
+
+        Returns:
+            A RawSimradFile (or RawSimradMmapFile) object.
+        """
+
+        if self.read_backend == 'mmap':
+            try:
+                return RawSimradMmapFile(filename, 'r')
+            except (ValueError, EnvironmentError):
+                # The file can't be mapped (it may be empty or the platform
+                # may not support it).  Fall back to the buffered reader.
+                pass
+
+        return RawSimradFile(filename, 'r')
+
+
+    def _read_datagrams(self, fid, index=None):
         """Reads datagrams.
 
         An internal method to read all of the datagrams contained in a file.
@@ -414,168 +1499,398 @@ class EK60(object):
             fid (file object): Pointer to currently open file object. This is a
                 RawSimradFile file object and not the standard Python file
                 object.
-            incremental (bool): Boolean to control incremental reading. True
-                = incremental reading, False reads entire file.
+            index (array): The datagram index for this file. If provided,
+                only the datagrams within the read bounds are read.
         """
 
-        #TODO: implement incremental reading
-        #      The user should be able to specify incremental reading in
-        #      their call to read_raw. incremental reading should read in the
-        #      specified number of "pings", save the reader state,
-        #      then return. Subsequent calls would pick up where the reading
-        #      left off.  As stated above, the exact mechanics need to be
-        #      worked out since it will not work as currently implemented.
+        # If we have an index, use it to find the datagrams we need.
+        if index is not None:
+            self._read_indexed_datagrams(fid, index)
+            return
 
+        # Read datagrams until we reach the end of the file.
+        while self._read_next_datagram(fid):
+            pass
 
-        #TODO:  figure out what if anything we want to do with these.
-        #       Either expose in some useful way or remove.
-        num_sample_datagrams = 0
-        num_sample_datagrams_skipped = 0
-        num_datagrams_parsed = 0
-        num_bot_datagrams = 0
 
-        # While datagrams are available, try to read in the next datagram.
-        while True:
-            try:
-                new_datagram = fid.read(1)
-            except SimradEOF:
-                break
+    def _read_next_datagram(self, fid):
+        """Reads and stores the next datagram in a file.
+
+        We peek at the header of the next datagram.  The header contains the
+        datagram type and time and for RAW datagrams the channel number.  We
+        apply our time, ping and channel filters to the header and skip over
+        the datagrams we will not store without decoding them.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+
+        Returns:
+            False if the end of the file has been reached, otherwise True.
+        """
 
-            # Convert the timestamp to a datetime64 object.
-            new_datagram['timestamp'] = \
-                    np.datetime64(new_datagram['timestamp'], '[ms]')
+        # A truncated datagram at the end of the file raises SimradEOF when
+        # it is read or skipped.  End the read there, restoring the ping
+        # count and end time so the partial datagram isn't counted.
+        n_pings = self.n_pings
+        end_time = self.end_time
+        try:
+            header = fid.peek()
+
+            # Let the reader skip datagrams with invalid headers.  read()
+            # skips these datagrams too so they don't affect the ping count.
+            if header['size'] < 16 or \
+                    (header['low_date'], header['high_date']) == (0, 0):
+                fid.skip()
+                return True
+
+            # Convert the header timestamp to a datetime64 object.
+            timestamp = nt_to_datetime64(header['low_date'],
+                                         header['high_date'])
 
             # Check if data should be stored based on time bounds.
             if self.read_start_time is not None:
-                if new_datagram['timestamp'] < self.read_start_time:
-                    continue
+                if timestamp < self.read_start_time:
+                    fid.skip()
+                    return True
             if self.read_end_time is not None:
-                if new_datagram['timestamp'] > self.read_end_time:
-                    continue
-
-            num_datagrams_parsed += 1
+                if timestamp > self.read_end_time:
+                    fid.skip()
+                    return True
 
             # Update the end_time property.
-            if self.end_time is not None:
-                # We can't assume data will be read in time order.
-                if self.end_time < new_datagram['timestamp']:
-                    self.end_time = new_datagram['timestamp']
-            else:
-                self.end_time = new_datagram['timestamp']
-
-            # Process the datagrams by type.
+            self._update_end_time(timestamp)
 
             # RAW datagrams store raw acoustic data for a channel.
-            if new_datagram['type'].startswith('RAW'):
+            if header['type'].startswith('RAW'):
 
-                if new_datagram['channel'] == 1:
+                if header['channel'] == 1:
                     self.n_pings += 1
 
                 # Check if we should store this data based on ping bounds.
                 if self.read_start_ping is not None:
                     if self.n_pings < self.read_start_ping:
-                        continue
+                        fid.skip()
+                        return True
                 if self.read_end_ping is not None:
                     if self.n_pings > self.read_end_ping:
-                        continue
+                        fid.skip()
+                        return True
 
                 # Check if we're supposed to store this channel.
-                if new_datagram['channel'] in self._channel_map:
+                if header['channel'] not in self._channel_map:
+                    fid.skip()
+                    return True
 
-                    # Set the first ping number we read.
-                    if not self.start_ping:
-                        self.start_ping = self.n_pings
-                    # Update the last ping number.
-                    self.end_ping = self.n_pings
+                # This datagram passed our filters - read and store it.
+                new_datagram = fid.read(1)
+                self._store_raw_datagram(new_datagram, self.n_pings)
 
-                    # Get the channel id.
-                    channel_id = self._channel_map[new_datagram['channel']]
+            else:
+                # Read and store the other datagram types.
+                new_datagram = fid.read(1)
+                self._store_datagram(new_datagram)
+        except SimradEOF:
+            self.n_pings = n_pings
+            self.end_time = end_time
+            return False
 
-                    # Call the appropriate channel's append_ping method.
-                    self.raw_data[channel_id].append_ping(new_datagram,
-                            start_sample=self.read_start_sample,
-                            end_sample=self.read_end_sample)
+        return True
 
-                    num_sample_datagrams += 1
-                else:
-                    num_sample_datagrams_skipped += 1
-
-            # NME datagrams store ancillary data as NMEA-0817 style ASCII data.
-            elif new_datagram['type'].startswith('NME'):
-                # Add the datagram to our nmea_data object.
-                self.nmea_data.add_datagram(new_datagram['timestamp'],
-                                            new_datagram['nmea_string'])
-
-            # TAG datagrams contain time-stamped annotations inserted via the
-            # recording software.
-            elif new_datagram['type'].startswith('TAG'):
-                #  TODO: Implement annotation reading
-                print(new_datagram)
-                pass
 
-            # BOT datagrams contain sounder detected bottom depths from ".bot"
-            # files.
-            elif new_datagram['type'].startswith('BOT'):
-                # Iterate through our channels, extract the depth, and update
-                # the channel.
-                for channel_id in self.channel_ids:
-                    idx = self._file_channel_map.index(channel_id)
-                    bottom_depth = new_datagram['depth'][idx]
-                    # Call the appropriate channel's append_bot method.
-                    self.raw_data[channel_id].append_bot(new_datagram[
-                                                             'timestamp'],
-                                                         bottom_depth)
-
-                num_bot_datagrams += 1
-
-            # DEP datagrams contain sounder detected bottom depths from ".out"
-            # files as well as "reflectivity" data.
-            elif new_datagram['type'].startswith('DEP'):
-                # Iterate through our channels, extract the depth, and update
-                # the channel.
-                for channel_id in self.channel_ids:
-                    idx = self._file_channel_map.index(channel_id)
-                    bottom_depth = new_datagram['depth'][idx]
-                    reflectivity = new_datagram['reflectivity'][idx]
-                    # Call the appropriate channel's append_bot method,including
-                    # reflectivity
-                    self.raw_data[channel_id].append_bot(new_datagram[
-                        'timestamp'], bottom_depth, reflectivity=reflectivity)
-
-                num_bot_datagrams += 1
+    def _read_indexed_datagrams(self, fid, index):
+        """Reads the datagrams within the read bounds using a datagram index.
+
+        The time, ping and channel bounds are applied to the index and only
+        the datagrams that will be stored are read from the file.  The
+        results are identical to reading the file sequentially.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+            index (array): The datagram index for this file.
+        """
+
+        # Apply the read bounds to the index.
+        index, times, ping_number, keep_raw = self._select_indexed_datagrams(
+                index[index['offset'] >= fid._tell_bytes()], self.n_pings,
+                self._channel_map)
+        if index.shape[0] == 0:
+            return
+        is_raw = np.char.startswith(index['type'], b'RAW')
+        keep = keep_raw | ~is_raw
+
+        # Update the end time using all datagrams within the time bounds and
+        # the ping counter.
+        self._update_end_time(times.max())
+        self.n_pings = int(ping_number[-1])
+
+        # Update the start and end ping using the pings we're storing.
+        if np.any(keep_raw):
+            if not self.start_ping:
+                self.start_ping = int(ping_number[keep_raw][0])
+            self.end_ping = int(ping_number[keep_raw][-1])
+
+        # If we're decoding the RAW datagrams in bulk, read them and store
+        # them by channel.
+        if self.read_bulk:
+            self._read_bulk_raw_datagrams(fid, index[keep_raw])
+            keep = ~is_raw
+
+        # Now read and store the datagrams.
+        for offset, n_ping in zip(index['offset'][keep], ping_number[keep]):
+            new_datagram = fid.read_at(int(offset))
+
+            if new_datagram['type'].startswith('RAW'):
+                self._store_raw_datagram(new_datagram, int(n_ping))
             else:
-                print("Unknown datagram type: " + str(new_datagram['type']))
+                self._store_datagram(new_datagram)
+
+
+    def _select_indexed_datagrams(self, index, n_pings, channel_map):
+        """Applies the read bounds to a datagram index.
+
+        Args:
+            index (array): The datagram index rows after the configuration
+                datagrams.
+            n_pings (int): The number of pings read before these datagrams.
+            channel_map (dict): Maps the channel numbers being read to their
+                channel IDs.
+
+        Returns:
+            A tuple (index, times, ping_number, keep_raw) where index
+            contains the datagrams within the time bounds, times and
+            ping_number are the time and ping number of each of these
+            datagrams and keep_raw is a boolean array marking the RAW
+            datagrams within the ping bounds of the channels being read.
+        """
+
+        # Apply the time bounds to all datagrams.
+        times = datagram_index.index_times(index)
+        keep = np.ones(index.shape[0], dtype=bool)
+        if self.read_start_time is not None:
+            keep &= times >= self.read_start_time
+        if self.read_end_time is not None:
+            keep &= times <= self.read_end_time
+        index = index[keep]
+        times = times[keep]
+
+        # Compute the ping number of each datagram.  The ping counter is
+        # incremented by the channel 1 RAW datagrams within the time bounds.
+        is_raw = np.char.startswith(index['type'], b'RAW')
+        ping_number = n_pings + np.cumsum(is_raw & (index['channel'] == 1))
+
+        # Determine the RAW datagrams we're storing based on ping bounds and
+        # channel.
+        keep_raw = is_raw & np.in1d(index['channel'],
+                                    list(channel_map.keys()))
+        if self.read_start_ping is not None:
+            keep_raw &= ping_number >= self.read_start_ping
+        if self.read_end_ping is not None:
+            keep_raw &= ping_number <= self.read_end_ping
+
+        return index, times, ping_number, keep_raw
+
+
+    def _read_bulk_raw_datagrams(self, fid, index):
+        """Reads and stores RAW datagrams in bulk.
+
+        The RAW datagrams are read in blocks and each channel's datagrams are
+        added to its RawData object using the vectorized append_pings method.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+            index (array): The datagram index rows of the RAW datagrams to
+                store.
+        """
+
+        # Count the datagrams we're reading for each channel.
+        channels, n_remaining = np.unique(index['channel'], return_counts=True)
+        n_remaining = dict(zip(channels, n_remaining))
+
+        # Read the datagrams in blocks to limit the size of the buffer.
+        for block_start in range(0, index.shape[0], self.BULK_BLOCK_SIZE):
+            block = index[block_start:block_start + self.BULK_BLOCK_SIZE]
+            headers, buffer, data_offsets = fid.read_raw_block(
+                    block['offset'], block['size'])
+
+            # Store the data by channel.
+            for channel in np.unique(headers['channel']):
+                this_channel = headers['channel'] == channel
+                raw_data = self.raw_data[self._channel_map[channel]]
+
+                # Make room for the rest of this channel's pings in this file
+                # so we don't resize the arrays for every block.
+                if raw_data.n_pings >= 0 and (raw_data.ping_time.shape[0] <
+                        raw_data.n_pings + n_remaining[channel]):
+                    raw_data.resize(raw_data.n_pings + n_remaining[channel],
+                                    raw_data.n_samples)
+                n_remaining[channel] -= np.count_nonzero(this_channel)
+
+                raw_data.append_pings(
+                        headers[this_channel], buffer,
+                        data_offsets[this_channel],
+                        start_sample=self.read_start_sample,
+                        end_sample=self.read_end_sample)
+
+
+    def _update_end_time(self, timestamp):
+        """Updates the end_time property given a datagram time.
+
+        Args:
+            timestamp (datetime64): The datagram time.
+        """
+
+        # We can't assume data will be read in time order.
+        if self.end_time is None or self.end_time < timestamp:
+            self.end_time = timestamp
+
+
+    def _store_raw_datagram(self, new_datagram, ping_number):
+        """Stores a RAW datagram in the RawData object for its channel.
+
+        Args:
+            new_datagram (dict): The parsed RAW datagram.
+            ping_number (int): The ping number of this datagram.
+        """
+
+        # Set the first ping number we read.
+        if not self.start_ping:
+            self.start_ping = ping_number
+        # Update the last ping number.
+        self.end_ping = ping_number
+
+        # Get the channel id.
+        channel_id = self._channel_map[new_datagram['channel']]
+
+        # Call the appropriate channel's append_ping method.
+        self.raw_data[channel_id].append_ping(new_datagram,
+                start_sample=self.read_start_sample,
+                end_sample=self.read_end_sample)
+
+
+    def _store_datagram(self, new_datagram):
+        """Stores the non-sample datagrams.
+
+        Args:
+            new_datagram (dict): The parsed datagram.
+        """
+
+        # NME datagrams store ancillary data as NMEA-0817 style ASCII data.
+        if new_datagram['type'].startswith('NME'):
+            # Add the datagram to our nmea_data object.
+            self.nmea_data.add_datagram(new_datagram['timestamp'],
+                                        new_datagram['nmea_string'])
+
+        # TAG datagrams contain time-stamped annotations inserted via the
+        # recording software.
+        elif new_datagram['type'].startswith('TAG'):
+            #  TODO: Implement annotation reading
+            print(new_datagram)
+            pass
+
+        # BOT datagrams contain sounder detected bottom depths from ".bot"
+        # files.
+        elif new_datagram['type'].startswith('BOT'):
+            self._collect_bottom_detection(new_datagram['timestamp'],
+                                           new_datagram['depth'])
+
+        # DEP datagrams contain sounder detected bottom depths from ".out"
+        # files as well as "reflectivity" data.
+        elif new_datagram['type'].startswith('DEP'):
+            self._collect_bottom_detection(new_datagram['timestamp'],
+                    new_datagram['depth'],
+                    reflectivity=new_datagram['reflectivity'])
+        else:
+            print("Unknown datagram type: " + str(new_datagram['type']))
+
+
+    def _collect_bottom_detection(self, detection_time, depth,
+                                  reflectivity=None):
+        """Collects the bottom detections from a BOT or DEP datagram.
+
+        The detections are stored by channel and are added to the RawData
+        objects by _add_bottom_detections once the pings have been read.
+
+        Args:
+            detection_time (datetime64): The time of the detections.
+            depth (array): The detected bottom depth of each channel in the
+                file.
+            reflectivity (array): The bottom reflectivity of each channel in
+                the file (optional).
+        """
+
+        for channel_id in self.channel_ids:
+            idx = self._file_channel_map.get(channel_id)
+            if idx is None:
+                # This channel isn't in the bottom file.
+                continue
+
+            # Detections are collected in runs of datagrams of the same type
+            # so BOT and DEP detections are applied in the order they were
+            # read.
+            runs = self._bottom_detections.setdefault(channel_id, [])
+            has_reflectivity = reflectivity is not None
+            if not runs or runs[-1][0] != has_reflectivity:
+                runs.append((has_reflectivity, [], [], []))
+            runs[-1][1].append(detection_time)
+            runs[-1][2].append(depth[idx])
+            if has_reflectivity:
+                runs[-1][3].append(reflectivity[idx])
+
+
+    def _add_bottom_detections(self):
+        """Adds the collected bottom detections to the RawData objects.
+
+        Each channel's detections are matched to its pings in a single
+        vectorized pass (see RawData.append_bottom).
+        """
+
+        for channel_id, runs in self._bottom_detections.items():
+            raw_data = self.raw_data.get(channel_id)
+            if raw_data is None or raw_data.n_pings <= 0:
+                continue
+            for has_reflectivity, times, depths, reflectivity in runs:
+                if has_reflectivity:
+                    reflectivity = np.array(reflectivity)
+                else:
+                    reflectivity = None
+                raw_data.append_bottom(np.array(times,
+                        dtype='datetime64[ms]'), np.array(depths),
+                        reflectivity=reflectivity)
+
+        self._bottom_detections = {}
 
 
     def _convert_time_bound(self, time, format_string):
-        """Converts strings to datetime objects and normalizes to UTC.
+        """Converts strings and datetime objects to datetime64 objects.
 
-        Internally, all times are datetime objects converted to UTC timezone.
-        This method converts arguments to comply with this practice.
+        Internally, all times are datetime64[ms] objects in UTC. This method
+        converts arguments to comply with this practice.
 
         Args:
-            time (str or datetime): Either a string representing a date and
-                time in format specified in format_string, or a datetime object.
+            time (str, datetime or datetime64): Either a string representing
+                a date and time in format specified in format_string, a
+                datetime object or a datetime64 object. Strings and naive
+                datetime objects are assumed to be UTC.
             format_string (str): Format of time string specified in datetime
             object notations such as '%Y-%m-%d %H:%M:%S' to parse a time
             string of '2017-02-28 23:34:01'
 
         Returns:
-            Datetime object normalized to UTC time.
+            Datetime64[ms] object in UTC.
         """
-        # If given a datetime64[ms] object, there's nothing to convert.
-        if time.dtype == '<M8[ms]':
-            return
-
-        utc = timezone('utc')
+        # If given a datetime64 object, simply ensure it has ms resolution.
+        if isinstance(time, np.datetime64):
+            return time.astype('datetime64[ms]')
 
         # Convert string to datetime object.
         if isinstance(time, str):
             time = datetime.datetime.strptime(time, format_string)
 
-        # Convert datetime object to UTC.
+        # Convert datetime object to UTC and then to datetime64.
         if isinstance(time, datetime.datetime):
-            time = utc.localize(time)
+            if time.tzinfo is not None:
+                time = time.astimezone(timezone('utc')).replace(tzinfo=None)
+            time = np.datetime64(time, 'ms')
 
         return time
 
@@ -693,7 +2008,8 @@ class RawData(PingData):
 
     def __init__(self, channel_id, n_pings=100, n_samples=1000,
                  rolling=False, chunk_width=500, store_power=True,
-                 store_angles=True, max_sample_number=None):
+                 store_angles=True, max_sample_number=None, compact=False,
+                 ragged=False, storage_path=None):
         """Creates a new, empty RawData object.
 
         The RawData class stores raw echosounder data from a single channel
@@ -722,8 +2038,9 @@ class RawData(PingData):
                 arrays. Default value is 1000 samples. Arrays can be
                 re-sized later.
             rolling (bool): True = arrays have fixed sizes set when class is
-                instantiated If additional pings are read array is rolled
-                left, dropping oldest ping and adding newest.
+                instantiated.  The arrays are used as a ring buffer.  When
+                they are full, each new ping replaces the oldest ping.
+                get_indices returns the pings in time order.
             chunk_width (int): Sets the number of pings (columns) to expand
                 arrays when needed to hold additional pings. This is used when
                 rolling=False.
@@ -733,14 +2050,59 @@ class RawData(PingData):
                 stored in this RawData object.
             max_sample_number (int): Integer specifying the maximum number of
                 samples that will be stored in this instance's data arrays.
+            compact (bool): Set to True to store the sample data as they are
+                stored in the raw file.  Power is stored as int16 indexed
+                power and the angles as int8 indexed electrical angles
+                instead of float arrays of power in dB and electrical angles
+                in degrees.  This uses a third of the memory.  The data are
+                converted when they are retrieved using get_power, get_Sv,
+                get_electrical_angles, etc.  The arrays are padded with the
+                smallest value of the type (-32768 and -128) but the padding
+                is found from the sample_count of each ping, so all stored
+                values are treated as valid samples.
+            ragged (bool): Set to True to store the samples of all pings end
+                to end in 1d buffers instead of in 2d arrays padded to the
+                length of the longest ping.  The power and angle attributes
+                are then 1d and the buffer_offset and buffer_count attributes
+                give the position in the buffers and the number of samples
+                of each ping.  Rectangular arrays are created for the
+                requested pings when the data are retrieved.  Ragged objects
+                can't be rolling and the PingData methods that operate on the
+                2d sample arrays (insert, replace, etc.) don't apply to the
+                sample data of ragged objects.
+            storage_path (str): The path to a directory where the power and
+                angle arrays are stored.  If set, the sample data arrays are
+                numpy memmap arrays backed by files in this directory so
+                the data do not have to fit in memory.  Only the pings that
+                are accessed are read from disk.  The files are not deleted
+                when the object is deleted.  If None, the arrays are held in
+                memory.
+
+        Raises:
+            ValueError: rolling and ragged are both True.
         """
         super(RawData, self).__init__()
 
+        if rolling and ragged:
+            raise ValueError('Ragged RawData objects cannot be rolling.')
+
         # Specify if data array size is fixed and the array data is rolled left
         # if the array fills up (True) or if the arrays are expanded when
         # necessary to hold additional data (False).
         self.rolling_array = bool(rolling)
 
+        # When a rolling array is full, _ring_head is the index of the
+        # oldest ping.  New pings are written there and the head advances.
+        self._ring_head = 0
+
+        # The cached run length encoding of the channel_metadata array.  See
+        # _get_metadata_segments.
+        self._metadata_segments = None
+
+        # The cached sample grid plan of the most recently requested pings.
+        # See _get_sample_grid_plan.
+        self._sample_grid_plan = None
+
         # Current_metadata stores a reference to the current channel_metadata
         # object.  The channel_metadata class stores raw file and channel
         # configuration properties contained in the .raw file header.  When
@@ -762,6 +2124,18 @@ class RawData(PingData):
         self.store_power = store_power
         self.store_angles = store_angles
 
+        # Compact objects store the indexed power and angle values from the
+        # raw file and convert them when the data are retrieved.
+        self.compact = bool(compact)
+
+        # Ragged objects store the samples in 1d buffers.  _buffer_end is the
+        # index of the first unused element of the buffers.
+        self.ragged = bool(ragged)
+        self._buffer_end = 0
+
+        # The directory of the files backing disk based sample arrays.
+        self.storage_path = storage_path
+
         # Max_sample_number can be set to an integer specifying the maximum
         # number of samples that will be stored in the sample data arrays.
         self.max_sample_number = max_sample_number
@@ -793,6 +2167,14 @@ class RawData(PingData):
                                   'angles_alongship_e',
                                   'angles_athwartship_e']
 
+        # The sample data of ragged objects are not stored by ping.  The
+        # buffer positions of the pings are.
+        if self.ragged:
+            for attr_name in ['power', 'angles_alongship_e',
+                              'angles_athwartship_e']:
+                self._data_attributes.remove(attr_name)
+            self._data_attributes += ['buffer_offset', 'buffer_count']
+
         # If we're using a fixed data array size, we can allocate the arrays
         # now, and since we assume rolling arrays will be used in a visual or
         # interactive application, we initialize the arrays so they can be
@@ -809,6 +2191,293 @@ class RawData(PingData):
         # object will not contain the data properties.
 
 
+    def reserve(self, n_pings, n_samples, n_values=None):
+        """Allocates the data arrays to hold additional pings.
+
+        The arrays are sized to hold n_pings more pings with up to n_samples
+        samples so that they do not have to be resized as these pings are
+        appended.  This has no effect on rolling arrays.
+
+        Args:
+            n_pings (int): The number of pings that will be appended.
+            n_samples (int): The number of samples of the largest ping that
+                will be appended.
+            n_values (int): The total number of samples that will be
+                appended.  This sets the size of the sample buffers of ragged
+                objects.  If None, room for n_pings * n_samples samples is
+                allocated.
+        """
+
+        if self.rolling_array or n_pings <= 0:
+            return
+
+        if self.n_pings == -1:
+            # The arrays haven't been allocated yet.
+            self._create_arrays(n_pings, n_samples, n_values=n_values)
+            self.n_pings = 0
+        else:
+            if self.ragged:
+                if n_values is None:
+                    n_values = n_pings * n_samples
+                self._reserve_buffer(n_values)
+
+            # Grow the existing arrays if needed.
+            n_pings = max(self.n_pings + n_pings, self.ping_time.shape[0])
+            n_samples = max(n_samples, self.n_samples)
+            if (n_pings > self.ping_time.shape[0] or
+                    n_samples > self.n_samples):
+                self.resize(n_pings, n_samples)
+
+
+    def _reserve_buffer(self, n_values):
+        """Grows the sample buffers of a ragged object if needed.
+
+        Args:
+            n_values (int): The number of samples that will be appended.
+        """
+
+        if self.store_power:
+            buffer = self.power
+        elif self.store_angles:
+            buffer = self.angles_alongship_e
+        else:
+            return
+
+        # Grow the buffers geometrically so appending pings one at a time
+        # doesn't copy the buffers for every ping.
+        n_needed = self._buffer_end + n_values
+        if n_needed <= buffer.shape[0]:
+            return
+        n_new = max(n_needed, 2 * buffer.shape[0])
+
+        for attr_name in ['power', 'angles_alongship_e',
+                          'angles_athwartship_e']:
+            if hasattr(self, attr_name):
+                setattr(self, attr_name, self._resize_sample_array(attr_name,
+                        getattr(self, attr_name), (n_new,)))
+
+
+    def _append_to_buffer(self, n_values):
+        """Returns the slice of the sample buffers for the next n_values.
+
+        The buffers are grown if needed and the returned elements are set
+        to the fill value.
+
+        Args:
+            n_values (int): The number of samples to add.
+
+        Returns:
+            A slice of the sample buffers.
+        """
+
+        self._reserve_buffer(n_values)
+        values = slice(self._buffer_end, self._buffer_end + n_values)
+        self._buffer_end += n_values
+
+        for attr_name in ['power', 'angles_alongship_e',
+                          'angles_athwartship_e']:
+            if hasattr(self, attr_name):
+                buffer = getattr(self, attr_name)
+                buffer[values] = self._get_fill_value(buffer)
+
+        return values
+
+
+    def trim(self, n_pings=None, n_samples=None):
+        """Trims pings from the object to a given length.
+
+        The sample buffers of ragged objects are trimmed to the samples they
+        contain.
+
+        Args:
+            n_pings (int): Number of pings (horizontal axis).
+            n_samples (int): Number of samples (vertical axis).
+        """
+
+        super(RawData, self).trim(n_pings=n_pings, n_samples=n_samples)
+
+        if self.ragged:
+            for attr_name in ['power', 'angles_alongship_e',
+                              'angles_athwartship_e']:
+                if hasattr(self, attr_name):
+                    setattr(self, attr_name, self._resize_sample_array(
+                            attr_name, getattr(self, attr_name),
+                            (self._buffer_end,)))
+
+
+    def _allocate_sample_array(self, attr_name, shape, dtype):
+        """Allocates a sample data array.
+
+        If storage_path is set, the array is a memmap array backed by a new
+        file in the storage directory.  Otherwise it is an in-memory array.
+
+        Args:
+            attr_name (str): The name of the sample data attribute.
+            shape (tuple): The shape of the array.
+            dtype (str): The dtype of the array.
+
+        Returns:
+            An uninitialized array.
+        """
+
+        # Files can't be mapped if they are empty.
+        if self.storage_path is None or int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=dtype)
+
+        if not os.path.isdir(self.storage_path):
+            os.makedirs(self.storage_path)
+        prefix = ''.join([c if c.isalnum() else '_' for c in
+                          self.channel_id[0]]) + '.' + attr_name + '.'
+        fid, filename = tempfile.mkstemp(suffix='.dat', prefix=prefix,
+                                         dir=self.storage_path)
+        os.close(fid)
+
+        return np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+
+
+    def _resize_sample_array(self, attr_name, data, shape):
+        """Returns a sample data array resized to a new shape.
+
+        Disk backed arrays that only change size in the ping dimension
+        (or the 1d buffers of ragged objects) are resized in place by
+        changing the size of their file.  Otherwise, a new array is allocated
+        and the data are copied to it a block of pings at a time.  Samples
+        added to 2d arrays are set to the fill value.
+
+        Args:
+            attr_name (str): The name of the sample data attribute.
+            data (array): The array to resize.
+            shape (tuple): The new shape of the array.
+
+        Returns:
+            The resized array.
+        """
+
+        if data.shape == shape:
+            return data
+
+        if (isinstance(data, np.memmap) and data.filename is not None and
+                data.shape[1:] == shape[1:] and int(np.prod(shape)) > 0):
+            # Grow the file if needed and map the new shape.  C ordered
+            # arrays keep their layout when pings are added or removed.
+            data.flush()
+            n_bytes = int(np.prod(shape)) * data.dtype.itemsize
+            if n_bytes > os.path.getsize(data.filename):
+                with open(data.filename, 'r+b') as fid:
+                    fid.truncate(n_bytes)
+            new_data = np.memmap(data.filename, dtype=data.dtype, mode='r+',
+                                 shape=shape)
+
+            # Shrink the file when the array shrinks.  Some platforms don't
+            # allow mapped files to be truncated, the file is left as is.
+            if n_bytes < os.path.getsize(data.filename):
+                try:
+                    with open(data.filename, 'r+b') as fid:
+                        fid.truncate(n_bytes)
+                except (IOError, OSError):
+                    pass
+
+            return new_data
+
+        new_data = self._allocate_sample_array(attr_name, shape, data.dtype)
+
+        # Only the pings (or ragged samples) that contain data are copied.
+        n_pings = min(data.shape[0], shape[0])
+        if self.ragged:
+            n_pings = min(n_pings, self._buffer_end)
+        elif self.n_pings >= 0:
+            n_pings = min(n_pings, self.n_pings)
+        block_pings = 1000
+        if data.ndim == 2:
+            n_samples = min(data.shape[1], shape[1])
+            new_data[:, n_samples:] = self._get_fill_value(data)
+            for start in range(0, n_pings, block_pings):
+                block = slice(start, min(start + block_pings, n_pings))
+                new_data[block, :n_samples] = data[block, :n_samples]
+        else:
+            # Ragged buffers are copied in blocks of samples.
+            block_pings *= max(self.n_samples, 1)
+            for start in range(0, n_pings, block_pings):
+                block = slice(start, min(start + block_pings, n_pings))
+                new_data[block] = data[block]
+
+        # Remove the file of the old array.  This can fail on platforms that
+        # don't allow mapped files to be deleted, in which case the file is
+        # left in the storage directory.
+        if isinstance(data, np.memmap) and data.filename is not None:
+            try:
+                os.remove(data.filename)
+            except OSError:
+                pass
+
+        return new_data
+
+
+    def _resize_2d(self, attr_name, data, ping_dim, sample_dim):
+        """Returns a 2d data array resized to the given dimensions.
+
+        This reimplements PingData._resize_2d to resize disk backed sample
+        arrays.
+
+        Args:
+            attr_name (str): The name of the attribute being resized.
+            data (array): The 2d array to resize.
+            ping_dim (int): The new ping dimension.
+            sample_dim (int): The new sample dimension.
+
+        Returns:
+            The resized array.
+        """
+
+        if self.storage_path is None:
+            return super(RawData, self)._resize_2d(attr_name, data,
+                                                   ping_dim, sample_dim)
+
+        return self._resize_sample_array(attr_name, data,
+                                         (ping_dim, sample_dim))
+
+
+    @staticmethod
+    def array_nbytes(n_pings, n_samples, store_power=True, store_angles=True,
+                     sample_dtype='float32', compact=False, n_values=None):
+        """Returns the size of the data arrays of a RawData object.
+
+        Args:
+            n_pings (int): The number of pings.
+            n_samples (int): The number of samples.
+            store_power (bool): Set to True if power data are stored.
+            store_angles (bool): Set to True if angle data are stored.
+            sample_dtype (str): The dtype of the sample data arrays.
+            compact (bool): Set to True if the indexed sample data are
+                stored.
+            n_values (int): The total number of samples of all pings if
+                the samples are stored in ragged buffers.
+
+        Returns:
+            The size, in bytes, of the data arrays.
+        """
+
+        # The ping attributes: ping_time and channel_metadata (a reference),
+        # 13 float32 attributes, transmit_mode and sample offset and count.
+        ping_bytes = 8 + np.dtype(object).itemsize + 13 * 4 + 1 + 2 * 4
+
+        # The bytes per sample.  Compact objects store 2 byte indexed power
+        # and 1 byte indexed angles.
+        if compact:
+            value_bytes = 2 * int(bool(store_power)) + \
+                          2 * int(bool(store_angles))
+        else:
+            n_arrays = int(bool(store_power)) + 2 * int(bool(store_angles))
+            value_bytes = n_arrays * np.dtype(sample_dtype).itemsize
+
+        # Ragged objects store the samples of each ping plus its buffer
+        # offset and count.  Otherwise all pings are n_samples long.
+        if n_values is not None:
+            return n_pings * (ping_bytes + 8 + 4) + n_values * value_bytes
+        else:
+            return n_pings * (ping_bytes + n_samples * value_bytes)
+
+
     def empty_like(self, n_pings):
         """Returns paw_data object with data arrays filled with NaNs.
 
@@ -828,11 +2497,189 @@ class RawData(PingData):
                              rolling=self.rolling_array, chunk_width=n_pings,
                              store_power=self.store_power,
                              store_angles=self.store_angles,
-                             max_sample_number=self.max_sample_number)
+                             max_sample_number=self.max_sample_number,
+                             compact=self.compact, ragged=self.ragged)
 
         return self._like(empty_obj, n_pings, np.nan, empty_times=True)
 
 
+    def get_indices(self, start_ping=None, end_ping=None, start_time=None,
+                    end_time=None, time_order=True):
+        """Returns the indices of the pings in a range of pings or times.
+
+        For rolling arrays the pings are numbered from the oldest ping in
+        the ring buffer and, when time_order is False, the indices are
+        returned in the order the pings were added.  Otherwise this is
+        the same as PingData.get_indices, including the requirement to call
+        _invalidate_time_order() after changing ping times in place.
+
+        Args:
+            start_ping (int): The starting ping of the range of pings specified.
+            end_ping (int): The ending ping of the range of pings specified.
+            start_time (datetime): The starting time of the range of pings
+                specified.
+            end_time (datetime): The ending time of the range of pings
+                specified.
+            time_order (bool): Controls the order the indices will return.  If
+                set to True, the indices will be in time order.  If False,
+                the data will return in the order they occur in the data arrays.
+
+        Returns:
+            The indices that are included in the specified range.
+        """
+
+        if not self.rolling_array:
+            return super(RawData, self).get_indices(start_ping=start_ping,
+                    end_ping=end_ping, start_time=start_time,
+                    end_time=end_time, time_order=time_order)
+
+        # Get the array indices of the pings, oldest first.  This only
+        # creates the index, the data arrays are not reordered.
+        ring_index = self._get_ring_index()
+        ping_number = np.arange(ring_index.shape[0]) + 1
+        ping_time = self.ping_time[ring_index]
+
+        # Get the order of the pings in the ring.  Pings are usually added
+        # in time order so this is typically the ring order.
+        if time_order:
+            primary_index = ping_time.argsort(kind='stable')
+        else:
+            primary_index = ping_number - 1
+
+        # Generate a boolean mask of the values to return.
+        mask = np.ones(primary_index.shape[0], dtype=bool)
+        if start_time:
+            mask &= ping_time[primary_index] >= start_time
+        elif start_ping:
+            mask &= ping_number[primary_index] >= start_ping
+        if end_time:
+            mask &= ping_time[primary_index] <= end_time
+        elif end_ping:
+            mask &= ping_number[primary_index] <= end_ping
+
+        return ring_index[primary_index[mask]]
+
+
+    def _get_ring_index(self):
+        """Returns the array indices of the pings of a rolling array.
+
+        Returns:
+            An array of the indices of the pings in the ring buffer, from the
+            oldest to the most recent ping.
+        """
+
+        if self.n_pings <= 0:
+            return np.arange(0)
+        return (self._ring_head + np.arange(self.n_pings)) % \
+               self.ping_time.shape[0]
+
+
+    def _get_metadata_segments(self):
+        """Returns the run length encoding of the channel_metadata array.
+
+        Consecutive pings usually share a ChannelMetadata object, so the
+        per-ping metadata references are stored as segments of pings that
+        share the same object.  The channel_metadata object array remains
+        the storage because the generic PingData methods operate on it.
+        The segments are computed from the array when they are first needed
+        and cached until the pings change.  append_ping, append_pings,
+        append_raw_data and the PingData methods that change the pings
+        discard them.  Code that assigns to channel_metadata directly must
+        call _invalidate_time_order.
+
+        Returns:
+            A tuple (starts, ends, metadata, segment_index) where starts and
+            ends are arrays of the first and one past the last array index of
+            each segment, metadata is a list of the ChannelMetadata objects
+            (or None) of the segments and segment_index is an array of the
+            segment number of each array index.
+        """
+
+        segments = getattr(self, '_metadata_segments', None)
+        if segments is None:
+            n_elements = self.channel_metadata.shape[0]
+
+            # Find where the metadata object changes from one ping to the
+            # next by comparing object identities.
+            ids = np.fromiter(map(id, self.channel_metadata), dtype=np.int64,
+                              count=n_elements)
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) \
+                if n_elements > 0 else np.arange(0)
+            ends = np.r_[starts[1:], n_elements].astype(starts.dtype)
+            metadata = list(self.channel_metadata[starts])
+
+            # Expand the segments into the segment number of each ping.
+            segment_index = np.repeat(np.arange(starts.shape[0]),
+                                      ends - starts)
+
+            segments = (starts, ends, metadata, segment_index)
+            self._metadata_segments = segments
+
+        return segments
+
+
+    def _invalidate_time_order(self):
+        """Discards the cached time order, metadata segments and sample grid.
+
+        This must be called when the pings are changed in place, including
+        when ChannelMetadata objects are assigned to channel_metadata.
+        """
+
+        super(RawData, self)._invalidate_time_order()
+        self._metadata_segments = None
+        self._sample_grid_plan = None
+
+
+    def _get_metadata_param(self, param_name, return_indices, dtype='float32'):
+        """Returns the values of a ChannelMetadata parameter for pings.
+
+        The parameter is read once per metadata segment and expanded to the
+        requested pings.  The sa_correction values are looked up in the
+        sa_correction_table of each segment using the pulse length of each
+        ping.  Pings without a ChannelMetadata object get NaN.
+
+        Args:
+            param_name (str): The ChannelMetadata attribute name.
+            return_indices (array): A numpy array of indices to return.
+            dtype (str): Data type
+
+        Raises:
+            ValueError: A pulse length is not in the pulse_length_table.
+
+        Returns:
+            A numpy array with the parameter values of the pings in
+            return_indices.
+        """
+
+        starts, ends, metadata, segment_index = self._get_metadata_segments()
+        ping_segments = segment_index[return_indices]
+        param_data = np.full((return_indices.shape[0]), np.nan, dtype=dtype)
+
+        if param_name == 'sa_correction':
+            # Work through the segments that contain the requested pings and
+            # match the pulse lengths against the segment's table.
+            for segment in np.unique(ping_segments):
+                if not isinstance(metadata[segment], ChannelMetadata):
+                    continue
+                sa_table = np.asarray(metadata[segment].sa_correction_table)
+                pl_table = np.asarray(metadata[segment].pulse_length_table)
+                in_segment = ping_segments == segment
+                matches = np.isclose(self.pulse_length[return_indices[
+                        in_segment]][:, np.newaxis], pl_table[np.newaxis, :])
+                if not np.all(matches.any(axis=1)):
+                    raise ValueError("The pulse length of a ping is not in "
+                                     "the pulse_length_table.")
+                # Argmax returns the first matching table entry.
+                param_data[in_segment] = sa_table[matches.argmax(axis=1)]
+        else:
+            segment_values = np.array([getattr(md, param_name)
+                    if isinstance(md, ChannelMetadata) else np.nan
+                    for md in metadata], dtype=dtype)
+            param_data[:] = segment_values[ping_segments]
+
+        return param_data
+
+
     def insert(self, obj_to_insert, ping_number=None, ping_time=None,
                insert_after=True, index_array=None):
         """Inserts an object.
@@ -889,6 +2736,30 @@ class RawData(PingData):
             reflectivity (float): The reflectivity value that is being inserted
                 (optional).
         """
+        if reflectivity is not None:
+            reflectivity = np.array([reflectivity])
+        self.append_bottom(np.array([detection_time], dtype='datetime64[ms]'),
+                           np.array([detection_depth]),
+                           reflectivity=reflectivity)
+
+
+    def append_bottom(self, detection_times, detection_depths,
+                      reflectivity=None):
+        """Inserts bottom detection depths into the detected_bottom array.
+
+        This is the vectorized form of append_bot.  The detections are
+        matched to the pings with the same ping time using a binary search
+        of the sorted ping times.  Detections that don't match a ping are
+        ignored.  If more than one detection matches a ping, the last one is
+        used.
+
+        Args:
+            detection_times (array): datetime64[ms] array of the times of the
+                detections.
+            detection_depths (array): The detected bottom depths.
+            reflectivity (array): The bottom reflectivity values (optional).
+        """
+
         # Check if the detected_bottom attribute exists and create it if it
         # does not.
         if not hasattr(self, 'detected_bottom'):
@@ -902,13 +2773,34 @@ class RawData(PingData):
                 data = np.full(self.ping_time.shape[0], np.nan)
                 self.add_attribute('bottom_reflectivity', data)
 
-        # Determine the array element associated with this ping and update it
-        # with the detection depth and optional reflectivity.
-        idx_array = self.ping_time == detection_time
-        if np.any(idx_array):
-            self.detected_bottom[idx_array] = detection_depth
-            if reflectivity is not None:
-                self.bottom_reflectivity[idx_array] = reflectivity
+        # Get the sorted ping times.  The arrays may not be trimmed so we
+        # only search the pings that have been added.
+        n_pings = max(self.n_pings, 0)
+        time_order, sorted_times = self._get_time_order()
+        if time_order.shape[0] != n_pings:
+            time_order = np.argsort(self.ping_time[:n_pings], kind='stable')
+            sorted_times = self.ping_time[time_order]
+
+        # Find the range of pings that match each detection.  There is
+        # usually a single ping per detection.
+        first = np.searchsorted(sorted_times, detection_times, side='left')
+        last = np.searchsorted(sorted_times, detection_times, side='right')
+        n_matches = last - first
+        if not np.any(n_matches):
+            return
+
+        # Expand the ranges into the ping and detection indices.
+        detections = np.repeat(np.arange(n_matches.shape[0]), n_matches)
+        match_start = np.cumsum(n_matches) - n_matches
+        pings = time_order[np.repeat(first, n_matches) +
+                           np.arange(detections.shape[0]) -
+                           np.repeat(match_start, n_matches)]
+
+        # Update the pings with the detection depth and optional
+        # reflectivity.  Later detections overwrite earlier ones.
+        self.detected_bottom[pings] = detection_depths[detections]
+        if reflectivity is not None:
+            self.bottom_reflectivity[pings] = reflectivity[detections]
 
 
     def append_ping(self, sample_datagram, start_sample=None, end_sample=None):
@@ -921,13 +2813,13 @@ class RawData(PingData):
         values for the current file.
 
         Managing the data array sizes is the bulk of what this method does. It
-        will either resize the array if rolling == False or roll the array if it
-        is full and rolling == True.
+        will either resize the array if rolling == False or replace the
+        oldest ping if the array is full and rolling == True.
 
         The data arrays will change size in 2 ways:
 
-            Adding pings will add columns (or roll the array if all of the
-            columns are filled and rolling == true.) This can easily be
+            Adding pings will add columns (or replace the oldest ping if all
+            of the columns are filled and rolling == true.) This can easily be
             handled by allocating columns in chunks using the resize method
             of the numpy array and maintaining an index into the *next*
             available column (self.n_pings). Empty pings can be left
@@ -979,9 +2871,12 @@ class RawData(PingData):
         # number of samples in this datagram. In theory the power and angle
         # arrays should always be the same size, but we'll check all to make
         # sure.
-        max_data_samples = max(self.power.shape[1],
-                               self.angles_alongship_e.shape[1],
-                               self.angles_athwartship_e.shape[1])
+        if self.ragged:
+            max_data_samples = self.n_samples
+        else:
+            max_data_samples = max(self.power.shape[1],
+                                   self.angles_alongship_e.shape[1],
+                                   self.angles_athwartship_e.shape[1])
         max_new_samples = max([power_samps, angle_samps])
 
         # Check if we need to truncate the sample data.
@@ -1019,8 +2914,13 @@ class RawData(PingData):
                 # Calculate the new samples dimension.
                 sample_dims = max_new_samples
 
-            # Determine if we resize.
-            if ping_resize or sample_resize:
+            # Determine if we resize.  Ragged objects don't have a sample
+            # dimension, we only track the size of the largest ping.
+            if self.ragged:
+                if ping_resize:
+                    self.resize(ping_dims, self.n_samples)
+                self.n_samples = sample_dims
+            elif ping_resize or sample_resize:
                 self.resize(ping_dims, sample_dims)
 
             # Get an index into the data arrays for this ping and increment
@@ -1029,15 +2929,16 @@ class RawData(PingData):
             self.n_pings += 1
 
         else:
-            # Check if we need to roll.
-            if self.n_pings == ping_dims - 1:
-                # When a rolling array is "filled" we stop incrementing the
-                # ping counter and repeatedly append pings to the last ping
-                # index in the array.
+            # Rolling arrays are ring buffers.  Until they are full, pings
+            # are added to the next free index.  After that, each ping
+            # replaces the oldest ping and we advance the ring head.  Only
+            # the new ping's elements are written.
+            if self.n_pings < ping_dims:
                 this_ping = self.n_pings
-
-                # Roll our array 1 ping.
-                self._roll_arrays(1)
+                self.n_pings += 1
+            else:
+                this_ping = self._ring_head
+                self._ring_head = (self._ring_head + 1) % ping_dims
 
         # Insert the channel_metadata object reference for this ping.
         self.channel_metadata[this_ping] = self.current_metadata
@@ -1048,6 +2949,7 @@ class RawData(PingData):
 
         # Now insert the data into our numpy arrays.
         self.ping_time[this_ping] = sample_datagram['timestamp']
+        self._invalidate_time_order()
         self.transducer_depth[this_ping] = sample_datagram['transducer_depth']
         self.frequency[this_ping] = sample_datagram['frequency']
         self.transmit_power[this_ping] = sample_datagram['transmit_power']
@@ -1081,6 +2983,12 @@ class RawData(PingData):
                 self.sample_count[this_ping] = sample_datagram['count']
                 end_sample = sample_datagram['count']
 
+        # Ragged objects store the samples in the sample buffers.
+        if self.ragged:
+            self._append_ragged_samples(this_ping, sample_datagram,
+                                        start_sample)
+            return
+
         # Now store the 2d "sample" data.  Determine what we need to store
         # based on operational mode.
         # 1 = Power only, 2 = Angle only 3 = Power & Angle
@@ -1089,11 +2997,13 @@ class RawData(PingData):
         if sample_datagram['mode'] != 2 and self.store_power:
 
             # Get the subset of samples we're storing.
-            power = sample_datagram['power'][start_sample:self.sample_count[
-                this_ping]]
+            power = sample_datagram['power'][start_sample:start_sample +
+                    self.sample_count[this_ping]]
 
-            # Convert the indexed power data to power dB.
-            power = power.astype(self.sample_dtype) * self.INDEX2POWER
+            # Convert the indexed power data to power dB unless we're
+            # storing the indexed power.
+            if not self.compact:
+                power = power.astype(self.sample_dtype) * self.INDEX2POWER
 
             # Check if we need to pad or trim our sample data.
             sample_pad = sample_dims - power.shape[0]
@@ -1101,7 +3011,8 @@ class RawData(PingData):
                 # The data array has more samples than this datagram - we
                 # need to pad the datagram.
                 self.power[this_ping,:] = np.pad(power,(0,sample_pad),
-                        'constant', constant_values=np.nan)
+                        'constant',
+                        constant_values=self._get_fill_value(self.power))
             elif sample_pad < 0:
                 # The data array has fewer samples than this datagram - we
                 # need to trim the datagram.
@@ -1115,29 +3026,30 @@ class RawData(PingData):
             # First extract the alongship and athwartship angle data.  The low
             # 8 bits are the athwartship values and the upper 8 bits are
             # alongship.
-            alongship_e = (sample_datagram['angle'][
-                           start_sample:self.sample_count[this_ping]] >>
-                           8).astype('int8')
-            athwartship_e = (sample_datagram['angle'][
-                             start_sample:self.sample_count[this_ping]] &
-                             0xFF).astype('int8')
-
-            # Convert from indexed to electrical angles.
-            alongship_e = alongship_e.astype(self.sample_dtype) * \
-                          self.INDEX2ELEC
-            athwartship_e = athwartship_e.astype(self.sample_dtype) * \
-                            self.INDEX2ELEC
+            angle = sample_datagram['angle'][start_sample:start_sample +
+                    self.sample_count[this_ping]]
+            alongship_e = (angle >> 8).astype('int8')
+            athwartship_e = (angle & 0xFF).astype('int8')
+
+            # Convert from indexed to electrical angles unless we're storing
+            # the indexed angles.
+            if not self.compact:
+                alongship_e = alongship_e.astype(self.sample_dtype) * \
+                              self.INDEX2ELEC
+                athwartship_e = athwartship_e.astype(self.sample_dtype) * \
+                                self.INDEX2ELEC
 
             # Check if we need to pad or trim our sample data.
             sample_pad = sample_dims - athwartship_e.shape[0]
             if sample_pad > 0:
                 # The data array has more samples than this datagram - we
                 # need to pad the datagram
+                fill_value = self._get_fill_value(self.angles_alongship_e)
                 self.angles_alongship_e[this_ping,:] = np.pad(alongship_e,(0,
-                        sample_pad), 'constant', constant_values=np.nan)
+                        sample_pad), 'constant', constant_values=fill_value)
                 self.angles_athwartship_e[this_ping,:] = np.pad(
                     athwartship_e,(0,sample_pad),
-                        'constant', constant_values=np.nan)
+                        'constant', constant_values=fill_value)
             elif sample_pad < 0:
                 # The data array has fewer samples than this datagram - we
                 # need to trim the datagram.
@@ -1150,6 +3062,424 @@ class RawData(PingData):
                 self.angles_athwartship_e[this_ping,:] = athwartship_e
 
 
+    def _append_ragged_samples(self, this_ping, sample_datagram,
+                               start_sample):
+        """Stores the samples of a ping in the sample buffers.
+
+        Args:
+            this_ping (int): The index of the ping.
+            sample_datagram (dict): The parsed RAW datagram.
+            start_sample (int): The first sample to store.
+        """
+
+        # Get the subsets of samples we're storing.
+        end = start_sample + self.sample_count[this_ping]
+        power = None
+        angle = None
+        n_values = 0
+        if sample_datagram['mode'] != 2 and self.store_power:
+            power = sample_datagram['power'][start_sample:end]
+            n_values = power.shape[0]
+        if sample_datagram['mode'] != 1 and self.store_angles:
+            angle = sample_datagram['angle'][start_sample:end]
+            n_values = max(n_values, angle.shape[0])
+
+        # Add the ping's samples to the end of the buffers.
+        values = self._append_to_buffer(n_values)
+        self.buffer_offset[this_ping] = values.start
+        self.buffer_count[this_ping] = n_values
+
+        if power is not None:
+            if not self.compact:
+                power = power.astype(self.sample_dtype) * self.INDEX2POWER
+            self.power[values.start:values.start + power.shape[0]] = power
+
+        if angle is not None:
+            # The upper 8 bits are the alongship values and the low 8 bits
+            # are athwartship.
+            alongship_e = (angle >> 8).astype('int8')
+            athwartship_e = (angle & 0xFF).astype('int8')
+            if not self.compact:
+                alongship_e = alongship_e.astype(self.sample_dtype) * \
+                              self.INDEX2ELEC
+                athwartship_e = athwartship_e.astype(self.sample_dtype) * \
+                                self.INDEX2ELEC
+            angles = slice(values.start, values.start + angle.shape[0])
+            self.angles_alongship_e[angles] = alongship_e
+            self.angles_athwartship_e[angles] = athwartship_e
+
+
+    def append_pings(self, headers, buffer, data_offsets, start_sample=None,
+                     end_sample=None):
+        """Adds a block of pings to the object.
+
+        This is the bulk equivalent of append_ping. Rather than accepting
+        a single parsed datagram it accepts the headers of many RAW0
+        datagrams as a structured array along with the raw bytes of the
+        datagrams (see RawSimradFile.read_raw_block). The arrays are resized
+        once for the block and the sample data are decoded and copied into
+        the power and angle arrays with a few vectorized operations.
+
+        Unlike append_ping, this method does not support rolling arrays.
+
+        Args:
+            headers (array): Structured array of RAW0 datagram headers with
+                the parsers.RAW0_HEADER_DTYPE dtype.
+            buffer (array): uint8 array containing the datagram bytes.
+            data_offsets (array): The index into buffer of the first sample
+                of each datagram.
+            start_sample (int): The first sample to store.
+            end_sample (int): The last sample to store.
+        """
+
+        if self.rolling_array:
+            raise ValueError('append_pings does not support rolling arrays.')
+
+        n_new = headers.shape[0]
+        if n_new == 0:
+            return
+
+        # Determine the number of samples in each ping, truncating to our
+        # max sample number if needed.
+        count = headers['count'].astype('int64')
+        mode = headers['mode']
+        if self.max_sample_number:
+            count_stored = np.minimum(count, self.max_sample_number)
+        else:
+            count_stored = count
+
+        # Do the book keeping if we're storing a subset of samples.
+        if start_sample:
+            sample_offset = np.full(n_new, start_sample, dtype='int64')
+            if end_sample:
+                sample_count = np.full(n_new, end_sample - start_sample + 1,
+                        dtype='int64')
+            else:
+                sample_count = count - start_sample
+        else:
+            start_sample = 0
+            sample_offset = np.zeros(n_new, dtype='int64')
+            if end_sample:
+                sample_count = np.full(n_new, end_sample + 1, dtype='int64')
+            else:
+                sample_count = count
+
+        # Determine the number of samples we will copy from each ping.
+        n_copy = np.minimum(count_stored, start_sample + sample_count) - \
+                 start_sample
+        n_copy = np.clip(n_copy, 0, None)
+
+        # Initialize the data arrays when the first pings are added.
+        if self.n_pings == -1:
+            if self.max_sample_number:
+                number_samples = self.max_sample_number
+            else:
+                number_samples = int(count_stored.max())
+            self._create_arrays(max(self.chunk_width, n_new), number_samples,
+                                n_values=int(n_copy.sum()))
+            self.n_pings = 0
+
+        # Resize our arrays once for the block if needed.
+        ping_dims = self.ping_time.shape[0]
+        sample_dims = self.n_samples
+        max_new_samples = int(count_stored.max())
+        if self.ragged:
+            # Ragged objects only have a ping dimension.
+            if self.n_pings + n_new > ping_dims:
+                self.resize(max(self.n_pings + n_new,
+                                ping_dims + self.chunk_width), sample_dims)
+            self.n_samples = max(sample_dims, max_new_samples)
+        elif self.n_pings + n_new > ping_dims or \
+                max_new_samples > sample_dims:
+            if self.n_pings + n_new > ping_dims:
+                ping_dims = max(self.n_pings + n_new,
+                                ping_dims + self.chunk_width)
+            sample_dims = max(sample_dims, max_new_samples)
+            self.resize(ping_dims, sample_dims)
+
+        # Get an index into the data arrays for this block and increment
+        # our ping counter.
+        pings = slice(self.n_pings, self.n_pings + n_new)
+        self.n_pings += n_new
+
+        # Insert the channel_metadata object reference for these pings and
+        # update the channel_metadata object.
+        self.channel_metadata[pings] = self.current_metadata
+        self.ping_time[pings] = datagram_index.index_times(headers)
+        self._invalidate_time_order()
+        self.current_metadata.end_ping = self.n_pings
+        self.current_metadata.end_time = self.ping_time[self.n_pings - 1]
+
+        # Now insert the header data into our numpy arrays.
+        self.transducer_depth[pings] = headers['transducer_depth']
+        self.frequency[pings] = headers['frequency']
+        self.transmit_power[pings] = headers['transmit_power']
+        self.pulse_length[pings] = headers['pulse_length']
+        self.bandwidth[pings] = headers['bandwidth']
+        self.sample_interval[pings] = headers['sample_interval']
+        self.sound_velocity[pings] = headers['sound_velocity']
+        self.absorption_coefficient[pings] = headers['absorption_coefficient']
+        self.heave[pings] = headers['heave']
+        self.pitch[pings] = headers['pitch']
+        self.roll[pings] = headers['roll']
+        self.temperature[pings] = headers['temperature']
+        self.heading[pings] = headers['heading']
+        self.transmit_mode[pings] = headers['transmit_mode'].astype('uint8')
+        self.sample_offset[pings] = sample_offset
+        self.sample_count[pings] = sample_count
+
+        # Determine the position of the first sample we're storing in the
+        # buffer for each ping. Samples are 2 bytes and the angle samples
+        # follow the power samples when both are present.
+        power_pos = data_offsets + 2 * start_sample
+        angle_pos = power_pos + np.where(mode & 0x1, 2 * count, 0)
+        has_power = (mode & 0x1).astype(bool)
+        has_angle = (mode & 0x2).astype(bool)
+
+        # Ragged objects store the samples of the block end to end in the
+        # sample buffers.
+        if self.ragged:
+            self._append_ragged_block(pings, buffer, power_pos, angle_pos,
+                                      has_power, has_angle, n_copy)
+            return
+
+        # Initialize the sample data for the block.
+        if self.store_power:
+            self.power[pings, :] = self._get_fill_value(self.power)
+        if self.store_angles:
+            fill_value = self._get_fill_value(self.angles_alongship_e)
+            self.angles_alongship_e[pings, :] = fill_value
+            self.angles_athwartship_e[pings, :] = fill_value
+
+        # Pings are copied in groups with the same number of samples. Usually
+        # there is only one group. Within each group the samples are gathered
+        # into a 2d array with a single indexing operation.
+        for n_samples in np.unique(n_copy):
+            if n_samples == 0:
+                continue
+            in_group = n_copy == n_samples
+
+            # Check if we need to store power data.
+            if self.store_power:
+                idx = np.nonzero(in_group & has_power)[0]
+                power = self._gather_samples(buffer, power_pos[idx],
+                                             n_samples, 'int16')
+                if not self.compact:
+                    power = power.astype(self.sample_dtype) * \
+                            self.INDEX2POWER
+                self.power[pings.start + idx, :n_samples] = power
+
+            # Check if we need to store angle data.
+            if self.store_angles:
+                idx = np.nonzero(in_group & has_angle)[0]
+                angle = self._gather_samples(buffer, angle_pos[idx],
+                                             n_samples, 'uint16')
+                # The upper 8 bits are the alongship values and the low 8
+                # bits are athwartship.
+                alongship_e = (angle >> 8).astype('int8')
+                athwartship_e = (angle & 0xFF).astype('int8')
+                if not self.compact:
+                    alongship_e = alongship_e.astype(self.sample_dtype) * \
+                                  self.INDEX2ELEC
+                    athwartship_e = athwartship_e.astype(self.sample_dtype) * \
+                                    self.INDEX2ELEC
+                self.angles_alongship_e[pings.start + idx, :n_samples] = \
+                        alongship_e
+                self.angles_athwartship_e[pings.start + idx, :n_samples] = \
+                        athwartship_e
+
+
+    def _append_ragged_block(self, pings, buffer, power_pos, angle_pos,
+                             has_power, has_angle, n_copy):
+        """Stores the samples of a block of pings in the sample buffers.
+
+        Args:
+            pings (slice): The ping indices of the block.
+            buffer (array): uint8 array containing the datagram bytes.
+            power_pos (array): The index into buffer of the first power
+                sample of each ping.
+            angle_pos (array): The index into buffer of the first angle
+                sample of each ping.
+            has_power (array): True for pings that contain power data.
+            has_angle (array): True for pings that contain angle data.
+            n_copy (array): The number of samples to store for each ping.
+        """
+
+        # Pings without any of the data we're storing don't take up space
+        # in the buffers.
+        stored = np.zeros(n_copy.shape[0], dtype=bool)
+        if self.store_power:
+            stored |= has_power
+        if self.store_angles:
+            stored |= has_angle
+        n_copy = np.where(stored, n_copy, 0)
+
+        # Allocate the block's samples and set the buffer positions of the
+        # pings.
+        values = self._append_to_buffer(int(n_copy.sum()))
+        starts = values.start + np.cumsum(n_copy) - n_copy
+        self.buffer_offset[pings] = starts
+        self.buffer_count[pings] = n_copy
+
+        # Copy the samples in groups of pings with the same number of
+        # samples.
+        for n_samples in np.unique(n_copy):
+            if n_samples == 0:
+                continue
+            in_group = n_copy == n_samples
+
+            if self.store_power:
+                idx = np.nonzero(in_group & has_power)[0]
+                power = self._gather_samples(buffer, power_pos[idx],
+                                             n_samples, 'int16')
+                if not self.compact:
+                    power = power.astype(self.sample_dtype) * \
+                            self.INDEX2POWER
+                self.power[starts[idx, np.newaxis] +
+                           np.arange(n_samples)] = power
+
+            if self.store_angles:
+                idx = np.nonzero(in_group & has_angle)[0]
+                angle = self._gather_samples(buffer, angle_pos[idx],
+                                             n_samples, 'uint16')
+                alongship_e = (angle >> 8).astype('int8')
+                athwartship_e = (angle & 0xFF).astype('int8')
+                if not self.compact:
+                    alongship_e = alongship_e.astype(self.sample_dtype) * \
+                                  self.INDEX2ELEC
+                    athwartship_e = athwartship_e.astype(self.sample_dtype) * \
+                                    self.INDEX2ELEC
+                samples = starts[idx, np.newaxis] + np.arange(n_samples)
+                self.angles_alongship_e[samples] = alongship_e
+                self.angles_athwartship_e[samples] = athwartship_e
+
+
+    @staticmethod
+    def _gather_samples(buffer, positions, n_samples, dtype):
+        """Gathers 2 byte samples from a datagram buffer into a 2d array.
+
+        Args:
+            buffer (array): uint8 array containing the datagram bytes.
+            positions (array): The index into buffer of the first sample of
+                each ping.
+            n_samples (int): The number of samples to gather for each ping.
+            dtype (str): The sample dtype, 'int16' or 'uint16'.
+
+        Returns:
+            An array of shape (len(positions), n_samples).
+        """
+
+        samples = np.empty((positions.shape[0], n_samples), dtype=dtype)
+
+        # Datagrams are not guaranteed to start on a 2 byte boundary so we
+        # view the buffer as 2 byte samples starting at both even and odd
+        # offsets and gather from the appropriate view.
+        for parity in (0, 1):
+            on_parity = (positions % 2) == parity
+            if not np.any(on_parity):
+                continue
+            n_words = (buffer.shape[0] - parity) // 2
+            words = buffer[parity:parity + n_words * 2].view(dtype)
+            start = (positions[on_parity] - parity) // 2
+            samples[on_parity] = words[start[:, np.newaxis] +
+                                       np.arange(n_samples)]
+
+        return samples
+
+
+    def append_raw_data(self, raw_data_objects):
+        """Appends the pings from a list of RawData objects to this object.
+
+        This is used to merge data read from different files into a single
+        RawData object. Unlike PingData.append, the arrays are resized
+        only once and the ChannelMetadata start and end pings of the appended
+        objects are offset to reflect their position in this object. The
+        appended objects' ChannelMetadata objects are modified.
+
+        Args:
+            raw_data_objects (list): A list of RawData objects containing the
+                same channel as this object.
+        """
+
+        # The current metadata is that of the last object.
+        if raw_data_objects:
+            self.current_metadata = raw_data_objects[-1].current_metadata
+
+        # Only objects with data need to be appended.
+        raw_data_objects = [r for r in raw_data_objects if r.n_pings > 0]
+        if not raw_data_objects:
+            return
+        if any([r.ragged != self.ragged for r in raw_data_objects]):
+            raise ValueError('Ragged and rectangular RawData objects cannot '
+                             'be merged.')
+
+        # Determine the size of the merged arrays.
+        n_pings = max(self.n_pings, 0) + sum([r.n_pings for r in
+                                              raw_data_objects])
+        n_samples = max([r.n_samples for r in raw_data_objects])
+
+        # Create or resize our arrays.  The sample buffers of ragged objects
+        # are sized to hold the samples of all of the objects.
+        if self.ragged:
+            n_values = sum([r._buffer_end for r in raw_data_objects])
+            if self.n_pings == -1:
+                self._create_arrays(n_pings, n_samples, n_values=n_values)
+                self.n_pings = 0
+            else:
+                self.resize(n_pings, self.n_samples)
+                self._reserve_buffer(n_values)
+            self.n_samples = max(self.n_samples, n_samples)
+        elif self.n_pings == -1:
+            self._create_arrays(n_pings, n_samples)
+            self.n_pings = 0
+        else:
+            self.resize(n_pings, max(self.n_samples, n_samples))
+
+        for raw_data in raw_data_objects:
+            pings = slice(self.n_pings, self.n_pings + raw_data.n_pings)
+
+            # Offset the ping ranges of this object's ChannelMetadata objects.
+            if self.n_pings > 0:
+                metadata = set(raw_data.channel_metadata[:raw_data.n_pings])
+                metadata.add(raw_data.current_metadata)
+                for channel_metadata in metadata:
+                    channel_metadata.start_ping = self.n_pings + \
+                            max(channel_metadata.start_ping, 0)
+                    channel_metadata.end_ping += self.n_pings
+
+            # Copy the data.
+            for attribute in self._data_attributes:
+                if not hasattr(raw_data, attribute) or not hasattr(self,
+                        attribute):
+                    continue
+                data = getattr(self, attribute)
+                data_to_append = getattr(raw_data, attribute)
+                if data.ndim == 1:
+                    data[pings] = data_to_append[:raw_data.n_pings]
+                elif data.ndim == 2:
+                    data[pings, :] = self._get_fill_value(data)
+                    data[pings, :data_to_append.shape[1]] = \
+                            data_to_append[:raw_data.n_pings, :]
+
+            # Copy the sample buffers of ragged objects and offset the
+            # buffer positions of the copied pings.
+            if self.ragged:
+                values = slice(self._buffer_end,
+                               self._buffer_end + raw_data._buffer_end)
+                for attr_name in ['power', 'angles_alongship_e',
+                                  'angles_athwartship_e']:
+                    if hasattr(self, attr_name) and hasattr(raw_data,
+                            attr_name):
+                        getattr(self, attr_name)[values] = getattr(raw_data,
+                                attr_name)[:raw_data._buffer_end]
+                self.buffer_offset[pings] += self._buffer_end
+                self._buffer_end += raw_data._buffer_end
+
+            self.n_pings += raw_data.n_pings
+
+        self._invalidate_time_order()
+
+
     def get_power(self, **kwargs):
         """Returns a processed data object that contains the power data.
 
@@ -1383,6 +3713,94 @@ class RawData(PingData):
         return p_data
 
 
+    def recalibrate(self, p_data, calibration, new_calibration, **kwargs):
+        """Applies a change of gain, sa correction or beam angle to Sv/Sp.
+
+        The gain, sa_correction and equivalent_beam_angle parameters enter
+        Sv and Sp as a per ping offset in dB:
+
+            Sv_new = Sv - 2 * delta_gain - delta_equivalent_beam_angle -
+                     2 * delta_sa_correction
+
+            Sp_new = Sp - 2 * delta_gain
+
+        This method applies that offset to data returned by get_Sv, get_sv,
+        get_Sp or get_sp instead of recomputing them from power.  This is
+        much faster when evaluating many calibrations of the same data.  All
+        of the other calibration parameters must be the same in both
+        calibrations.
+
+        Args:
+            p_data (ProcessedData): The Sv, sv, Sp or sp data.
+            calibration (calibration object): The calibration object used to
+                create p_data or None if none was used.
+            new_calibration (calibration object): The calibration object to
+                apply to the data.  If None, the parameters are extracted
+                from the raw data.
+            **kwargs: The ping selection keywords (start_time, end_ping,
+                etc.) used to create p_data.
+
+        Raises:
+            ValueError: p_data isn't Sv, sv, Sp or sp data.
+            ValueError: p_data has a different number of pings than the
+                ping selection.
+            ValueError: A calibration parameter other than gain,
+                sa_correction and equivalent_beam_angle changed.
+
+        Returns:
+            A new ProcessedData object with the recalibrated data.
+        """
+
+        if p_data.data_type not in ['Sv', 'sv', 'Sp', 'sp']:
+            raise ValueError("Only Sv, sv, Sp and sp data can be "
+                             "recalibrated.")
+
+        # Get the pings the data were created from.
+        return_indices = self.get_indices(**kwargs)
+        if return_indices.shape[0] != p_data.n_pings:
+            raise ValueError("The ping selection doesn't match the number "
+                             "of pings in the data.")
+
+        # The offset only accounts for these parameters.  Check that the
+        # others are unchanged.
+        offset_parms = ['gain', 'sa_correction', 'equivalent_beam_angle']
+        for param_name in CalibrationParameters()._parms:
+            if param_name in offset_parms:
+                continue
+            old_param = self._get_calibration_param(calibration, param_name,
+                                                    return_indices)
+            new_param = self._get_calibration_param(new_calibration,
+                                                    param_name, return_indices)
+            if not np.array_equal(old_param, new_param, equal_nan=True):
+                raise ValueError("The calibration parameter " + param_name +
+                                 " changed.  The data must be recomputed.")
+
+        # Compute the change of each parameter per ping.
+        delta = {}
+        for param_name in offset_parms:
+            delta[param_name] = (
+                self._get_calibration_param(new_calibration, param_name,
+                                            return_indices).astype('float64') -
+                self._get_calibration_param(calibration, param_name,
+                                            return_indices))
+
+        # Calculate the offset in dB.
+        offset = -2.0 * delta['gain']
+        if p_data.data_type in ['Sv', 'sv']:
+            offset -= delta['equivalent_beam_angle'] + \
+                      2.0 * delta['sa_correction']
+
+        # Apply it to a copy of the data.
+        new_data = p_data.copy()
+        if new_data.is_log:
+            new_data.data += offset[:, np.newaxis].astype(new_data.data.dtype)
+        else:
+            new_data.data *= (10**(offset / 10.0))[:, np.newaxis].astype(
+                    new_data.data.dtype)
+
+        return new_data
+
+
     def get_bottom(self, calibration=None, return_indices=None,
             heave_correct=False, return_depth=False, **kwargs):
         """Gets a echolab2 line object containing the sounder detected bottom
@@ -1598,6 +4016,87 @@ class RawData(PingData):
         return (alongship, athwartship, return_indices)
 
 
+    def _get_sample_values(self, property_name, return_indices):
+        """Returns the sample data of a set of pings in their stored units.
+
+        The data are returned as a new array.  The compact indexed power and
+        angle values are converted to power in dB and electrical angles in
+        degrees with the samples past the sample count of each ping set to
+        NaN.  The samples of ragged
+        objects are returned in an array as tall as the largest of the
+        requested pings.
+
+        Args:
+            property_name (str): The name of the sample data attribute.
+            return_indices (array): The indices of the pings to return.
+
+        Returns:
+            A 2d array of the sample data of the requested pings.
+        """
+
+        data = self._get_sample_array(property_name, return_indices)
+        if not self.compact or data.dtype.kind not in 'iu':
+            return data
+
+        # Find the padding samples past the end of each ping.  Every stored
+        # indexed value is a valid sample so the padding is determined from
+        # the number of samples of each ping, not from the values.
+        if self.ragged:
+            sample_count = self.buffer_count[return_indices]
+        else:
+            sample_count = self.sample_count[return_indices]
+        missing = (np.arange(data.shape[1])[np.newaxis, :] >=
+                   sample_count[:, np.newaxis])
+        if property_name == 'power':
+            scale = self.INDEX2POWER
+        else:
+            scale = self.INDEX2ELEC
+
+        # Convert the indexed values.
+        values = data.astype(self.sample_dtype)
+        values *= scale
+        values[missing] = np.nan
+
+        return values
+
+
+    def _get_sample_array(self, property_name, return_indices):
+        """Returns the stored sample data of a set of pings as a 2d array.
+
+        For ragged objects, the samples of the requested pings are copied
+        from the sample buffers into a rectangular array padded with the
+        fill value.
+
+        Args:
+            property_name (str): The name of the sample data attribute.
+            return_indices (array): The indices of the pings to return.
+
+        Returns:
+            A 2d array of the sample data of the requested pings.
+        """
+
+        data = getattr(self, property_name)
+        if not self.ragged:
+            # Only the requested pings are read from disk backed arrays.
+            return np.asarray(data[return_indices])
+
+        # Determine the size of the array and the position of each sample
+        # in the buffer and the array.
+        offset = self.buffer_offset[return_indices]
+        count = self.buffer_count[return_indices].astype('int64')
+        n_rows = offset.shape[0]
+        n_columns = int(count.max()) if n_rows > 0 else 0
+        output = np.empty((n_rows, n_columns), dtype=data.dtype)
+        output.fill(self._get_fill_value(data))
+
+        rows = np.repeat(np.arange(n_rows), count)
+        starts = np.cumsum(count) - count
+        columns = np.arange(rows.shape[0]) - np.repeat(starts, count)
+        output[rows, columns] = data[np.repeat(offset, count) + columns]
+
+        return output
+
+
     def _get_sample_data(self, property_name, calibration=None,
                          resample_interval=RESAMPLE_SHORTEST,
                          resample_soundspeed=None, return_indices=None,
@@ -1644,18 +4143,6 @@ class RawData(PingData):
             The processed data object containing the sample data.
         """
 
-        def get_range_vector(num_samples, sample_interval, sound_speed,
-                             sample_offset):
-            """
-            get_range_vector returns a NON-CORRECTED range vector.
-            """
-            # Calculate the thickness of samples with this sound speed.
-            thickness = sample_interval * sound_speed / 2.0
-            # Calculate the range vector.
-            range = (np.arange(0, num_samples) + sample_offset) * thickness
-
-            return range
-
         # Check if the user supplied an explicit list of indices to return.
         if isinstance(return_indices, np.ndarray):
             if max(return_indices) > self.ping_time.shape[0]:
@@ -1673,25 +4160,136 @@ class RawData(PingData):
         # Populate it with time and ping number.
         p_data.ping_time = self.ping_time[return_indices].copy()
 
-        # Get a reference to the data we're operating on.
+        # Get the data we're operating on.
         if hasattr(self, property_name):
-            data = getattr(self, property_name)
+            data = self._get_sample_values(property_name, return_indices)
         else:
             raise AttributeError("The attribute name " + property_name +
                                  " does not exist.")
 
-        # Populate the calibration parameters required for this method.
-        # First, create a dict with key names that match the attributes names
-        # of the calibration parameters we require for this method.
-        cal_parms = {'sample_interval':None,
-                     'sound_velocity':None,
-                     'sample_offset':None}
+        # Get the sample grid of these pings.  The grid is computed once for
+        # a set of pings and calibration and shared by all of the products.
+        plan = self._get_sample_grid_plan(calibration, return_indices)
+        grid = self._get_sample_grid(plan, resample_interval, data.shape[1])
 
-        # Next, iterate through the dictionary calling the method to extract
-        # the values for each parameter.
-        for key in cal_parms:
-            cal_parms[key] = self._get_calibration_param(calibration, key,
-                                                         return_indices)
+        if grid['resample'] is not None:
+            # There are at least 2 different sample intervals in the data.  We
+            # must resample the data.  We'll deal with adjusting sample offsets
+            # here too.
+            output = self._apply_resample_plan(data, grid['resample'],
+                    is_power=property_name == 'power')
+        elif grid['shift'] is not None:
+            # We have multiple sample offsets so we need to shift some of
+            # the samples.
+            output = self._vertical_shift(data, *grid['shift'])
+        else:
+            # The data all have the same sample intervals and sample
+            # offsets.  Simply use the data as is.
+            output = data
+
+        # Interpolate the pings with other sound speeds to the range of the
+        # most common sound speed.  Pings that share a sound speed share the
+        # fractional source sample index of each output sample so they are
+        # linearly interpolated as one block.
+        for pings_to_interp, index_0, index_1, weight in grid['regrid']:
+            # Compute a + (b - a) * weight in place.
+            ping_data = output[pings_to_interp]
+            lower = ping_data[:, index_0]
+            upper = ping_data[:, index_1]
+            upper -= lower
+            upper *= weight
+            lower += upper
+            output[pings_to_interp] = lower
+
+        # Assign the results to the "data" ProcessedData object.
+        p_data.add_attribute('data', output)
+
+        # Now assign range, sound_velocity, sample thickness and offset to
+        # the ProcessedData object.
+        p_data.add_attribute('range', grid['range'].copy())
+        p_data.sound_velocity = grid['sound_velocity']
+        p_data.sample_thickness = grid['sample_thickness']
+        p_data.sample_offset = grid['min_sample_offset']
+
+        # Return the ProcessedData object containing the requested data.
+        return p_data, return_indices
+
+
+    def _get_sample_grid_plan(self, calibration, return_indices):
+        """Returns the sample grid plan of a set of pings and calibration.
+
+        The sample interval, sound velocity, sample offset and sample count
+        of the pings are extracted on every call.  The plan of the most
+        recent values is cached and reused while they are unchanged so the
+        plan stays valid when the data or the calibration are edited in
+        place.  Only the geometry of the sample grid is cached; the values
+        used to convert the samples are always read from the calibration
+        object or raw data.
+
+        Args:
+            calibration (calibration object): The data calibration object.
+            return_indices (array): The indices of the pings.
+
+        Returns:
+            A SampleGridPlan object.
+        """
+
+        # Get the calibration parameters that define the sample grid.
+        geometry = []
+        for key in ['sample_interval', 'sound_velocity', 'sample_offset']:
+            geometry.append(self._get_calibration_param(calibration, key,
+                                                        return_indices))
+        geometry.append(self.sample_count[return_indices])
+
+        plan = getattr(self, '_sample_grid_plan', None)
+        if plan is None or not plan.matches(*geometry):
+            plan = SampleGridPlan(*geometry)
+            self._sample_grid_plan = plan
+
+        return plan
+
+
+    def _get_sample_grid(self, plan, resample_interval, n_samples):
+        """Returns the sample grid of the pings of a plan.
+
+        The sample grid describes how the sample data of the pings are
+        resampled, shifted and regridded onto a common range and is cached
+        in the plan by resample interval and number of samples.
+
+        Args:
+            plan (SampleGridPlan): The plan of the pings.
+            resample_interval (int): The interval used to resample the data.
+            n_samples (int): The number of samples in the sample data of the
+                pings.
+
+        Returns:
+            A dictionary with the resample plan (or None), the arguments to
+            _vertical_shift (or None), the list of (pings, index_0, index_1,
+            weight) sound speed regridding groups, the range vector, the
+            sound velocity, the sample thickness and the minimum sample
+            offset.
+        """
+
+        grid = plan.grids.get((resample_interval, n_samples))
+        if grid is not None:
+            return grid
+
+        def get_range_vector(num_samples, sample_interval, sound_speed,
+                             sample_offset):
+            """
+            get_range_vector returns a NON-CORRECTED range vector.
+            """
+            # Calculate the thickness of samples with this sound speed.
+            thickness = sample_interval * sound_speed / 2.0
+            # Calculate the range vector.
+            range = (np.arange(0, num_samples) + sample_offset) * thickness
+
+            return range
+
+        # Get the calibration parameters required for this method.
+        cal_parms = {'sample_interval': plan.sample_interval,
+                     'sound_velocity': plan.sound_velocity,
+                     'sample_offset': plan.sample_offset}
 
         # Check if we have multiple sample offset values and get the minimum.
         unique_sample_offsets = np.unique(
@@ -1702,88 +4300,81 @@ class RawData(PingData):
         unique_sample_interval = np.unique(
             cal_parms['sample_interval'][~np.isnan(
                 cal_parms['sample_interval'])])
+        resample = None
+        shift = None
         if unique_sample_interval.shape[0] > 1:
-            # There are at least 2 different sample intervals in the data.  We
-            # must resample the data.  We'll deal with adjusting sample offsets
-            # here too.
-            (output, sample_interval) = self._vertical_resample(data[
-                                                            return_indices],
-                    cal_parms['sample_interval'], unique_sample_interval,
-                                                            resample_interval,
+            # There are at least 2 different sample intervals in the data.
+            resample = self._get_resample_plan(cal_parms['sample_interval'],
+                    unique_sample_interval, resample_interval,
                     cal_parms['sample_offset'], min_sample_offset,
-                                            is_power=property_name == 'power')
+                    plan.sample_count, n_samples)
+            sample_interval = resample[0]
+            n_output = resample[2]
         else:
             # We don't have to resample, but check if we need to shift any
             # samples based on their sample offsets.
+            n_output = n_samples
             if unique_sample_offsets.shape[0] > 1:
-                # We have multiple sample offsets so we need to shift some of
-                # the samples.
-                output = self._vertical_shift(data[return_indices],
-                        cal_parms['sample_offset'], unique_sample_offsets,
-                                              min_sample_offset)
-            else:
-                # The data all have the same sample intervals and sample
-                # offsets.  Simply copy the data as is.
-                output = data[return_indices].copy()
+                shift = (cal_parms['sample_offset'], unique_sample_offsets,
+                         min_sample_offset)
+                n_output = int(n_samples + max(cal_parms['sample_offset']) -
+                               min_sample_offset)
 
             # Get the sample interval value to use for range conversion below.
             sample_interval = unique_sample_interval[0]
 
-        # Check if we have a fixed sound speed.
-        unique_sound_velocity = np.unique(cal_parms['sound_velocity'])
+        # Check if we have a fixed sound speed.  Group the pings by sound
+        # speed in a single pass.
+        unique_sound_velocity, speed_group, speed_counts = np.unique(
+                cal_parms['sound_velocity'], return_inverse=True,
+                return_counts=True)
+        regrid = []
         if unique_sound_velocity.shape[0] > 1:
             # There are at least 2 different sound speeds in the data or
             # provided calibration data.  Interpolate all data to the most
-            # common range (which is the most common sound speed).
-            sound_velocity = None
-            n = 0
-            for speed in unique_sound_velocity:
-                # Determine the sound speed with the most pings.
-                if np.count_nonzero(cal_parms['sound_velocity'] == speed) > n:
-                   sound_velocity = speed
+            # common range (which is the most common sound speed).  Pings
+            # without a sound speed are left as is.
+            speed_counts[np.isnan(unique_sound_velocity)] = 0
+            sound_velocity = unique_sound_velocity[np.argmax(speed_counts)]
+            speed_group = speed_group.ravel()
+            group_pings = np.split(np.argsort(speed_group, kind='stable'),
+                                   np.cumsum(np.bincount(speed_group))[:-1])
 
             # Calculate the target range.
-            range = get_range_vector(
-                output.shape[1], sample_interval, sound_velocity,
-                min_sample_offset)
-
-            # Get an array of indexes in the output array to interpolate.
-            pings_to_interp = np.where(cal_parms['sound_velocity'] !=
-                                       sound_velocity)[0]
-
-            # Iterate through this list of pings to change.  Interpolating each
-            # ping.
-            for ping in pings_to_interp:
-                # Resample using the provided sound speed.
-                resample_range = get_range_vector(output.shape[1],
-                                                  sample_interval,
-                        cal_parms['sound_velocity'][ping], min_sample_offset)
-
-                output[ping,:] = np.interp(range, resample_range, output[
-                                                                  ping, :])
-
+            range = get_range_vector(n_output, sample_interval,
+                                     sound_velocity, min_sample_offset)
+
+            # Compute the fractional source sample index of each output
+            # sample for each of the other sound speeds.  The indices are
+            # clipped to the source samples which matches np.interp.
+            for speed, pings_to_interp in zip(unique_sound_velocity,
+                                              group_pings):
+                if speed == sound_velocity or np.isnan(speed):
+                    continue
+                thickness = sample_interval * speed / 2.0
+                sample_index = np.clip(range / thickness - min_sample_offset,
+                                       0, n_output - 1)
+                index_0 = np.floor(sample_index).astype(np.intp)
+                index_1 = np.minimum(index_0 + 1, n_output - 1)
+                weight = (sample_index - index_0).astype(self.sample_dtype)
+                regrid.append((pings_to_interp, index_0, index_1, weight))
         else:
             # We have a fixed sound speed and only need to calculate a single
             # range vector.
             sound_velocity = unique_sound_velocity[0]
-            range = get_range_vector(output.shape[1], sample_interval,
+            range = get_range_vector(n_output, sample_interval,
                     sound_velocity, min_sample_offset)
 
-        # Assign the results to the "data" ProcessedData object.
-        p_data.add_attribute('data', output)
-
-        # Calculate the sample thickness.
-        sample_thickness = sample_interval * sound_velocity / 2.0
-
-        # Now assign range, sound_velocity, sample thickness and offset to
-        # the ProcessedData object.
-        p_data.add_attribute('range', range)
-        p_data.sound_velocity = sound_velocity
-        p_data.sample_thickness = sample_thickness
-        p_data.sample_offset = min_sample_offset
+        grid = {'resample': resample,
+                'shift': shift,
+                'regrid': regrid,
+                'range': range,
+                'sound_velocity': sound_velocity,
+                'sample_thickness': sample_interval * sound_velocity / 2.0,
+                'min_sample_offset': min_sample_offset}
+        plan.grids[(resample_interval, n_samples)] = grid
 
-        # Return the ProcessedData object containing the requested data.
-        return p_data, return_indices
+        return grid
 
 
     def _convert_power(
@@ -1840,46 +4431,38 @@ class RawData(PingData):
             gains = 10 * np.log10((cal_parms['transmit_power'] * (10**(
                 cal_parms['gain']/10.0))**2 * wavelength**2) / (16 * np.pi**2))
 
-        # Get the range for TVG calculation.  If tvg_correction = True, we
-        # will apply a correction to the range of 2 * sample thickness. The
-        # corrected range is also used for absorption calculations. A
-        # corrected range should be used to calculate when converting Power
-        # to Sv/sv.
+        # Get the range and time varied gain for TVG calculation.  If
+        # tvg_correction = True, we will apply a correction to the range of 2
+        # * sample thickness.  The corrected range is also used for
+        # absorption calculations.  A corrected range should be used to
+        # calculate when converting Power to Sv/sv.  These terms only depend
+        # on the range vector so they are cached.
         if tvg_correction:
-            c_range = power_data.range.copy() - (self.TVG_CORRECTION *
-                                                 power_data.sample_thickness)
-            c_range[c_range < 0] = 0
+            n_correction = self.TVG_CORRECTION
         else:
-            c_range = power_data.range
-
-        # Calculate time varied gain.
-        tvg = c_range.copy()
-        tvg[tvg <= 0] = 1
+            n_correction = 0
         if convert_to in ['sv','Sv']:
-            tvg[:] = 20.0 * np.log10(tvg)
+            tvg_factor = 20.0
         else:
-            tvg[:] = 40.0 * np.log10(tvg)
-        tvg[tvg < 0] = 0
-
-        # Calculate absorption.  This is the outer product of our corrected
-        # range and 2 * absorption_coefficient.  We'll use this for our output
-        # array to minimize the arrays we're creating.
-        data = np.outer(2.0 * cal_parms['absorption_coefficient'], c_range)
-
-        # Add in power and TVG.
-        data += power_data.data + tvg
-
-        # Subtract the applied gains.
-        data -= gains[:, np.newaxis]
+            tvg_factor = 40.0
+        c_range, tvg = power_conversion.range_terms(
+                power_data.range.shape[0], power_data.sample_thickness,
+                power_data.sample_offset, n_correction, tvg_factor)
 
         # Apply sa correction for Sv/sv.
         if convert_to in ['sv','Sv']:
-            data -= (2.0 * cal_parms['sa_correction'])[:, np.newaxis]
-
-        # Check if we're returning linear or log values.
-        if linear:
-            # Convert to linear units (use [:] to operate in-place).
-            data[:] = 10**(data / 10.0)
+            gains += 2.0 * cal_parms['sa_correction']
+
+        # Add the power, TVG and absorption (the outer product of our
+        # corrected range and 2 * absorption_coefficient) and subtract the
+        # gains.  The conversion is done in place in blocks of pings.  The
+        # power data are always a new array so we can use them for the
+        # output.
+        data = power_data.data
+        if data.dtype.kind != 'f' or not data.flags.writeable:
+            data = data.astype(self.sample_dtype)
+        power_conversion.convert_power(data, tvg, c_range,
+                cal_parms['absorption_coefficient'], gains, linear=linear)
 
         # Return the result.
         return data
@@ -1999,9 +4582,9 @@ class RawData(PingData):
                     # It is an array that is the wrong shape.
                     raise ValueError("The calibration parameter array " +
                                      param_name + " is the wrong length.")
-            # It is not an array.  Check if it is a scalar int or float.
-            elif type(param) == int or type(param) == float or type(param) ==\
-                    np.float64:
+            # It is not an array.  Check if it is a scalar int or float,
+            # including numpy scalars.
+            elif isinstance(param, (int, float, np.number)):
 
                     param_data = np.empty((return_indices.shape[0]),
                                               dtype=dtype)
@@ -2025,38 +4608,16 @@ class RawData(PingData):
                 param_data = self_param[return_indices]
             except:
                 # It is not a direct property, so it must be in the
-                # channel_metadata object.  Create the return array.
-                param_data = np.empty((return_indices.shape[0]), dtype=dtype)
-                # Create a counter to use to index the return array. We can't
-                # use the index value from return_indices since these values
-                # may be re-ordered.
-                ret_idx = 0
-                # Populate with the data found in the channel_metadata objects.
-
-                for idx in return_indices:
-                    # Dig out sa_correction from the table.
-                    if isinstance(self.channel_metadata[idx],
-                                  ChannelMetadata):
-                        if param_name == 'sa_correction':
-                            sa_table = getattr(self.channel_metadata[idx],
-                                               'sa_correction_table')
-                            pl_table = getattr(self.channel_metadata[idx],
-                                               'pulse_length_table')
-                            param_data[ret_idx] = sa_table[
-                                np.where(np.isclose(
-                                    pl_table, self.pulse_length[idx]))[0]][0]
-                        else:
-                            param_data[ret_idx] = getattr(
-                                self.channel_metadata[idx], param_name)
-                    else:
-                        param_data[ret_idx] = np.nan
-                    # Increment the index counter.
-                    ret_idx += 1
+                # channel_metadata objects.  Expand it from the metadata
+                # segments.
+                param_data = self._get_metadata_param(param_name,
+                                                      return_indices, dtype)
 
         return param_data
 
 
-    def _create_arrays(self, n_pings, n_samples, initialize=False):
+    def _create_arrays(self, n_pings, n_samples, initialize=False,
+                       n_values=None):
         """Initializes RawData data arrays.
 
         This is an internal method. Note that all "data" arrays must be numpy
@@ -2066,11 +4627,16 @@ class RawData(PingData):
             n_pings (int): Number of pings.
             n_samples (int): Number of samples.
             initialize (bool): Set to True to initialize arrays.
+            n_values (int): The size of the sample buffers of ragged objects.
+                If None, the buffers are sized to hold n_pings * n_samples
+                samples.
         """
 
         # First, create uninitialized arrays.
         self.ping_time = np.empty((n_pings), dtype='datetime64[ms]')
         self.channel_metadata = np.empty((n_pings), dtype='object')
+        self._metadata_segments = None
+        self._sample_grid_plan = None
         self.transducer_depth = np.empty((n_pings), np.float32)
         self.frequency = np.empty((n_pings), np.float32)
         self.transmit_power = np.empty((n_pings), np.float32)
@@ -2087,17 +4653,41 @@ class RawData(PingData):
         self.transmit_mode = np.empty((n_pings), np.uint8)
         self.sample_offset =  np.empty((n_pings), np.uint32)
         self.sample_count = np.empty((n_pings), np.uint32)
-        if self.store_power:
-            self.power = np.empty(
-                (n_pings, n_samples),
-                dtype=self.sample_dtype, order='C')
+        # Compact objects store the indexed power and angles.
+        if self.compact:
+            power_dtype = 'int16'
+            angle_dtype = 'int8'
+        else:
+            power_dtype = self.sample_dtype
+            angle_dtype = self.sample_dtype
+
+        # Ragged objects store the samples in 1d buffers and the buffer
+        # position of each ping.
+        if self.ragged:
+            if n_values is None:
+                n_values = n_pings * n_samples
+            self.buffer_offset = np.empty((n_pings), np.int64)
+            self.buffer_count = np.empty((n_pings), np.uint32)
+            self._buffer_end = 0
+            if self.store_power:
+                self.power = self._allocate_sample_array('power',
+                        (n_values,), power_dtype)
+            if self.store_angles:
+                self.angles_alongship_e = self._allocate_sample_array(
+                        'angles_alongship_e', (n_values,), angle_dtype)
+                self.angles_athwartship_e = self._allocate_sample_array(
+                        'angles_athwartship_e', (n_values,), angle_dtype)
+            self.n_samples = n_samples
+        elif self.store_power:
+            self.power = self._allocate_sample_array('power',
+                    (n_pings, n_samples), power_dtype)
             self.n_samples = n_samples
 
-        if self.store_angles:
-            self.angles_alongship_e = np.empty(
-                (n_pings, n_samples), dtype=self.sample_dtype, order='C')
-            self.angles_athwartship_e = np.empty(
-                (n_pings, n_samples), dtype=self.sample_dtype, order='C')
+        if self.store_angles and not self.ragged:
+            self.angles_alongship_e = self._allocate_sample_array(
+                    'angles_alongship_e', (n_pings, n_samples), angle_dtype)
+            self.angles_athwartship_e = self._allocate_sample_array(
+                    'angles_athwartship_e', (n_pings, n_samples), angle_dtype)
             self.n_samples = n_samples
 
         # Check if we should initialize them.
@@ -2120,11 +4710,15 @@ class RawData(PingData):
             self.transmit_mode.fill(0)
             self.sample_offset.fill(0)
             self.sample_count.fill(0)
+            if self.ragged:
+                self.buffer_offset.fill(0)
+                self.buffer_count.fill(0)
             if self.store_power:
-                self.power.fill(np.nan)
+                self.power.fill(self._get_fill_value(self.power))
             if self.store_angles:
-                self.angles_alongship_e.fill(np.nan)
-                self.angles_athwartship_e.fill(np.nan)
+                fill_value = self._get_fill_value(self.angles_alongship_e)
+                self.angles_alongship_e.fill(fill_value)
+                self.angles_athwartship_e.fill(fill_value)
 
 
     def __str__(self):
@@ -2152,11 +4746,14 @@ class RawData(PingData):
             msg = msg + "             data end time: " + str(
                 self.ping_time[n_pings-1]) + "\n"
             msg = msg + "           number of pings: " + str(n_pings) + "\n"
-            if self.store_power:
+            if self.ragged:
+                msg = msg + ("       sample buffer length: " +
+                             str(self._buffer_end) + "\n")
+            elif self.store_power:
                 n_pings,n_samples = self.power.shape
                 msg = msg + ("    power array dimensions: (" + str(n_pings) +
                              "," + str(n_samples) + ")\n")
-            if self.store_angles:
+            if self.store_angles and not self.ragged:
                 n_pings,n_samples = self.angles_alongship_e.shape
                 msg = msg + ("    angle array dimensions: (" + str(n_pings) +
                              "," + str(n_samples) + ")\n")
@@ -2341,40 +4938,17 @@ class CalibrationParameters(object):
                 param_data = raw_param[return_indices].copy()
             except:
                 # It is not a direct property so it must be in the
-                # ChannelMetadata object.  Create the return array.
-                param_data = np.empty((return_indices.shape[0]))
-                # Create a counter to use to index the return array. We can't
-                # use the index value from return_indices since these values
-                # may be re-ordered.
-                ret_idx = 0
-                # Then populate with the data found in the ChannelMetadata
-                # objects.
-
-                for idx in return_indices:
-                    # Dig out sa_correction from the table.
-                    if isinstance(raw_data.channel_metadata[idx],
-                                   ChannelMetadata):
-                        if param_name == 'sa_correction':
-                            sa_table = getattr(raw_data.channel_metadata[
-                                                   idx], 'sa_correction_table')
-                            pl_table = getattr(raw_data.channel_metadata[
-                                                   idx], 'pulse_length_table')
-                            param_data[ret_idx] = sa_table[np.where(
-                                np.isclose(pl_table, raw_data.pulse_length[
-                                    idx]))[0]][0]
-                        else:
-                            param_data[ret_idx] = getattr(
-                                self.channel_metadata[idx], param_name)
-                    else:
-                        param_data[ret_idx] = np.nan
-                    # Increment the index counter
-                    ret_idx += 1
+                # ChannelMetadata objects.  Expand it from the metadata
+                # segments of raw_data.
+                param_data = raw_data._get_metadata_param(param_name,
+                        return_indices, dtype='float64')
 
             # Check if we can collapse the vector - if all the values are the
             # same, we set the parameter to a scalar value.
             if np.all(np.isclose(param_data, param_data[0])):
-                # This parameter's values are all the same.
-                param_data = param_data[0]
+                # This parameter's values are all the same.  Store it as a
+                # python float.
+                param_data = float(param_data[0])
 
             # Update the attribute.
             setattr(self, param_name, param_data)
@@ -2386,3 +4960,111 @@ class CalibrationParameters(object):
         """
         pass
 
+
+class SampleGridPlan(object):
+    """Cached sample grid geometry of a set of pings.
+
+    The RawData get_power, get_Sv, get_Sp and angle methods place the sample
+    data of the requested pings on a common grid.  This requires analyzing
+    the sample intervals, offsets and sound speeds of the pings and
+    computing the resampling and regridding of the samples and the range
+    vector.  A SampleGridPlan stores the results for a set of sample grid
+    parameters so that the products of the same pings share them.
+
+    A plan only depends on the values of the parameters it was created for,
+    not on where they came from.  Plans are created and cached by
+    RawData._get_sample_grid_plan which checks them against the current
+    values of the pings on every call.
+
+    Attributes:
+        sample_interval (array): The sample interval of each ping.
+        sound_velocity (array): The sound velocity of each ping.
+        sample_offset (array): The sample offset of each ping.
+        sample_count (array): The sample count of each ping.
+        grids (dict): The sample grids by (resample interval, number of
+            samples).
+    """
+
+    def __init__(self, sample_interval, sound_velocity, sample_offset,
+                 sample_count):
+        """Initializes a new SampleGridPlan.
+
+        Args:
+            sample_interval (array): The sample interval of each ping.
+            sound_velocity (array): The sound velocity of each ping.
+            sample_offset (array): The sample offset of each ping.
+            sample_count (array): The sample count of each ping.
+        """
+
+        # Store read only copies so the plan can't be changed through the
+        # arrays that were passed in.
+        self.sample_interval = self._frozen(sample_interval)
+        self.sound_velocity = self._frozen(sound_velocity)
+        self.sample_offset = self._frozen(sample_offset)
+        self.sample_count = self._frozen(sample_count)
+        self.grids = {}
+
+
+    def matches(self, sample_interval, sound_velocity, sample_offset,
+                sample_count):
+        """Returns True if this plan is for the sample grid parameters.
+
+        Args:
+            sample_interval (array): The sample interval of each ping.
+            sound_velocity (array): The sound velocity of each ping.
+            sample_offset (array): The sample offset of each ping.
+            sample_count (array): The sample count of each ping.
+        """
+
+        return (self._equal(sample_interval, self.sample_interval) and
+                self._equal(sound_velocity, self.sound_velocity) and
+                self._equal(sample_offset, self.sample_offset) and
+                self._equal(sample_count, self.sample_count))
+
+
+    @staticmethod
+    def _frozen(values):
+        """Returns a read only 1d copy of an array."""
+
+        values = np.array(values, ndmin=1)
+        values.flags.writeable = False
+
+        return values
+
+
+    @staticmethod
+    def _equal(values, plan_values):
+        """Returns True if an array equals a plan array.  NaNs are equal."""
+
+        values = np.asarray(values)
+        if values.shape != plan_values.shape:
+            return False
+        equal = values == plan_values
+        if values.dtype.kind == 'f':
+            equal |= np.isnan(values) & np.isnan(plan_values)
+
+        return bool(np.all(equal))
+
+
+def _read_raw_file(args):
+    """Reads a single .raw file into a new EK60 object.
+
+    This is the worker function used by EK60._read_raw_parallel. It must be
+    defined at the module level so it can be pickled.
+
+    Args:
+        args (tuple): A tuple containing the full path to the file and a
+            dictionary of EK60 read properties (see EK60._read_options).
+
+    Returns:
+        An EK60 object containing the data from the file.
+    """
+
+    filename, options = args
+
+    reader = EK60()
+    for name, value in options.items():
+        setattr(reader, name, value)
+    reader.read_raw(filename)
+
+    return reader
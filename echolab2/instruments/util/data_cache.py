@@ -0,0 +1,303 @@
+# coding=utf-8
+
+#     National Oceanic and Atmospheric Administration (NOAA)
+#     Alaskan Fisheries Science Center (AFSC)
+#     Resource Assessment and Conservation Engineering (RACE)
+#     Midwater Assessment and Conservation Engineering (MACE)
+
+#  THIS SOFTWARE AND ITS DOCUMENTATION ARE CONSIDERED TO BE IN THE PUBLIC DOMAIN
+#  AND THUS ARE AVAILABLE FOR UNRESTRICTED PUBLIC USE. THEY ARE FURNISHED "AS IS."
+#  THE AUTHORS, THE UNITED STATES GOVERNMENT, ITS INSTRUMENTALITIES, OFFICERS,
+#  EMPLOYEES, AND AGENTS MAKE NO WARRANTY, EXPRESS OR IMPLIED, AS TO THE USEFULNESS
+#  OF THE SOFTWARE AND DOCUMENTATION FOR ANY PURPOSE. THEY ASSUME NO RESPONSIBILITY
+#  (1) FOR THE USE OF THE SOFTWARE AND DOCUMENTATION; OR (2) TO PROVIDE TECHNICAL
+#  SUPPORT TO USERS.
+
+'''
+.. module:: echolab2.instruments.util.data_cache
+
+    :synopsis:  Persistent cache of decoded raw file data
+
+    The cache stores the decoded contents of a raw file (the RawData
+    arrays, ChannelMetadata and NMEA data read from the file) so later
+    reads of the file can skip parsing it. Cache entries are keyed by the
+    path, size and modification time of the raw file, by the reader
+    options that change the decoded data and by a fingerprint of the
+    echolab2 source code, so modifying the file, changing the options or
+    updating echolab2 results in a cache miss.
+
+    Each entry is a single numpy .npz file in the cache directory holding
+    a set of named arrays and a JSON encoded dictionary of the other
+    values. Entries are loaded with allow_pickle=False so loading an entry
+    never runs code from the cache directory. The objects are rebuilt from
+    the arrays and values by the caller. Entries are touched when they are
+    loaded and the least recently used entries are deleted when the total
+    size of the cache exceeds a limit.
+
+| Maintained by:
+|       Rick Towler   <rick.towler@noaa.gov>
+
+$Id$
+'''
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import numpy as np
+
+__all__ = ['CACHE_VERSION', 'cache_path', 'load_cached', 'save_cached',
+           'evict', 'encode_value', 'decode_value']
+
+log = logging.getLogger(__name__)
+
+#: Version of the cache layout. Entries with a different version are ignored.
+CACHE_VERSION = 2
+
+#: Extension of the cache entry files.
+CACHE_EXTENSION = '.ek60cache'
+
+#  The name of the array holding the JSON encoded values in an entry.
+_VALUES_NAME = '__values__'
+
+#  The fingerprint of the echolab2 source. See _source_key.
+_source_hash = None
+
+
+def _source_key():
+    '''
+    Returns a fingerprint of the echolab2 source code. The classes rebuilt
+    from cache entries are defined there, so entries written by a different
+    version of the code are not loaded.
+    '''
+
+    global _source_hash
+    if _source_hash is None:
+        package_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+                os.path.abspath(__file__))))
+        source_hash = hashlib.sha1()
+        for path, dirs, files in sorted(os.walk(package_dir)):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    with open(os.path.join(path, name), 'rb') as fid:
+                        source_hash.update(fid.read())
+        _source_hash = source_hash.hexdigest()
+
+    return _source_hash
+
+
+def encode_value(value):
+    '''
+    :param value: The value to encode
+    :type value: None, bool, int, float, str, list, tuple, dict, numpy
+        scalar, datetime64 or (non object) ndarray
+
+    Returns a JSON serializable version of value. numpy arrays and
+    datetime64 values are encoded as tagged dictionaries that are restored
+    by decode_value. Dictionary keys must be strings.
+    '''
+
+    if isinstance(value, np.ndarray):
+        return {'__ndarray__': value.tolist(), 'dtype': value.dtype.str}
+    elif isinstance(value, np.datetime64):
+        return {'__datetime64__': str(value),
+                'unit': np.datetime_data(value.dtype)[0]}
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif isinstance(value, (list, tuple)):
+        return [encode_value(x) for x in value]
+    elif isinstance(value, dict):
+        return dict([(key, encode_value(x)) for key, x in value.items()])
+    else:
+        return value
+
+
+def decode_value(value):
+    '''
+    :param value: A value returned by encode_value (after a JSON round trip)
+
+    Returns the value encoded by encode_value. Tuples are returned as lists.
+    '''
+
+    if isinstance(value, dict):
+        if '__ndarray__' in value:
+            return np.array(value['__ndarray__'], dtype=value['dtype'])
+        elif '__datetime64__' in value:
+            return np.datetime64(value['__datetime64__'], value['unit'])
+        return dict([(key, decode_value(x)) for key, x in value.items()])
+    elif isinstance(value, list):
+        return [decode_value(x) for x in value]
+    else:
+        return value
+
+
+def cache_path(filename, options, cache_dir):
+    '''
+    :param filename: Full path to the raw file
+    :type filename: str
+
+    :param options: The reader options that change the decoded data
+    :type options: dict
+
+    :param cache_dir: The cache directory
+    :type cache_dir: str
+
+    Returns the path of the cache entry for filename read with options.
+    '''
+
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+
+    #  The key covers the file's identity and contents (by size and
+    #  modification time), the options, in a stable order, and the version
+    #  of the code that decoded the file.
+    key = repr((CACHE_VERSION, _source_key(), filename, stat.st_size,
+                stat.st_mtime, sorted(options.items())))
+    key_hash = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+    return os.path.join(cache_dir, '%s.%s%s' % (os.path.basename(filename),
+                        key_hash, CACHE_EXTENSION))
+
+
+def load_cached(filename, options, cache_dir):
+    '''
+    :param filename: Full path to the raw file
+    :type filename: str
+
+    :param options: The reader options that change the decoded data
+    :type options: dict
+
+    :param cache_dir: The cache directory
+    :type cache_dir: str
+
+    Returns a tuple (arrays, values) of the dictionary of arrays and the
+    dictionary of values stored for filename or None if the file is not in
+    the cache or the entry can't be read.
+    '''
+
+    path = cache_path(filename, options, cache_dir)
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        #  Entries only contain plain arrays so they are loaded without
+        #  unpickling anything.
+        with np.load(path, allow_pickle=False) as entry:
+            arrays = dict([(name, entry[name]) for name in entry.files])
+        values = json.loads(str(arrays.pop(_VALUES_NAME)))
+        if values.get('version') != CACHE_VERSION:
+            return None
+        values = decode_value(values['values'])
+    except Exception as e:
+        log.warning('Unable to load cache entry %s: %s', path, e)
+        return None
+
+    #  Update the modification time to mark the entry as recently used.
+    try:
+        os.utime(path, None)
+    except EnvironmentError:
+        pass
+
+    return arrays, values
+
+
+def save_cached(filename, options, arrays, values, cache_dir,
+                max_size=None):
+    '''
+    :param filename: Full path to the raw file
+    :type filename: str
+
+    :param options: The reader options that change the decoded data
+    :type options: dict
+
+    :param arrays: The arrays to store by name. Object arrays can't be
+        stored.
+    :type arrays: dict
+
+    :param values: The other values to store by name. The values must be
+        supported by encode_value.
+    :type values: dict
+
+    :param cache_dir: The cache directory
+    :type cache_dir: str
+
+    :param max_size: The maximum size of the cache in bytes. If None, the
+        cache is not limited.
+    :type max_size: int
+
+    Writes the cache entry for filename and evicts the least recently used
+    entries if the cache exceeds max_size. Failures to write the entry are
+    logged and otherwise ignored.
+    '''
+
+    path = cache_path(filename, options, cache_dir)
+
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        #  Write to a temporary file first so a partially written entry is
+        #  never loaded.
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            entry = dict(arrays)
+            entry[_VALUES_NAME] = np.array(json.dumps({'version':
+                    CACHE_VERSION, 'values': encode_value(values)}))
+            with os.fdopen(fd, 'wb') as fid:
+                np.savez(fid, **entry)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except EnvironmentError as e:
+        log.warning('Unable to write cache entry %s: %s', path, e)
+        return
+
+    if max_size is not None:
+        evict(cache_dir, max_size, keep=path)
+
+
+def evict(cache_dir, max_size, keep=None):
+    '''
+    :param cache_dir: The cache directory
+    :type cache_dir: str
+
+    :param max_size: The maximum size of the cache in bytes
+    :type max_size: int
+
+    :param keep: Path of an entry that should not be evicted
+    :type keep: str
+
+    Deletes the least recently used cache entries until the total size of
+    the entries in cache_dir is no more than max_size.
+    '''
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(CACHE_EXTENSION):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except EnvironmentError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum([entry[1] for entry in entries])
+
+    #  Delete the oldest entries first.
+    for mtime, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total_size -= size
+        except EnvironmentError as e:
+            log.warning('Unable to delete cache entry %s: %s', path, e)
@@ -0,0 +1,177 @@
+# coding=utf-8
+
+#     National Oceanic and Atmospheric Administration (NOAA)
+#     Alaskan Fisheries Science Center (AFSC)
+#     Resource Assessment and Conservation Engineering (RACE)
+#     Midwater Assessment and Conservation Engineering (MACE)
+
+#  THIS SOFTWARE AND ITS DOCUMENTATION ARE CONSIDERED TO BE IN THE PUBLIC DOMAIN
+#  AND THUS ARE AVAILABLE FOR UNRESTRICTED PUBLIC USE. THEY ARE FURNISHED "AS IS."
+#  THE AUTHORS, THE UNITED STATES GOVERNMENT, ITS INSTRUMENTALITIES, OFFICERS,
+#  EMPLOYEES, AND AGENTS MAKE NO WARRANTY, EXPRESS OR IMPLIED, AS TO THE USEFULNESS
+#  OF THE SOFTWARE AND DOCUMENTATION FOR ANY PURPOSE. THEY ASSUME NO RESPONSIBILITY
+#  (1) FOR THE USE OF THE SOFTWARE AND DOCUMENTATION; OR (2) TO PROVIDE TECHNICAL
+#  SUPPORT TO USERS.
+
+'''
+.. module:: echolab2.instruments.util.datagram_index
+
+    :synopsis:  Persistent datagram indexes for SIMRAD raw files
+
+    A datagram index is a numpy structured array with one row per datagram
+    in a raw file recording the byte offset, size, type, channel, NT
+    timestamp and sample count of the datagram. Indexes are built by a
+    header-only scan of the file (see RawSimradFile.build_index) and are
+    stored in a sidecar .npz file next to the raw file or in a cache
+    directory. Sidecars are validated against the size and modification
+    time of the raw file and are rebuilt when they are stale.
+
+| Maintained by:
+|       Rick Towler   <rick.towler@noaa.gov>
+
+$Id$
+'''
+
+import os
+import hashlib
+import logging
+import numpy as np
+from .date_conversion import nt_to_datetime64
+
+__all__ = ['INDEX_DTYPE', 'INDEX_VERSION', 'get_index', 'load_index',
+           'save_index', 'index_path', 'index_times']
+
+log = logging.getLogger(__name__)
+
+#: Version of the index layout. Sidecars with a different version are rebuilt.
+INDEX_VERSION = 2
+
+#: dtype of the datagram index. channel is 0 for datagrams that are not
+#: channel specific. count is the number of samples in RAW datagrams and 0
+#: for other datagrams.
+INDEX_DTYPE = np.dtype([('offset', '<i8'),
+                        ('size', '<i4'),
+                        ('type', 'S4'),
+                        ('channel', '<i2'),
+                        ('low_date', '<u4'),
+                        ('high_date', '<u4'),
+                        ('count', '<i4')])
+
+
+def index_path(filename, index_dir=None):
+    '''
+    :param filename: Full path to the raw file
+    :type filename: str
+
+    :param index_dir: Directory to store the index in.  If None, the index
+        is stored next to the raw file.
+    :type index_dir: str
+
+    Returns the path of the index sidecar for filename.
+    '''
+
+    filename = os.path.abspath(filename)
+
+    if index_dir is None:
+        return filename + '.idx.npz'
+
+    #  Include a hash of the full path so files with the same name from
+    #  different directories don't collide in the cache directory.
+    path_hash = hashlib.sha1(filename.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(index_dir, '%s.%s.idx.npz' %
+                        (os.path.basename(filename), path_hash))
+
+
+def load_index(filename, index_dir=None):
+    '''
+    :param filename: Full path to the raw file
+    :type filename: str
+
+    :param index_dir: Directory the index is stored in
+    :type index_dir: str
+
+    Loads the index sidecar for filename. Returns None if there is no
+    sidecar or if it does not match the current size and modification time
+    of the raw file.
+    '''
+
+    path = index_path(filename, index_dir)
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        stat = os.stat(filename)
+        with np.load(path) as sidecar:
+            if (int(sidecar['version']) != INDEX_VERSION or
+                    int(sidecar['file_size']) != stat.st_size or
+                    float(sidecar['file_mtime']) != stat.st_mtime):
+                log.debug('Datagram index %s is stale', path)
+                return None
+            index = sidecar['index']
+    except Exception as e:
+        log.warning('Unable to load datagram index %s: %s', path, e)
+        return None
+
+    return index
+
+
+def save_index(filename, index, index_dir=None):
+    '''
+    :param filename: Full path to the raw file
+    :type filename: str
+
+    :param index: The datagram index
+    :type index: numpy.ndarray
+
+    :param index_dir: Directory to store the index in
+    :type index_dir: str
+
+    Writes the index sidecar for filename. Failures to write the sidecar
+    (read-only media for example) are logged and otherwise ignored.
+    '''
+
+    path = index_path(filename, index_dir)
+
+    try:
+        if index_dir is not None and not os.path.isdir(index_dir):
+            os.makedirs(index_dir)
+        stat = os.stat(filename)
+        with open(path, 'wb') as fid:
+            np.savez(fid, index=index, version=INDEX_VERSION,
+                     file_size=stat.st_size, file_mtime=stat.st_mtime)
+    except EnvironmentError as e:
+        log.warning('Unable to write datagram index %s: %s', path, e)
+
+
+def get_index(fid, filename, index_dir=None):
+    '''
+    :param fid: The open raw file
+    :type fid: RawSimradFile
+
+    :param filename: Full path to the raw file
+    :type filename: str
+
+    :param index_dir: Directory the index is stored in
+    :type index_dir: str
+
+    Returns the datagram index for filename, loading it from the sidecar if
+    it is current, otherwise scanning the file and writing a new sidecar.
+    '''
+
+    index = load_index(filename, index_dir)
+    if index is None:
+        index = fid.build_index()
+        save_index(filename, index, index_dir)
+
+    return index
+
+
+def index_times(index):
+    '''
+    :param index: A datagram index
+    :type index: numpy.ndarray
+
+    Returns the datagram times in the index as a datetime64[ms] array.
+    '''
+
+    return nt_to_datetime64(index['low_date'], index['high_date'])
@@ -21,6 +21,7 @@ useful functions:
 
     nt_to_unix
     unix_to_nt
+    nt_to_datetime64
 
     datetime_to_unix
     unix_to_datetime
@@ -41,6 +42,7 @@ $Id$
 
 
 import datetime
+import numpy as np
 from pytz import utc as pytz_utc
 import logging
 
@@ -52,7 +54,13 @@ UTC_UNIX_EPOCH = datetime.datetime(1970, 1, 1, 0, 0, 0, tzinfo=pytz_utc)
 
 EPOCH_DELTA_SECONDS = (UTC_UNIX_EPOCH - UTC_NT_EPOCH).total_seconds()
 
-__all__ = ['nt_to_unix', 'unix_to_nt']
+#Number of 100ns intervals between the NT and unix epochs
+EPOCH_DELTA_TICKS = 116444736000000000
+
+#Number of 100ns intervals in the datetime64 units supported by nt_to_datetime64
+_TICKS_PER_UNIT = {'ms': 10000, 'us': 10}
+
+__all__ = ['nt_to_unix', 'unix_to_nt', 'nt_to_datetime64']
 
 log = logging.getLogger(__name__)
 
@@ -89,6 +97,46 @@ def nt_to_unix(nt_timestamp_tuple, return_datetime=True):
         return sec_past_unix_epoch
 
 
+def nt_to_datetime64(low_date, high_date, unit='ms'):
+    '''
+    :param low_date: LSBytes of the NT date (scalar or array)
+    :type low_date: int or numpy.ndarray
+
+    :param high_date: MSBytes of the NT date (scalar or array)
+    :type high_date: int or numpy.ndarray
+
+    :param unit: datetime64 unit of the result, 'ms' or 'us'
+    :type unit: str
+
+    Returns a numpy.datetime64 scalar (or an array of them) in UTC computed
+    from the NT date using integer arithmetic only. Times are truncated to
+    the requested unit.
+
+    >>> t = nt_to_datetime64(19496896, 30196149)
+    >>> assert t == np.datetime64('2011-12-23T20:54:03.964')
+
+    >>> times = nt_to_datetime64(np.array([19496896, 19496896]),
+    ...                          np.array([30196149, 30196150]))
+    >>> assert times[0] == np.datetime64('2011-12-23T20:54:03.964')
+    '''
+
+    try:
+        ticks_per_unit = _TICKS_PER_UNIT[unit]
+    except KeyError:
+        raise ValueError("Unsupported datetime64 unit '%s'. The unit must "
+                         "be 'ms' or 'us'." % unit)
+
+    if np.isscalar(low_date) and np.isscalar(high_date):
+        #  Python integers are faster than numpy for single values
+        ticks = (int(high_date) << 32) + int(low_date) - EPOCH_DELTA_TICKS
+        return np.datetime64(ticks // ticks_per_unit, unit)
+
+    ticks = ((np.asarray(high_date).astype('int64') << 32) +
+             np.asarray(low_date).astype('int64') - EPOCH_DELTA_TICKS)
+
+    return (ticks // ticks_per_unit).astype('datetime64[' + unit + ']')
+
+
 def unix_to_nt(unix_timestamp):
     '''
     Given a date, return the 2-element tuple used for timekeeping with SIMRAD echosounders
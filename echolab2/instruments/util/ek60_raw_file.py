@@ -35,11 +35,16 @@ $Id$
 '''
 
 from io import BufferedReader, FileIO, SEEK_SET, SEEK_CUR, SEEK_END
+import os
+import mmap
 import struct
 import logging
+import numpy as np
 from . import parsers
+from .datagram_index import INDEX_DTYPE
 
-__all__ = ['RawSimradFile']
+__all__ = ['RawSimradFile', 'RawSimradMmapFile', 'SimradEOF',
+           'SimradIncompleteDatagram']
 
 log = logging.getLogger(__name__)
 
@@ -53,6 +58,17 @@ class SimradEOF(Exception):
         return self.message
 
 
+class SimradIncompleteDatagram(SimradEOF):
+    '''
+    Raised when following a file that is still being written and the next
+    datagram has not been completely written yet.  The file position is left
+    at the start of the datagram so it can be read once it is complete.
+    '''
+
+    def __init__(self, message='Incomplete datagram at end of file'):
+        self.message = message
+
+
 class DatagramSizeError(Exception):
 
     def __init__(self, message, expected_size_tuple, file_pos=(None, None)):
@@ -94,7 +110,11 @@ class RawSimradFile(BufferedReader):
     A low-level extension of the built in python file object allowing the reading/writing
     of SIMRAD RAW files on datagram by datagram basis (instead of at the byte level)
 
-
+    Set follow to True to read a file that is still being written.  When
+    following, a partially written datagram at the end of the file raises
+    SimradIncompleteDatagram (a SimradEOF subclass) instead of being treated
+    as corrupt data, and the file position is left at the start of that
+    datagram so reading can resume when the rest of it has been written.
     '''
     #: Dict object with datagram header/python class key/value pairs
     DGRAM_TYPE_KEY = {'RAW': parsers.SimradRawParser(),
@@ -104,8 +124,12 @@ class RawSimradFile(BufferedReader):
                       'BOT': parsers.SimradBottomParser(),
                       'DEP': parsers.SimradDepthParser()}
 
+    #: Byte offset of the sample count within a RAW0 datagram
+    _RAW_COUNT_OFFSET = parsers.RAW0_HEADER_DTYPE.fields['count'][1]
 
-    def __init__(self, name, mode='rb', closefd=True, return_raw=False, buffer_size=1024*1024):
+
+    def __init__(self, name, mode='rb', closefd=True, return_raw=False, buffer_size=1024*1024,
+                 follow=False):
 
         #  9-28-18 RHT: Changed RawSimradFile to implement BufferedReader instead of
         #  io.FileIO to increase performance.
@@ -119,6 +143,11 @@ class RawSimradFile(BufferedReader):
         self._total_dgram_count = None
         self._return_raw = return_raw
 
+        #  when following a growing file we track the last known file size
+        #  so we only need to stat the file when we reach the end of it
+        self._follow = follow
+        self._file_size = 0
+
 
     def _seek_bytes(self, bytes_, whence=0):
         '''
@@ -165,6 +194,26 @@ class RawSimradFile(BufferedReader):
         return offset
 
 
+    def _check_available(self, n_bytes):
+        '''
+        :param n_bytes: Number of bytes needed from the current position
+        :type n_bytes: int
+
+        Used when following a file. Raises SimradEOF if we're at the end of
+        the file and SimradIncompleteDatagram if fewer than n_bytes have been
+        written past the current position.
+        '''
+
+        pos = self._tell_bytes()
+        if pos + n_bytes > self._file_size:
+            self._file_size = os.fstat(self.fileno()).st_size
+
+            if pos >= self._file_size:
+                raise SimradEOF()
+            elif pos + n_bytes > self._file_size:
+                raise SimradIncompleteDatagram()
+
+
     def _read_timestamp(self):
         '''
         Attempts to read the datagram timestamp.
@@ -211,7 +260,7 @@ class RawSimradFile(BufferedReader):
         else:
             dgram_type = buf
 
-        dgram_type = dgram_type.decode()
+        dgram_type = bytes(dgram_type).decode()
 
         lowDateField, highDateField = self._read_timestamp()
 
@@ -309,7 +358,7 @@ class RawSimradFile(BufferedReader):
         Returns a formated datagram object using the data in raw_datagram_string
         '''
 
-        dgram_type = raw_datagram_string[:3].decode()
+        dgram_type = bytes(raw_datagram_string[:3]).decode()
         try:
             parser = self.DGRAM_TYPE_KEY[dgram_type]
         except KeyError:
@@ -479,8 +528,15 @@ class RawSimradFile(BufferedReader):
         reset back to the original location afterwards.
 
         :returns: [dgram_size, dgram_type, (low_date, high_date)]
+
+        When following a file, SimradIncompleteDatagram is raised if the
+        datagram has not been completely written.
         '''
 
+        #  the smallest valid datagram is 24 bytes (size + header + size)
+        if self._follow:
+            self._check_available(24)
+
         dgram_header = self._read_dgram_header()
         if dgram_header['type'].startswith('RAW'):
             dgram_header['channel'] = struct.unpack('h', self._read_bytes(2))[0]
@@ -488,6 +544,11 @@ class RawSimradFile(BufferedReader):
         else:
             self._seek_bytes(-16, SEEK_CUR)
 
+        #  make sure the rest of the datagram is there so read() and skip()
+        #  don't mistake a datagram that is being written for a corrupt one
+        if self._follow and dgram_header['size'] >= 16:
+            self._check_available(dgram_header['size'] + 8)
+
         return dgram_header
 
 
@@ -539,6 +600,148 @@ class RawSimradFile(BufferedReader):
         self._current_dgram_offset += 1
 
 
+    def build_index(self):
+        '''
+        Scans the file header by header and returns a datagram index, a numpy
+        structured array with the byte offset, size, type, channel, NT
+        timestamp and (for RAW datagrams) sample count of every valid
+        datagram in the file (see
+        echolab2.instruments.util.datagram_index.INDEX_DTYPE).
+
+        The offsets point at the leading size field of each datagram and can
+        be passed to read_at().  Datagrams that would be skipped by read()
+        (zero timestamps, failed size checks) are not included.  The file
+        position is restored when the scan is complete.
+        '''
+
+        old_file_pos = self._tell_bytes()
+        old_dgram_offset = self.tell()
+
+        self._seek_bytes(0, SEEK_SET)
+        rows = []
+
+        while True:
+            offset = self._tell_bytes()
+            try:
+                header = self.peek()
+            except Exception:
+                break
+
+            if (header['low_date'], header['high_date']) == (0, 0):
+                try:
+                    self.skip()
+                except Exception:
+                    break
+                continue
+
+            if header['size'] < 16:
+                try:
+                    self._find_next_datagram()
+                except Exception:
+                    break
+                continue
+
+            self._seek_bytes(header['size'] + 4, SEEK_CUR)
+            try:
+                dgram_size_check = self._read_dgram_size()
+            except DatagramReadError:
+                #  truncated trailing datagram
+                break
+
+            if header['size'] != dgram_size_check:
+                log.warning('Datagram failed size check:  %d != %d @ (%d, %d)',
+                    header['size'], dgram_size_check, self._tell_bytes(), self.tell())
+                try:
+                    self._seek_bytes(offset + 1, SEEK_SET)
+                    self._find_next_datagram()
+                except Exception:
+                    break
+                continue
+
+            #  get the sample count from the RAW datagram header
+            count = 0
+            if header['type'].startswith('RAW') and \
+                    header['size'] >= parsers.RAW0_HEADER_DTYPE.itemsize:
+                self._seek_bytes(offset + 4 + self._RAW_COUNT_OFFSET, SEEK_SET)
+                count = struct.unpack('=l', self._read_bytes(4))[0]
+                self._seek_bytes(offset + header['size'] + 8, SEEK_SET)
+
+            rows.append((offset, header['size'], header['type'].encode(),
+                         header.get('channel', 0), header['low_date'],
+                         header['high_date'], count))
+
+        index = np.array(rows, dtype=INDEX_DTYPE)
+
+        self._seek_bytes(old_file_pos, SEEK_SET)
+        self._current_dgram_offset = old_dgram_offset
+
+        return index
+
+
+    def read_at(self, offset):
+        '''
+        :param offset: byte offset of the datagram (from a datagram index)
+        :type offset: int
+
+        Seeks to the byte offset provided and reads the datagram found there.
+        '''
+
+        self._seek_bytes(offset, SEEK_SET)
+        return self.read(1)
+
+
+    def read_raw_block(self, offsets, sizes):
+        '''
+        :param offsets: byte offsets of the RAW0 datagrams (from a datagram index)
+        :type offsets: numpy.ndarray
+
+        :param sizes: sizes of the RAW0 datagrams (from a datagram index)
+        :type sizes: numpy.ndarray
+
+        :returns: headers, buffer, data_offsets
+
+        Reads a block of RAW0 datagrams without parsing them individually.
+        The span of the file containing the datagrams is read with a single
+        read (or mapped when using RawSimradMmapFile) into a flat uint8
+        buffer and the datagram headers are gathered into a structured array
+        with the parsers.RAW0_HEADER_DTYPE dtype.  data_offsets contains the
+        position in buffer of the first sample of each datagram.  Offsets must
+        be in ascending order.  The file position is restored afterwards.
+        '''
+
+        offsets = np.asarray(offsets, dtype='int64')
+        sizes = np.asarray(sizes, dtype='int64')
+        header_size = parsers.RAW0_HEADER_DTYPE.itemsize
+
+        if offsets.shape[0] == 0:
+            return (np.empty(0, dtype=parsers.RAW0_HEADER_DTYPE),
+                    np.empty(0, dtype='uint8'), offsets)
+
+        #  Read the file span containing all of the datagrams.  Each
+        #  datagram is bracketed by 4 byte size fields.
+        old_file_pos = self._tell_bytes()
+        start = offsets[0]
+        length = int(offsets[-1] + sizes[-1] + 8 - start)
+        self._seek_bytes(int(start), SEEK_SET)
+        buffer = np.frombuffer(self._read_bytes(length), dtype='uint8')
+        self._seek_bytes(old_file_pos, SEEK_SET)
+
+        if buffer.shape[0] != length:
+            raise DatagramReadError('Short read while getting RAW datagram block',
+                (length, buffer.shape[0]), file_pos=(old_file_pos, self.tell()))
+
+        #  Gather the headers which start after the leading size field.
+        header_offsets = offsets - start + 4
+        header_bytes = buffer[header_offsets[:, np.newaxis] +
+                              np.arange(header_size)]
+        headers = header_bytes.view(parsers.RAW0_HEADER_DTYPE)[:, 0]
+
+        if not np.all(headers['type'] == b'RAW0'):
+            raise ValueError('read_raw_block can only read RAW0 datagrams.')
+
+        return headers, buffer, header_offsets + header_size
+
+
     def skip_back(self):
         '''
         Skips backwards to the previous datagram without reading it's contents
@@ -653,3 +856,97 @@ class RawSimradFile(BufferedReader):
         self._current_dgram_offset = 0
         self._total_dgram_count = None
         self._seek_bytes(0, SEEK_SET)
+
+
+class RawSimradMmapFile(RawSimradFile):
+    '''
+    A memory-mapped variant of RawSimradFile.
+
+    The file is mapped into memory once and datagrams are returned as
+    memoryview slices of the mapping instead of newly allocated byte strings.
+    The parsers in turn expose sample data as numpy arrays that are views into
+    the mapping so large files can be parsed without per-datagram copies.
+
+    Arrays returned in the parsed datagrams reference the mapping. They must
+    be copied if they are to be used after the file is closed.
+    '''
+
+    def __init__(self, name, mode='rb', closefd=True, return_raw=False, buffer_size=1024*1024):
+
+        RawSimradFile.__init__(self, name, mode=mode, closefd=closefd,
+                return_raw=return_raw, buffer_size=buffer_size)
+
+        #  map the whole file read-only - this will raise ValueError on empty
+        #  files and EnvironmentError on platforms/filesystems that don't
+        #  support mapping.
+        try:
+            self._map = mmap.mmap(self.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            BufferedReader.close(self)
+            raise
+
+        self._view = memoryview(self._map)
+        self._map_pos = 0
+
+
+    def _seek_bytes(self, bytes_, whence=0):
+        '''
+        :param bytes_: byte offset
+        :type bytes_: int
+
+        :param whence:
+
+        Seeks the mapping by bytes instead of datagrams.
+        '''
+
+        if whence == SEEK_SET:
+            new_pos = bytes_
+        elif whence == SEEK_CUR:
+            new_pos = self._map_pos + bytes_
+        elif whence == SEEK_END:
+            new_pos = len(self._map) + bytes_
+        else:
+            raise ValueError('Illegal value for \'whence\' (%s)' % (str(whence)))
+
+        if new_pos < 0:
+            raise IOError('Cannot seek to negative byte offset %d' % (new_pos))
+
+        self._map_pos = new_pos
+
+
+    def _tell_bytes(self):
+        '''
+        Returns the mapping position in bytes.
+        '''
+
+        return self._map_pos
+
+
+    def _read_bytes(self, k):
+        '''
+        Returns a memoryview of the next k bytes of the mapping
+        '''
+
+        start = min(self._map_pos, len(self._map))
+        end = min(start + k, len(self._map))
+        self._map_pos = end
+
+        return self._view[start:end]
+
+
+    def close(self):
+        '''
+        Releases the mapping and closes the underlying file.
+        '''
+
+        if getattr(self, '_map', None) is not None:
+            try:
+                self._view.release()
+                self._map.close()
+            except BufferError:
+                #  Views into the mapping are still referenced elsewhere. The
+                #  mapping will be released when those are garbage collected.
+                log.debug('Mapping of %s still referenced, deferring close', self.name)
+            self._map = None
+
+        BufferedReader.close(self)
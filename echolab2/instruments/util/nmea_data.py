@@ -45,6 +45,15 @@ class nmea_data(object):
         self.talker_ids = []
         self.message_ids = []
 
+        # Create a set of the (time, talker, message ID) keys of the stored
+        # datagrams.  This is used to find duplicate datagrams without
+        # searching the data arrays.
+        self._datagram_keys = set()
+
+        # The time sort permutation of the datagrams is cached by
+        # _get_time_order until datagrams are added.
+        self._time_sort = None
+
         # nmea_definitions define the NMEA message(s) and pynmea2.NMEASentence
         # attributes of those messages that the NMEA interpolation routine
         # will process. These definitions can also be used to define meta-types
@@ -107,15 +116,13 @@ class nmea_data(object):
 
             #  check if we're allowing duplicates and if this is one. We need
             #  to do this since .out files can contain duplicate NMEA data.
-            if (not allow_duplicates):
-                dup_idx = (self.nmea_times == time)
-                if (np.any(dup_idx)):
-                    #  We have a time match - check the talker and message id
-                    my_talker = self.talkers[dup_idx]
-                    my_message = self.messages[dup_idx]
-                    if ((header[0:2] in my_talker) and (header[2:6] in my_message)):
-                        #  this is the same - discard it
-                        return
+            #  Times are keyed as integer milliseconds.
+            key = (np.datetime64(time, 'ms').astype('int64').item(),
+                   header[0:2], header[2:6])
+            if (not allow_duplicates) and (key in self._datagram_keys):
+                #  this is the same - discard it
+                return
+            self._datagram_keys.add(key)
 
             # Increment datagram counter.
             self.n_raw += 1
@@ -132,6 +139,7 @@ class nmea_data(object):
             self.nmea_times[self.n_raw-1] = time
             self.talkers[self.n_raw-1] = header[0:2]
             self.messages[self.n_raw-1] = header[2:6]
+            self._time_sort = None
 
             if not header[0:2] in self.talker_ids:
                 self.talker_ids.append(header[0:2])
@@ -139,6 +147,21 @@ class nmea_data(object):
                 self.message_ids.append(header[2:5])
 
 
+    def append(self, other, allow_duplicates=False):
+        """
+        Appends the NMEA datagrams from another nmea_data object.
+
+        Args:
+            other (nmea_data): The nmea_data object to append.
+            allow_duplicates (bool): When False, NMEA datagrams that share
+                the same timestamp, talker ID, and message ID with an
+                existing datagram will be discarded.
+        """
+        for idx in range(other.n_raw):
+            self.add_datagram(other.nmea_times[idx], other.raw_datagrams[idx],
+                              allow_duplicates=allow_duplicates)
+
+
     def get_datagrams(self, message_types, start_time=None, end_time=None,
                       talker_id=None, return_raw=False, return_fields=None):
         """
@@ -438,25 +461,57 @@ class nmea_data(object):
 
         """
 
-        #  Ensure that we have times to work with.
-        if start_time is None:
-            start_time = np.min(self.nmea_times)
-        if end_time is None:
-            end_time = np.max(self.nmea_times)
-
-        # Sort time index if returning time ordered indexes.
         if time_order:
-            primary_index = self.nmea_times.argsort()
-        else:
-            primary_index = self.nmea_times
+            # Find the range of times in the sorted times with a binary
+            # search.
+            primary_index, sorted_times = self._get_time_order()
+            first = 0
+            last = primary_index.shape[0]
+            if start_time is not None:
+                first = np.searchsorted(sorted_times,
+                        np.datetime64(start_time, 'ms'), side='left')
+            if end_time is not None:
+                last = np.searchsorted(sorted_times,
+                        np.datetime64(end_time, 'ms'), side='right')
+            return primary_index[first:max(first, last)]
 
         # Determine the indices of the data that fall within the time span
         # provided.
-        mask = self.nmea_times[primary_index] >= start_time
-        mask = np.logical_and(mask, self.nmea_times[primary_index] <= end_time)
+        nmea_times = self.nmea_times[:self.n_raw]
+        mask = ~np.isnat(nmea_times)
+        if start_time is not None:
+            mask &= nmea_times >= start_time
+        if end_time is not None:
+            mask &= nmea_times <= end_time
 
         #  and return the indices that are included in the specified range
-        return primary_index[mask]
+        return np.nonzero(mask)[0]
+
+
+    def _get_time_order(self):
+        """
+        Return the time sort permutation of the datagrams.
+
+        The permutation is cached until datagrams are added. If the datagrams
+        are already in time order, the times are not sorted.
+
+        Returns: The indices that sort the datagram times and the sorted times.
+
+        """
+
+        if getattr(self, '_time_sort', None) is None:
+            nmea_times = self.nmea_times[:self.n_raw]
+            if np.all(nmea_times[1:] >= nmea_times[:-1]):
+                order = np.arange(self.n_raw)
+            else:
+                order = nmea_times.argsort(kind='stable')
+                nmea_times = nmea_times[order]
+
+            # Datagrams without times are never in a time range.
+            n_valid = np.count_nonzero(~np.isnat(nmea_times))
+            self._time_sort = (order[:n_valid], nmea_times[:n_valid])
+
+        return self._time_sort
 
 
     def _resize_arrays(self, new_size):
@@ -36,35 +36,108 @@ import logging
 import struct
 import re
 import sys
-from .date_conversion import nt_to_unix
+from .date_conversion import nt_to_datetime64
 
 
 __all__ = ['SimradNMEAParser', 'SimradDepthParser', 'SimradBottomParser',
-            'SimradAnnotationParser', 'SimradConfigParser', 'SimradRawParser']
+            'SimradAnnotationParser', 'SimradConfigParser', 'SimradRawParser',
+            'RAW0_HEADER_DTYPE']
 
 log = logging.getLogger(__name__)
 
+#  Map of struct format characters to numpy dtype strings. Used to build a
+#  numpy structured dtype for each parser's header.
+_STRUCT_TO_DTYPE = {'h': '<i2', 'H': '<u2', 'l': '<i4', 'L': '<u4',
+                    'f': '<f4', 'd': '<f8'}
+
+
+def _struct_to_dtype(format_char):
+    '''
+    Returns the numpy dtype of a single struct field format such as 'L',
+    '128s' or '5f'.
+    '''
+    count, code = re.match(r'(\d*)(\D)$', format_char).groups()
+    if code == 's':
+        return 'S' + count
+    elif count and int(count) > 1:
+        return (_STRUCT_TO_DTYPE[code], (int(count),))
+    else:
+        return _STRUCT_TO_DTYPE[code]
+
 class _SimradDatagramParser(object):
     '''
     '''
 
+    #  unpack_from parses the datagrams of parsers that set this to True in
+    #  place through a memoryview.  The other datagrams are small and are
+    #  faster to parse from a bytes copy.
+    _unpack_in_place = False
+
     def __init__(self, header_type, header_formats):
         self._id      = header_type
         self._headers = header_formats
         self._versions    = list(header_formats.keys())
 
+        #  Compile the header formats once per version.  Parsing a datagram
+        #  then only requires a dictionary lookup to get the header struct,
+        #  field names and size.
+        self._header_fmts = {}
+        self._header_structs = {}
+        self._header_fields = {}
+        self._header_dtypes = {}
+        self._header_str_fields = {}
+        for version, header in header_formats.items():
+            self._header_fmts[version] = '=' + ''.join([x[1] for x in header])
+            self._header_structs[version] = struct.Struct(self._header_fmts[version])
+            self._header_fields[version] = tuple([x[0] for x in header])
+            self._header_dtypes[version] = np.dtype([(x[0], _struct_to_dtype(x[1]))
+                                                     for x in header])
+            self._header_str_fields[version] = tuple([x[0] for x in header
+                                                      if x[1].endswith('s')])
+
     def header_fmt(self, version=0):
-        return '=' + ''.join([x[1] for x in self._headers[version]])
+        return self._header_fmts[version]
 
     def header_size(self, version=0):
-        return struct.calcsize(self.header_fmt(version))
+        return self._header_structs[version].size
 
     def header_fields(self, version=0):
-        return [x[0] for x in self._headers[version]]
+        return self._header_fields[version]
+
+    def header_struct(self, version=0):
+        '''
+        Returns the compiled struct.Struct of the header
+        '''
+        return self._header_structs[version]
+
+    def header_dtype(self, version=0):
+        '''
+        Returns a numpy structured dtype matching the header. This can be used
+        to decode the headers of many datagrams at once.
+        '''
+        return self._header_dtypes[version]
 
     def header(self, version=0):
         return self._headers[version][:]
 
+    def unpack_header(self, buffer, offset=0, version=0, encoding='utf-8'):
+        '''
+        :param buffer: buffer containing the datagram
+        :type buffer: bytes, memoryview or other buffer object
+
+        :param offset: offset of the datagram header in the buffer
+        :type offset: int
+
+        Unpacks the header fields of the datagram at offset into a dict.
+        String fields are decoded using encoding.
+        '''
+        data = dict(zip(self._header_fields[version],
+                        self._header_structs[version].unpack_from(buffer, offset)))
+        for field in self._header_str_fields[version]:
+            data[field] = data[field].decode(encoding)
+
+        return data
+
 
     def validate_data_header(self, data):
 
@@ -89,11 +162,40 @@ class _SimradDatagramParser(object):
 
     def from_string(self, raw_string):
 
-        header = raw_string[:4]
+        return self.unpack_from(raw_string)
+
+    def unpack_from(self, buffer, offset=0, size=None):
+        '''
+        :param buffer: buffer containing the datagram
+        :type buffer: bytes, memoryview or other buffer object
+
+        :param offset: offset of the datagram in the buffer (the start of
+            the type field, after the leading datagram size)
+        :type offset: int
+
+        :param size: size of the datagram.  If None, the datagram extends to
+            the end of the buffer.
+        :type size: int
+
+        Parses the datagram at offset in buffer.  RAW and CON datagrams are
+        accessed through a memoryview so the buffer is not copied.  Other
+        datagrams are copied to a bytes object first.
+        '''
+
+        header = bytes(buffer[offset:offset + 4])
         if (sys.version_info.major > 2):
             header = header.decode()
         id_, version = self.validate_data_header(header)
-        return self._unpack_contents(raw_string, version=version)
+
+        if offset or size is not None:
+            if size is None:
+                buffer = memoryview(buffer)[offset:]
+            else:
+                buffer = memoryview(buffer)[offset:offset + size]
+            if not self._unpack_in_place:
+                buffer = buffer.tobytes()
+
+        return self._unpack_contents(buffer, version=version)
 
     def to_string(self, data={}):
 
@@ -120,7 +222,7 @@ class SimradDepthParser(_SimradDatagramParser):
         type:         string == 'DEP0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:    datetime.datetime object of NT date, assumed to be UTC
+        timestamp:    numpy.datetime64[ms] object of NT date, assumed to be UTC
         transceiver_count:  [long uint] with number of tranceivers
 
         depth:        [float], one value for each active channel
@@ -150,32 +252,20 @@ class SimradDepthParser(_SimradDatagramParser):
 
         '''
 
-        header_values = struct.unpack(self.header_fmt(version), raw_string[:self.header_size(version)])
-        data = {}
-
-        for indx, field in enumerate(self.header_fields(version)):
-            data[field] = header_values[indx]
-            if isinstance(data[field], bytes):
-                data[field] = data[field].decode()
+        data = self.unpack_header(raw_string, version=version)
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
-            data_fmt    = '=3f'
-            data_size   = struct.calcsize(data_fmt)
+            #  depth, reflectivity and unused values are stored as 3 floats
+            #  per transceiver
+            values = np.frombuffer(raw_string, dtype='<f4',
+                    count=3 * data['transceiver_count'],
+                    offset=self.header_size(version)).reshape(-1, 3)
 
-            data['depth'] = np.zeros((data['transceiver_count'],))
-            data['reflectivity'] = np.zeros((data['transceiver_count'],))
-            data['unused'] = np.zeros((data['transceiver_count'],))
-
-            buf_indx     = self.header_size(version)
-            for indx in range(data['transceiver_count']):
-                d, r, u = struct.unpack(data_fmt, raw_string[buf_indx:buf_indx + data_size])
-                data['depth'][indx]         = d
-                data['reflectivity'][indx]  = r
-                data['unused'][indx]        = u
-
-                buf_indx += data_size
+            data['depth'] = values[:, 0].astype('float')
+            data['reflectivity'] = values[:, 1].astype('float')
+            data['unused'] = values[:, 2].astype('float')
 
         return data
 
@@ -216,7 +306,7 @@ class SimradBottomParser(_SimradDatagramParser):
         type:         string == 'BOT0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        datetime:     datetime.datetime object of NT date converted to UTC
+        timestamp:    numpy.datetime64[ms] object of NT date, assumed to be UTC
         transceiver_count:  long uint with number of tranceivers
         depth:        [float], one value for each active channel
 
@@ -243,21 +333,14 @@ class SimradBottomParser(_SimradDatagramParser):
 
         '''
 
-        header_values = struct.unpack(self.header_fmt(version), raw_string[:self.header_size(version)])
-        data = {}
-
-        for indx, field in enumerate(self.header_fields(version)):
-            data[field] = header_values[indx]
-            if isinstance(data[field], bytes):
-                data[field] = data[field].decode()
+        data = self.unpack_header(raw_string, version=version)
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
-            depth_fmt    = '=%dd' %(data['transceiver_count'],)
-            depth_size   = struct.calcsize(depth_fmt)
-            buf_indx     = self.header_size(version)
-            data['depth'] = np.fromiter(struct.unpack(depth_fmt, raw_string[buf_indx:buf_indx + depth_size]), 'float')
+            data['depth'] = np.frombuffer(raw_string, dtype='<f8',
+                    count=data['transceiver_count'],
+                    offset=self.header_size(version)).astype('float')
 
 
         return data
@@ -292,7 +375,7 @@ class SimradAnnotationParser(_SimradDatagramParser):
         type:         string == 'TAG0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:     datetime.datetime object of NT date, assumed to be UTC
+        timestamp:     numpy.datetime64[ms] object of NT date, assumed to be UTC
 
         text:         Annotation
 
@@ -320,15 +403,9 @@ class SimradAnnotationParser(_SimradDatagramParser):
 
         '''
 
-        header_values = struct.unpack(self.header_fmt(version), raw_string[:self.header_size(version)])
-        data = {}
+        data = self.unpack_header(raw_string, version=version)
 
-        for indx, field in enumerate(self.header_fields(version)):
-            data[field] = header_values[indx]
-            if isinstance(data[field], bytes):
-                data[field] = data[field].decode()
-
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
 #        if version == 0:
 #            data['text'] = raw_string[self.header_size(version):].strip('\x00')
@@ -337,7 +414,7 @@ class SimradAnnotationParser(_SimradDatagramParser):
 
         if version == 0:
             if (sys.version_info.major > 2):
-                data['text'] = str(raw_string[self.header_size(version):].strip(b'\x00'), 'ascii', errors='replace')
+                data['text'] = str(bytes(raw_string[self.header_size(version):]).strip(b'\x00'), 'ascii', errors='replace')
             else:
                 data['text'] = unicode(raw_string[self.header_size(version):].strip('\x00'), 'ascii', errors='replace')
 
@@ -379,7 +456,7 @@ class SimradNMEAParser(_SimradDatagramParser):
         type:         string == 'NME0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:     datetime.datetime object of NT date, assumed to be UTC
+        timestamp:     numpy.datetime64[ms] object of NT date, assumed to be UTC
 
         nmea_string:  full (original) NMEA string
 
@@ -414,19 +491,13 @@ class SimradNMEAParser(_SimradDatagramParser):
         :returns: None
         '''
 
-        header_values = struct.unpack(self.header_fmt(version), raw_string[:self.header_size(version)])
-        data = {}
-
-        for indx, field in enumerate(self.header_fields(version)):
-            data[field] = header_values[indx]
-            if isinstance(data[field], bytes):
-                data[field] = data[field].decode()
+        data = self.unpack_header(raw_string, version=version)
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
             if (sys.version_info.major > 2):
-                data['nmea_string'] = str(raw_string[self.header_size(version):].strip(b'\x00'), 'ascii', errors='replace')
+                data['nmea_string'] = str(bytes(raw_string[self.header_size(version):]).strip(b'\x00'), 'ascii', errors='replace')
             else:
                 data['nmea_string'] = unicode(raw_string[self.header_size(version):].strip('\x00'), 'ascii', errors='replace')
 
@@ -479,7 +550,7 @@ class SimradConfigParser(_SimradDatagramParser):
         type:         string == 'CON0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:    datetime.datetime object of NT date, assumed to be UTC
+        timestamp:    numpy.datetime64[ms] object of NT date, assumed to be UTC
 
         survey_name                     [str]
         transect_name                   [str]
@@ -561,6 +632,8 @@ class SimradConfigParser(_SimradDatagramParser):
                         ready for writing to disk
     '''
 
+    _unpack_in_place = True
+
 
 
     def __init__(self):
@@ -664,20 +737,18 @@ class SimradConfigParser(_SimradDatagramParser):
                                        ]
                                     }
 
+        #  Compile the transducer header formats once.
+        self._transducer_structs = {}
+        for sounder_name, transducer_header in self._transducer_headers.items():
+            self._transducer_structs[sounder_name] = ([x[0] for x in transducer_header],
+                    struct.Struct('=' + ''.join([x[1] for x in transducer_header])))
+
     def _unpack_contents(self, raw_string, version):
 
-        data = {}
         round6 = lambda x: round(x, ndigits=6)
-        header_values = struct.unpack(self.header_fmt(version), raw_string[:self.header_size(version)])
+        data = self.unpack_header(raw_string, version=version, encoding='latin_1')
 
-        for indx, field in enumerate(self.header_fields(version)):
-            data[field] = header_values[indx]
-
-            #  handle Python 3 strings
-            if (sys.version_info.major > 2) and isinstance(data[field], bytes):
-                data[field] = data[field].decode('latin_1')
-
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
 
@@ -701,22 +772,20 @@ class SimradConfigParser(_SimradDatagramParser):
             buf_indx = self.header_size(version)
 
             try:
-                transducer_header = self._transducer_headers[sounder_name]
+                txcvr_header_fields, txcvr_header_struct = self._transducer_structs[sounder_name]
                 _sounder_name_used = sounder_name
             except KeyError:
                 log.warning('Unknown sounder_name:  %s, (no one of %s)', sounder_name,
                     list(self._transducer_headers.keys()))
                 log.warning('Will use ER60 transducer config fields as default')
 
-                transducer_header = self._transducer_headers['ER60']
+                txcvr_header_fields, txcvr_header_struct = self._transducer_structs['ER60']
                 _sounder_name_used = 'ER60'
 
-            txcvr_header_fields = [x[0] for x in transducer_header]
-            txcvr_header_fmt    = '=' + ''.join([x[1] for x in transducer_header])
-            txcvr_header_size   = struct.calcsize(txcvr_header_fmt)
+            txcvr_header_size   = txcvr_header_struct.size
 
             for txcvr_indx in range(1, data['transceiver_count'] + 1):
-                txcvr_header_values_encoded = struct.unpack(txcvr_header_fmt, raw_string[buf_indx:buf_indx + txcvr_header_size])
+                txcvr_header_values_encoded = txcvr_header_struct.unpack_from(raw_string, buf_indx)
                 txcvr_header_values = list(txcvr_header_values_encoded)
                 for tx_idx, tx_val in enumerate(txcvr_header_values_encoded):
                     if isinstance(tx_val, bytes):
@@ -756,7 +825,7 @@ class SimradConfigParser(_SimradDatagramParser):
 
         elif version == 1:
             #CON1 only has a single data field:  beam_config, holding an xml string
-            data['beam_config'] = raw_string[self.header_size(version):].strip('\x00')
+            data['beam_config'] = bytes(raw_string[self.header_size(version):]).strip(b'\x00')
 
         return data
 
@@ -782,19 +851,17 @@ class SimradConfigParser(_SimradDatagramParser):
                 datagram_contents.append(data[field])
 
             try:
-                transducer_header = self._transducer_headers[sounder_name]
+                txcvr_header_fields, txcvr_header_struct = self._transducer_structs[sounder_name]
                 _sounder_name_used = sounder_name
             except KeyError:
                 log.warning('Unknown sounder_name:  %s, (no one of %s)', sounder_name,
                     list(self._transducer_headers.keys()))
                 log.warning('Will use ER60 transducer config fields as default')
 
-                transducer_header = self._transducer_headers['ER60']
+                txcvr_header_fields, txcvr_header_struct = self._transducer_structs['ER60']
                 _sounder_name_used = 'ER60'
 
-            txcvr_header_fields = [x[0] for x in transducer_header]
-            txcvr_header_fmt    = '=' + ''.join([x[1] for x in transducer_header])
-            txcvr_header_size   = struct.calcsize(txcvr_header_fmt)
+            txcvr_header_size   = txcvr_header_struct.size
 
             for txcvr_indx, txcvr in list(data['transceivers'].items()):
                 txcvr_contents = []
@@ -814,13 +881,13 @@ class SimradConfigParser(_SimradDatagramParser):
 
                     txcvr_contents.extend([txcvr['gpt_software_version'], txcvr['spare4']])
 
-                    txcvr_contents_str = struct.pack(txcvr_header_fmt, *txcvr_contents)
+                    txcvr_contents_str = txcvr_header_struct.pack(*txcvr_contents)
 
                 elif _sounder_name_used == 'MBES':
                     for field in txcvr_header_fields:
                         txcvr_contents.append(txcvr[field])
 
-                    txcvr_contents_str = struct.pack(txcvr_header_fmt, *txcvr_contents)
+                    txcvr_contents_str = txcvr_header_struct.pack(*txcvr_contents)
 
                 else:
                     raise RuntimeError('Unknown _sounder_name_used (Should not happen, this is a bug!)')
@@ -845,7 +912,7 @@ class SimradConfigParser(_SimradDatagramParser):
 #         type:         string == 'CON1'
 #         low_date:     long uint representing LSBytes of 64bit NT date
 #         high_date:    long uint representing MSBytes of 64bit NT date
-#         timestamp:    datetime.datetime object of NT date, assumed to be UTC
+#         timestamp:    numpy.datetime64[ms] object of NT date, assumed to be UTC
 
 
 #         beam_config             [str]    xml string
@@ -859,7 +926,7 @@ class SimradRawParser(_SimradDatagramParser):
         type:         string == 'RAW0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:    datetime.datetime object of NT date, assumed to be UTC
+        timestamp:    numpy.datetime64[ms] object of NT date, assumed to be UTC
 
         channel                         [short] Channel number
         mode                            [short] 1 = Power only, 2 = Angle only 3 = Power & Angle
@@ -891,6 +958,8 @@ class SimradRawParser(_SimradDatagramParser):
                         ready for writing to disk
     '''
 
+    _unpack_in_place = True
+
     def __init__(self):
         headers = {0:[('type', '4s'),
                         ('low_date', 'L'),
@@ -920,30 +989,30 @@ class SimradRawParser(_SimradDatagramParser):
 
     def _unpack_contents(self, raw_string, version):
 
-        header_values = struct.unpack(self.header_fmt(version), raw_string[:self.header_size(version)])
-
         data = {}
 
         if version == 0:
-            for indx, field in enumerate(self.header_fields(version)):
-                data[field] = header_values[indx]
-                if isinstance(data[field], bytes):
-                    data[field] = data[field].decode()
+            data = self.unpack_header(raw_string, version=version)
 
-            data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+            data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
             if data['count'] > 0:
                 block_size = data['count'] * 2
                 indx = self.header_size(version)
 
+                #  np.frombuffer returns a view into raw_string so no copy is
+                #  made here. When raw_string is a memoryview of a mapped file,
+                #  the sample arrays reference the mapping directly.
                 if int(data['mode']) & 0x1:
-                    data['power'] = np.fromstring(raw_string[indx:indx + block_size], dtype='int16')
+                    data['power'] = np.frombuffer(raw_string, dtype='int16',
+                            count=data['count'], offset=indx)
                     indx += block_size
                 else:
                     data['power'] = None
 
                 if int(data['mode']) & 0x2:
-                    data['angle'] = np.fromstring(raw_string[indx:indx + block_size], dtype='uint16')
+                    data['angle'] = np.frombuffer(raw_string, dtype='uint16',
+                            count=data['count'], offset=indx)
                 else:
                     data['angle'] = None
 
@@ -990,3 +1059,8 @@ class SimradRawParser(_SimradDatagramParser):
                     datagram_contents.extend(data['angle'])
 
         return struct.pack(datagram_fmt, *datagram_contents)
+
+
+#  numpy dtype of the RAW0 sample datagram header.  Used to decode the headers
+#  of many RAW0 datagrams at once without parsing each datagram.
+RAW0_HEADER_DTYPE = SimradRawParser().header_dtype(0)
@@ -0,0 +1,266 @@
+# coding=utf-8
+
+#     National Oceanic and Atmospheric Administration (NOAA)
+#     Alaskan Fisheries Science Center (AFSC)
+#     Resource Assessment and Conservation Engineering (RACE)
+#     Midwater Assessment and Conservation Engineering (MACE)
+
+#  THIS SOFTWARE AND ITS DOCUMENTATION ARE CONSIDERED TO BE IN THE PUBLIC DOMAIN
+#  AND THUS ARE AVAILABLE FOR UNRESTRICTED PUBLIC USE. THEY ARE FURNISHED "AS IS."
+#  THE AUTHORS, THE UNITED STATES GOVERNMENT, ITS INSTRUMENTALITIES, OFFICERS,
+#  EMPLOYEES, AND AGENTS MAKE NO WARRANTY, EXPRESS OR IMPLIED, AS TO THE USEFULNESS
+#  OF THE SOFTWARE AND DOCUMENTATION FOR ANY PURPOSE. THEY ASSUME NO RESPONSIBILITY
+#  (1) FOR THE USE OF THE SOFTWARE AND DOCUMENTATION; OR (2) TO PROVIDE TECHNICAL
+#  SUPPORT TO USERS.
+
+'''
+.. module:: echolab2.instruments.util.power_conversion
+
+    :synopsis:  In place conversion of power to Sv/sv/Sp/sp
+
+    The conversion of received power to Sv or Sp adds a range dependent
+    term (the TVG and absorption) and subtracts a per ping term (the system
+    gains and sa correction) from every sample:
+
+        out[i, j] = power[i, j] + tvg[j] + 2 * alpha[i] * range[j] - gains[i]
+
+    and optionally converts the result to linear units. The conversion is
+    done in place in the data array, in blocks of pings so the scratch
+    memory is bounded. The arithmetic is done in the dtype of the data
+    array.
+
+    The corrected range and TVG vectors only depend on the range vector so
+    they are cached by range_terms in a small LRU cache.
+
+    Three engines are available. The numpy engine is always available. The
+    numexpr and numba engines are used when those packages are installed.
+    They compute the result in a single pass over the data without any
+    scratch arrays.
+
+| Maintained by:
+|       Rick Towler   <rick.towler@noaa.gov>
+
+$Id$
+'''
+
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+__all__ = ['ENGINES', 'DEFAULT_ENGINE', 'BLOCK_SIZE', 'TERMS_CACHE_SIZE',
+           'available_engines', 'range_terms', 'convert_power']
+
+#: The names of the conversion engines.
+ENGINES = ['numexpr', 'numba', 'numpy']
+
+#: The target size of a block of samples in bytes. This bounds the scratch
+#: memory used by the numpy engine.
+BLOCK_SIZE = 8 * 1024 * 1024
+
+#: The number of range and TVG vectors kept by range_terms.
+TERMS_CACHE_SIZE = 32
+
+#  The range_terms cache, least recently used first.
+_terms_cache = OrderedDict()
+
+
+def available_engines():
+    '''
+    Returns a list of the names of the engines that can be used on this
+    system, from the fastest to the slowest.
+    '''
+
+    engines = []
+    if numexpr is not None:
+        engines.append('numexpr')
+    if numba is not None:
+        engines.append('numba')
+    engines.append('numpy')
+
+    return engines
+
+
+#: The engine used when convert_power is not given one. This is the fastest
+#: engine available. Set it to 'numpy' to always use numpy.
+DEFAULT_ENGINE = available_engines()[0]
+
+
+def range_terms(n_samples, sample_thickness, sample_offset,
+                tvg_correction=0, tvg_factor=20.0):
+    '''
+    :param n_samples: The number of samples
+    :type n_samples: int
+
+    :param sample_thickness: The sample thickness in meters
+    :type sample_thickness: float
+
+    :param sample_offset: The sample offset of the first sample
+    :type sample_offset: float
+
+    :param tvg_correction: The number of samples the range is reduced by
+        for the TVG and absorption calculations. Negative ranges are set
+        to 0.
+    :type tvg_correction: float
+
+    :param tvg_factor: The TVG factor, 20 for Sv and 40 for Sp
+    :type tvg_factor: float
+
+    Returns a tuple (c_range, tvg) of the (corrected) range and the time
+    varied gain of each sample. The range of sample i is (i +
+    sample_offset) * sample_thickness. The results are cached and the
+    returned arrays are read only.
+    '''
+
+    key = (int(n_samples), float(sample_thickness), float(sample_offset),
+           float(tvg_correction), float(tvg_factor))
+    terms = _terms_cache.get(key)
+    if terms is not None:
+        #  Mark the entry as most recently used.
+        del _terms_cache[key]
+        _terms_cache[key] = terms
+        return terms
+
+    #  Get the range and apply the TVG correction.
+    c_range = (np.arange(0, n_samples) + sample_offset) * sample_thickness
+    if tvg_correction:
+        c_range -= tvg_correction * sample_thickness
+        c_range[c_range < 0] = 0
+
+    #  Calculate the time varied gain.
+    tvg = c_range.copy()
+    tvg[tvg <= 0] = 1
+    tvg[:] = tvg_factor * np.log10(tvg)
+    tvg[tvg < 0] = 0
+
+    c_range.flags.writeable = False
+    tvg.flags.writeable = False
+    terms = (c_range, tvg)
+
+    _terms_cache[key] = terms
+    while len(_terms_cache) > TERMS_CACHE_SIZE:
+        _terms_cache.popitem(last=False)
+
+    return terms
+
+
+def convert_power(data, tvg, c_range, absorption_coefficient, gains,
+                  linear=False, engine=None, block_pings=None):
+    '''
+    :param data: The power data in dB. The array is modified in place.
+    :type data: 2d float array (pings x samples)
+
+    :param tvg: The time varied gain of each sample in dB.
+    :type tvg: 1d array (samples)
+
+    :param c_range: The (corrected) range of each sample in meters.
+    :type c_range: 1d array (samples)
+
+    :param absorption_coefficient: The absorption coefficient of each ping.
+    :type absorption_coefficient: 1d array (pings)
+
+    :param gains: The gains of each ping in dB that are subtracted from
+        the data, including the sa correction.
+    :type gains: 1d array (pings)
+
+    :param linear: Set to True to convert the result to linear units.
+    :type linear: bool
+
+    :param engine: The name of the engine to use (see ENGINES). If None,
+        DEFAULT_ENGINE is used.
+    :type engine: str
+
+    :param block_pings: The number of pings converted at a time by the
+        numpy and numexpr engines. If None, the blocks hold about
+        BLOCK_SIZE bytes of samples.
+    :type block_pings: int
+
+    Converts power to Sv/Sp (or sv/sp if linear is True) in place and
+    returns data.
+    '''
+
+    if engine is None:
+        engine = DEFAULT_ENGINE
+    if engine not in available_engines():
+        raise ValueError("The power conversion engine " + str(engine) +
+                         " is not available.")
+
+    #  Cast the terms to the type of the data so the arithmetic is done
+    #  in that type.
+    dtype = data.dtype
+    tvg = np.asarray(tvg, dtype=dtype)
+    alpha2 = 2.0 * np.asarray(absorption_coefficient, dtype=dtype)
+    c_range = np.asarray(c_range, dtype=dtype)
+    gains = np.asarray(gains, dtype=dtype)
+
+    n_pings, n_samples = data.shape
+    if n_pings == 0 or n_samples == 0:
+        return data
+
+    if engine == 'numba':
+        #  The numba kernel works ping by ping without scratch memory.
+        _convert_numba(data, tvg, c_range, alpha2, gains, bool(linear),
+                       dtype.type(np.log(10.0) / 10.0))
+        return data
+
+    if block_pings is None:
+        block_pings = max(1, BLOCK_SIZE // (n_samples * dtype.itemsize))
+
+    if engine == 'numexpr':
+        #  10^(x/10) is computed as exp(x * ln(10)/10).
+        if linear:
+            expression = 'exp((d + t + a * r - g) * s)'
+        else:
+            expression = 'd + t + a * r - g'
+        scale = dtype.type(np.log(10.0) / 10.0)
+        t = tvg[np.newaxis, :]
+        r = c_range[np.newaxis, :]
+        for start in range(0, n_pings, block_pings):
+            block = data[start:start + block_pings]
+            numexpr.evaluate(expression, local_dict={'d': block, 't': t,
+                    'r': r, 'a': alpha2[start:start + block_pings, np.newaxis],
+                    'g': gains[start:start + block_pings, np.newaxis],
+                    's': scale}, out=block, casting='same_kind')
+        return data
+
+    #  The numpy engine uses one scratch block for the absorption term.
+    scratch = np.empty((min(block_pings, n_pings), n_samples), dtype=dtype)
+    for start in range(0, n_pings, block_pings):
+        block = data[start:start + block_pings]
+        absorption = scratch[:block.shape[0]]
+        np.multiply(alpha2[start:start + block_pings, np.newaxis],
+                    c_range[np.newaxis, :], out=absorption)
+        block += absorption
+        block += tvg
+        block -= gains[start:start + block_pings, np.newaxis]
+        if linear:
+            #  10^(x/10) computed in place.
+            block /= dtype.type(10.0)
+            np.power(dtype.type(10.0), block, out=block)
+
+    return data
+
+
+if numba is not None:
+    @numba.njit(nogil=True)
+    def _convert_numba(data, tvg, c_range, alpha2, gains, linear, scale):
+        '''
+        The numba conversion kernel. See convert_power. 10^(x/10) is
+        computed as exp(x * scale) where scale is ln(10)/10.
+        '''
+        for i in range(data.shape[0]):
+            for j in range(data.shape[1]):
+                value = data[i, j] + tvg[j] + alpha2[i] * c_range[j] - gains[i]
+                if linear:
+                    value = np.exp(value * scale)
+                data[i, j] = value
+else:
+    _convert_numba = None
@@ -87,6 +87,12 @@ class PingData(object):
         # required attribute that all data objects must have.
         self._data_attributes = ['ping_time']
 
+        # The time sort permutation of the pings is cached by
+        # _get_time_order.  The cache stores the ping_time array it was
+        # computed from, the permutation and the sorted times.  Methods that
+        # change ping_time in place must call _invalidate_time_order.
+        self._time_sort = None
+
         # Attributes are added using the add_attribute method. You can add
         # them manually by appending the name of the new attribute to the
         # _data_attributes dictionary and then setting the attribute using
@@ -327,11 +333,13 @@ class PingData(object):
                 elif data.ndim == 2:
                     # Insert the new data.
                     data[replace_index, :] = data_to_insert[:,:]
-
                 else:
                     #TODO:   At some point do we handle 3d arrays?
                     pass
 
+        # The ping times have changed.
+        self._invalidate_time_order()
+
         # Update our global properties.
         if obj_to_insert.channel_id not in self.channel_id:
             self.channel_id += obj_to_insert.channel_id
@@ -391,9 +399,9 @@ class PingData(object):
             attr = getattr(self, attr_name)
             if isinstance(attr, np.ndarray) and (attr.ndim == 2):
                 if remove:
-                    attr[0:new_n_pings, :] = attr[keep_idx, :]
+                    self._move_pings(attr, np.arange(new_n_pings), keep_idx)
                 else:
-                    attr[del_idx, :] = np.nan
+                    attr[del_idx, :] = self._get_fill_value(attr)
             else:
                 if remove:
                     # Copy the data we're keeping into a contiguous block.
@@ -419,6 +427,7 @@ class PingData(object):
         # If we're removing the pings, shrink the arrays.
         if remove:
             self.resize(new_n_pings, self.n_samples)
+        self._invalidate_time_order()
 
         # Update the n_pings attribute.
         self.n_pings = self.ping_time.shape[0]
@@ -609,13 +618,16 @@ class PingData(object):
                 elif data.ndim == 2:
                     # Move the existing data from right to left to avoid
                     # overwriting data yet to be moved.
-                    data[move_index[::-1], :] = data[move_idx[::-1],:]
+                    self._move_pings(data, move_index, move_idx)
                     # Insert the new data.
                     data[insert_index, :] = data_to_insert[:,:]
                 else:
                     # TODO:  At some point do we handle 3d arrays?
                     pass
 
+        # The ping times have changed.
+        self._invalidate_time_order()
+
         # Now update our global properties.
         if obj_to_insert.channel_id not in self.channel_id:
             self.channel_id += obj_to_insert.channel_id
@@ -698,6 +710,8 @@ class PingData(object):
             # Update the attribute.
             setattr(self, attr_name, attr)
 
+        self._invalidate_time_order()
+
 
     def resize(self, new_ping_dim, new_sample_dim):
         """Iterates through the provided list of attributes and resizes them.
@@ -712,28 +726,6 @@ class PingData(object):
                 array (vertical axis).
         """
 
-        def _resize2d(data, ping_dim, sample_dim):
-            """
-            _resize2d returns a new array of the specified dimensions with the
-            data from the provided array copied into it. This function is
-            used when we need to resize 2d arrays along the minor axis as
-            ndarray.resize and numpy.resize don't maintain the order of the
-            data in these cases.
-            """
-
-            # If the minor axis is changing, we have to either concatenate or
-            # copy into a new resized array.  We take the second approach
-            # for now, as there shouldn't be a performance differences between
-            # the two approaches.
-
-            # Create a new array.
-            new_array = np.empty((ping_dim, sample_dim))
-            # Fill it with NaNs.
-            new_array.fill(np.nan)
-            # Copy the data into our new array and return it.
-            new_array[0:data.shape[0], 0:data.shape[1]] = data
-            return new_array
-
         # Store the old sizes.
         old_sample_dim = self.n_samples
         old_ping_dim = self.ping_time.shape[0]
@@ -763,20 +755,15 @@ class PingData(object):
                     attr = np.resize(attr,(new_ping_dim))
             elif attr.ndim == 2:
                 # Resize this 2d sample data array.
-                if new_sample_dim == old_sample_dim:
-                    # If the minor axes isn't changing, we can use
-                    # np.resize() function.
-                    attr = np.resize(attr,(new_ping_dim, new_sample_dim))
-                else:
-                    # If the minor axes is changing, we need to use our
-                    # resize2d function.
-                    attr = _resize2d(attr, new_ping_dim, new_sample_dim)
+                attr = self._resize_2d(attr_name, attr, new_ping_dim,
+                                       new_sample_dim)
 
             #  Update the attribute.
             setattr(self, attr_name, attr)
 
         # Set the new sample count.
         self.n_samples = new_sample_dim
+        self._invalidate_time_order()
 
         # We cannot update the n_pings attribute here since raw_data uses
         # this attribute to store the number of pings read, *not* the total
@@ -785,6 +772,100 @@ class PingData(object):
         # permits, in other methods of this class.
 
 
+    def _resize_2d(self, attr_name, data, ping_dim, sample_dim):
+        """Returns a 2d data array resized to the given dimensions.
+
+        Child classes that store their sample data in something other than
+        in-memory numpy arrays can reimplement this method.
+
+        Args:
+            attr_name (str): The name of the attribute being resized.
+            data (array): The 2d array to resize.
+            ping_dim (int): The new ping dimension.
+            sample_dim (int): The new sample dimension.
+
+        Returns:
+            The resized array.
+        """
+
+        if data.shape == (ping_dim, sample_dim):
+            # The array is already the right size.  This is the case when
+            # trimming arrays that were allocated at their final size.
+            return data
+        elif data.shape[1] == sample_dim:
+            # If the minor axes isn't changing, we can use np.resize().
+            return np.resize(data, (ping_dim, sample_dim))
+
+        # If the minor axis is changing, we have to either concatenate or
+        # copy into a new resized array.  We take the second approach
+        # for now, as there shouldn't be a performance differences between
+        # the two approaches.  ndarray.resize and numpy.resize don't
+        # maintain the order of the data in these cases.
+        new_array = np.empty((ping_dim, sample_dim), dtype=data.dtype)
+        # Fill it with NaNs (or the fill value for integer data).
+        new_array.fill(self._get_fill_value(data))
+        # Copy the data into our new array and return it.
+        n_pings = min(ping_dim, data.shape[0])
+        n_samples = min(sample_dim, data.shape[1])
+        new_array[0:n_pings, 0:n_samples] = data[0:n_pings, 0:n_samples]
+
+        return new_array
+
+
+    def _move_pings(self, data, to_index, from_index, block_pings=1000):
+        """Moves the pings of a 2d data array within the array.
+
+        Only the pings that change position are copied and they are copied
+        in blocks of pings so the sample data aren't copied all at once.
+        This limits the memory used to move the pings of large or disk
+        backed arrays.
+
+        Args:
+            data (array): The 2d array.
+            to_index (array): The indices the pings are moved to.
+            from_index (array): The indices of the pings to move.  The pings
+                must all be moved in the same direction.
+            block_pings (int): The number of pings to copy at a time.
+        """
+
+        moved = to_index != from_index
+        to_index = to_index[moved]
+        from_index = from_index[moved]
+        n_moved = to_index.shape[0]
+        if n_moved == 0:
+            return
+
+        # Pings that move towards the end of the array are copied starting
+        # with the last block so we don't overwrite pings before they are
+        # moved.
+        blocks = range(0, n_moved, block_pings)
+        if to_index[0] > from_index[0]:
+            blocks = reversed(blocks)
+        for start in blocks:
+            block = slice(start, start + block_pings)
+            data[to_index[block], :] = data[from_index[block], :]
+
+
+    def _get_fill_value(self, data):
+        """Returns the value used to fill empty samples of a 2d data array.
+
+        Floating point arrays are filled with NaN.  Integer arrays can't
+        represent NaN so they are filled with the smallest value of their
+        type.
+
+        Args:
+            data (array): The data array.
+
+        Returns:
+            The fill value for the array.
+        """
+
+        if data.dtype.kind in 'iu':
+            return np.iinfo(data.dtype).min
+        else:
+            return np.nan
+
+
     def get_indices(self, start_ping=None, end_ping=None, start_time=None,
                     end_time=None, time_order=True):
         """Returns a boolean index array containing where the indices in the
@@ -795,7 +876,12 @@ class PingData(object):
         arrays.
 
         Note that pings with "empty" times (ping time == NaT) will be sorted
-        to the beginning of the index array.
+        to the end of the index array.  The time sort order is cached so
+        repeated calls don't sort the ping times again.  The PingData
+        methods that change the pings update the cache and it is checked
+        against the length and first and last ping times, but if other ping
+        times are changed in place (e.g. obj.ping_time[i] = t) you must call
+        _invalidate_time_order() before calling get_indices.
 
         Args:
             start_ping (int): The starting ping of the range of pings specified.
@@ -812,42 +898,93 @@ class PingData(object):
             The indices that are included in the specified range.
         """
 
-        # Generate the ping number vector.  We start counting pings at 1.
-        ping_number = np.arange(self.n_pings) + 1
-
         # If starts and/or ends are omitted, assume first and last respectively.
         if start_ping == start_time is None:
-            start_ping = ping_number[0]
+            start_ping = 1
         if end_ping == end_time is None:
-            end_ping = ping_number[-1]
+            end_ping = self.n_pings
 
-        # Get the primary index.
         if time_order:
-            # Return indices in time order.  Note that empty ping times will be
-            # sorted to the front.
-            primary_index = self.ping_time.argsort()
+            # Get the indices in time order.  Note that empty ping times
+            # will be sorted to the end.
+            primary_index, sorted_times = self._get_time_order()
+
+            # The times are sorted so we can find the range of times with a
+            # binary search.
+            first = 0
+            last = primary_index.shape[0]
+            if start_time:
+                first = np.searchsorted(sorted_times,
+                        np.datetime64(start_time, 'ms'), side='left')
+            if end_time:
+                last = np.searchsorted(sorted_times,
+                        np.datetime64(end_time, 'ms'), side='right')
+            primary_index = primary_index[first:max(first, last)]
         else:
             # Return indices in ping order.
-            primary_index = ping_number - 1
-
-        # Generate a boolean mask of the values to return.
-        if start_time:
-            mask = self.ping_time[primary_index] >= start_time
-        elif start_ping >= 1:
-            mask = ping_number[primary_index] >= start_ping
-        if end_time:
-            mask = np.logical_and(mask, self.ping_time[primary_index] <=
-                                  end_time)
-        elif end_ping >= 2:
-            mask = np.logical_and(mask, ping_number[primary_index] <= end_ping)
+            primary_index = np.arange(self.ping_time.shape[0])
+            mask = np.ones(primary_index.shape[0], dtype=bool)
+            if start_time:
+                mask &= self.ping_time >= start_time
+            if end_time:
+                mask &= self.ping_time <= end_time
+            primary_index = primary_index[mask]
+
+        # Apply the ping number bounds.  We start counting pings at 1.
+        if not start_time and start_ping is not None:
+            primary_index = primary_index[primary_index + 1 >= start_ping]
+        if not end_time and end_ping is not None:
+            primary_index = primary_index[primary_index + 1 <= end_ping]
 
         # Return the indices that are included in the specified range.
-        return primary_index[mask]
+        return primary_index
+
+
+    def _get_time_order(self):
+        """Returns the time sort permutation of the pings.
+
+        The permutation is cached until the ping times change.  The cache
+        is checked against the ping_time array and a fingerprint of its
+        length and first and last times, so replacing the array or changing
+        its ends in place discards it.  Other in place changes to the ping
+        times must call _invalidate_time_order.  If the ping times are
+        already in order (the usual case), the permutation is the identity
+        and the ping times aren't sorted.
+
+        Returns:
+            The indices that sort the ping times and the sorted ping times.
+        """
+
+        ping_time = self.ping_time
+        fingerprint = (ping_time.shape[0], ping_time[:1].tobytes(),
+                       ping_time[-1:].tobytes())
+        time_sort = getattr(self, '_time_sort', None)
+        if (time_sort is None or time_sort[0] is not ping_time or
+                time_sort[1] != fingerprint):
+            if np.all(ping_time[1:] >= ping_time[:-1]):
+                time_sort = (ping_time, fingerprint,
+                             np.arange(ping_time.shape[0]), ping_time)
+            else:
+                order = ping_time.argsort(kind='stable')
+                time_sort = (ping_time, fingerprint, order, ping_time[order])
+            self._time_sort = time_sort
+
+        return time_sort[2], time_sort[3]
+
+
+    def _invalidate_time_order(self):
+        """Discards the cached time sort permutation of the pings.
+
+        This must be called when the ping times are changed in place.
+        """
+
+        self._time_sort = None
 
 
     def _vertical_resample(self, data, sample_intervals,
                            unique_sample_intervals, resample_interval,
-                           sample_offsets, min_sample_offset, is_power=True):
+                           sample_offsets, min_sample_offset, is_power=True,
+                           sample_counts=None):
         """Vertically resamples sample data given a target sample interval.
 
         This method also shifts samples vertically based on their sample
@@ -855,21 +992,83 @@ class PingData(object):
         first sample in the resulting array will have an offset that is the
         minimum of all offsets in the data.
 
+        The resampling is done from a plan that groups the pings by their
+        resampling factor, sample count and output offset.  Each group is
+        then resampled as a single block.  Pings with a longer sample
+        interval than the target have their samples replicated.  Pings with
+        a shorter sample interval have their samples averaged, power in
+        linear units.  A final partial group of samples is averaged over the
+        samples it has.
+
         Args:
-            data:
-            sample_intervals:
-            unique_sample_intervals:
-            resample_interval:
-            sample_offsets:
-            min_sample_offset:
-            is_power:
+            data (array): The sample data to resample.
+            sample_intervals (array): The sample interval of each ping.
+            unique_sample_intervals (array): The unique sample intervals.
+            resample_interval (float): The target sample interval or 0 to
+                use the shortest and 1 to use the longest sample interval in
+                the data.
+            sample_offsets (array): The sample offset of each ping.
+            min_sample_offset (int): The minimum sample offset.
+            is_power (bool): Set to True if the data are power in dB.
+            sample_counts (array): The number of samples of each ping.  If
+                None, the counts are determined by finding the last non-NaN
+                sample of each ping.
 
         Returns:
             The resampled data and the sampling interval used.
         """
 
+        # Get the sample counts.  If they aren't provided, the generalized
+        # method works with both raw_data and processed_data classes and
+        # finds the first non-NaN value searching from the "bottom up".
+        if sample_counts is None:
+            has_samples = ~np.isnan(data)
+            sample_counts = data.shape[1] - np.argmax(has_samples[:, ::-1],
+                                                      axis=1)
+            sample_counts[~has_samples.any(axis=1)] = 0
+            del has_samples
+
+        # Build the resampling plan and apply it.
+        plan = self._get_resample_plan(sample_intervals,
+                unique_sample_intervals, resample_interval, sample_offsets,
+                min_sample_offset, sample_counts, data.shape[1])
+
+        return self._apply_resample_plan(data, plan, is_power=is_power), \
+               plan[0]
+
+
+    def _get_resample_plan(self, sample_intervals, unique_sample_intervals,
+                           resample_interval, sample_offsets,
+                           min_sample_offset, sample_counts, n_samples):
+        """Computes the plan used to vertically resample sample data.
+
+        The plan only depends on the sample intervals, offsets and counts of
+        the pings so it can be reused to resample different sample data
+        attributes of the same pings.  See _vertical_resample.
+
+        Args:
+            sample_intervals (array): The sample interval of each ping.
+            unique_sample_intervals (array): The unique sample intervals.
+            resample_interval (float): The target sample interval or 0 to
+                use the shortest and 1 to use the longest sample interval in
+                the data.
+            sample_offsets (array): The sample offset of each ping.
+            min_sample_offset (int): The minimum sample offset.
+            sample_counts (array): The number of samples of each ping.
+            n_samples (int): The number of samples in the sample data.
+
+        Returns:
+            A tuple (resample_interval, n_pings, new_sample_dims, groups)
+            where groups is a list of (factor, count, dest, rows) tuples.
+            Factor is the number of output samples per sample when
+            expanding (positive) or the number of samples averaged per
+            output sample when reducing (negative), count is the sample
+            count of the pings, dest is the index of the first output
+            sample and rows are the indices of the pings in the group.
+        """
+
         # Determine the number of pings in the new array.
-        n_pings = data.shape[0]
+        n_pings = sample_intervals.shape[0]
 
         # Check if we need to substitute our resample_interval value.
         if resample_interval == 0:
@@ -879,61 +1078,63 @@ class PingData(object):
             # Resample to the longest sample interval in our data.
             resample_interval = max(unique_sample_intervals)
 
-        # Generate a vector of sample counts.  The generalized method works
-        # with both raw_data and processed_data classes and finds the first
-        # non-NaN value searching from the "bottom up".
-        sample_counts = data.shape[1] - np.argmax(~np.isnan(np.fliplr(data)),
-                                                  axis=1)
-
-        # Create a couple of dictionaries to store resampling parameters by
-        # sample interval.  They will be used when we fill the output array
-        # with the resampled data.
-        resample_factor = {}
-        rows_this_interval = {}
-        sample_offsets_this_interval = {}
-
-        # Determine the number of samples in the output array.  To do this,
-        # we must loop through the sample intervals, determine the resampling
-        # factor, then find the maximum sample count at that sample interval
-        # (taking into account the sample's offset) and multiply by the
-        # resampling factor to determine the max number of samples for that
-        # sample interval.
-        new_sample_dims = 0
-        for sample_interval in unique_sample_intervals:
-            # Determine the resampling factor.
-            if resample_interval > sample_interval:
-                # We're reducing resolution.  Determine the number of samples
-                # to average.
-                resample_factor[sample_interval] = \
-                    resample_interval / sample_interval
-            else:
-                # We're increasing the resolution.  Determine the number of
-                # samples to expand.
-                resample_factor[sample_interval] = \
-                    sample_interval / resample_interval
-
-            # Determine the rows in this subset with this sample interval.
-            rows_this_interval[sample_interval] = np.where(
-                sample_intervals == sample_interval)[0]
-
-            # Determine the net vertical shift for the samples with this
-            # sample interval.
-            sample_offsets_this_interval[sample_interval] = \
-                sample_offsets[rows_this_interval[sample_interval]] - \
-                min_sample_offset
-
-            # Also, determine the maximum number of samples for this sample
-            # interval.  This has to be done on a row-by-row basis since
-            # sample number can change on the fly. We include the sample
-            # offset to ensure we have room to shift our samples vertically
-            # by the offset.
-            max_samples_this_sample_int = max(
-                sample_counts[rows_this_interval[sample_interval]] +
-                sample_offsets_this_interval[sample_interval])
-            max_dim_this_sample_int = int(round(
-                max_samples_this_sample_int * resample_factor[sample_interval]))
-            if max_dim_this_sample_int > new_sample_dims:
-                new_sample_dims = max_dim_this_sample_int
+        sample_counts = np.minimum(np.asarray(sample_counts, dtype=np.int64),
+                                   n_samples)
+
+        # Only pings with a sample interval and offset can be placed in the
+        # output.
+        valid = np.flatnonzero(~np.isnan(sample_intervals) &
+                               ~np.isnan(sample_offsets))
+        if valid.shape[0] == 0:
+            return resample_interval, n_pings, 0, []
+
+        ratio = sample_intervals[valid] / resample_interval
+        offsets = np.round(sample_offsets[valid] -
+                           min_sample_offset).astype(np.int64)
+        counts = sample_counts[valid]
+
+        # Determine the factors and the number of output samples of each
+        # ping.  Offsets are converted to output samples.
+        expanding = ratio >= 1
+        factor = np.where(expanding, np.round(ratio),
+                          -np.round(1.0 / ratio)).astype(np.int64)
+        n_out = np.where(expanding, counts * factor,
+                         -(counts // factor))
+        # (When reducing, -(counts // factor) rounds up the number of output
+        # samples since factor is negative.)
+        dest = np.where(expanding, offsets * factor,
+                        np.round(offsets / -factor.astype(float)).astype(
+                            np.int64))
+        new_sample_dims = max(int(np.max(dest + n_out)), 0)
+
+        # Group the pings that share a factor, sample count and output
+        # offset.
+        keys, group = np.unique(np.column_stack((factor, counts, dest)),
+                                axis=0, return_inverse=True)
+        group = group.ravel()
+        order = np.argsort(group, kind='stable')
+        group_rows = np.split(valid[order],
+                              np.cumsum(np.bincount(group))[:-1])
+        groups = [(int(group_factor), int(count), int(group_dest), rows)
+                  for (group_factor, count, group_dest), rows in
+                  zip(keys, group_rows) if count > 0]
+
+        return resample_interval, n_pings, new_sample_dims, groups
+
+
+    def _apply_resample_plan(self, data, plan, is_power=True):
+        """Vertically resamples sample data using a resampling plan.
+
+        Args:
+            data (array): The sample data to resample.
+            plan (tuple): The plan returned by _get_resample_plan.
+            is_power (bool): Set to True if the data are power in dB.
+
+        Returns:
+            The resampled data.
+        """
+
+        resample_interval, n_pings, new_sample_dims, groups = plan
 
         # Now that we know the dimensions of the output array, create it and
         # fill with NaNs.
@@ -941,72 +1142,47 @@ class PingData(object):
             (n_pings, new_sample_dims),dtype=self.sample_dtype, order='C')
         resampled_data.fill(np.nan)
 
-        # Also fill the array with data.  We loop through the sample intervals
-        # and within an interval, extract slices of data that share the same
-        # number of samples (to reduce looping).  We then determine if we're
-        # expanding or shrinking the number of samples.  If expanding we
-        # simply replicate existing sample data to fill out the expanded
-        # array. If reducing, we take the mean of the samples.  Power data is
-        # converted to linear units before the mean is computed and then
-        # transformed back.
-        for sample_interval in unique_sample_intervals:
-            # Determine the unique sample_counts for this sample interval.
-            unique_sample_counts = np.unique(
-                sample_counts[rows_this_interval[sample_interval]])
-            for count in unique_sample_counts:
-                # Determine if we're reducing, expanding, or keeping the same
-                # number of samples.
-                if resample_interval > sample_interval:
-                    # We're reducing the number of samples.
-
-                    # If we're resampling power, convert power to linear units.
-                    if is_power:
-                        this_data = np.power(
-                            data[rows_this_interval[sample_interval]][
-                                sample_counts[rows_this_interval[
-                                    sample_interval]] == count] / 20.0, 10.0)
-
-                    # Reduce the number of samples by taking the mean.
-                    this_data = np.mean(this_data.reshape(
-                        -1, int(resample_factor[sample_interval])), axis=1)
-
-                    if is_power:
-                        # Convert power back to log units.
-                        this_data = 20.0 * np.log10(this_data)
-
-                elif resample_interval < sample_interval:
-                    # We're increasing the number of samples.
-
-                    # Replicate the values to fill out the higher resolution
-                    # array.
-                    this_data = np.repeat(
-                        data[rows_this_interval[sample_interval]]
-                        [sample_counts[rows_this_interval[
-                            sample_interval]] == count][:, 0:count],
-                        int(resample_factor[sample_interval]), axis=1)
-
-                else:
-                    # No change in resolution for this sample interval.
-                    this_data = data[rows_this_interval[sample_interval]] \
-                    [sample_counts[rows_this_interval[sample_interval]]
-                        == count]
-
-                # Generate the index array for this sample interval/sample
-                # count chunk of data.
-                rows_this_interval_count = rows_this_interval[
-                    sample_interval][sample_counts[
-                        rows_this_interval[sample_interval]] == count]
-
-                # Assign new values to output array.  At the same time,
-                # we will shift the data by sample offset.
-                unique_sample_offsets = np.unique(
-                    sample_offsets_this_interval[sample_interval])
-                for offset in unique_sample_offsets:
-                    resampled_data[rows_this_interval_count,
-                    offset:offset + this_data.shape[1]] = this_data
-
-        # Return the resampled data and the sampling interval used.
-        return resampled_data, resample_interval
+        # Fill the output array one group at a time.
+        for group_factor, count, group_dest, rows in groups:
+            this_data = data[rows, 0:count]
+
+            if group_factor > 1:
+                # We're increasing the number of samples.  Replicate the
+                # values to fill out the higher resolution array.
+                this_data = np.repeat(this_data, group_factor, axis=1)
+
+            elif group_factor < -1:
+                # We're reducing the number of samples.  Average full groups
+                # of samples and then the remaining partial group.
+                n_average = -group_factor
+                n_full = count // n_average
+                n_samples = n_full + int(count % n_average > 0)
+
+                # If we're resampling power, convert power to linear units.
+                if is_power:
+                    this_data /= 10.0
+                    np.power(10.0, this_data, out=this_data)
+
+                averaged = np.empty((rows.shape[0], n_samples),
+                                    dtype=this_data.dtype)
+                averaged[:, 0:n_full] = this_data[:, 0:n_full *
+                        n_average].reshape(-1, n_full, n_average).mean(axis=2)
+                if n_samples > n_full:
+                    averaged[:, n_full] = this_data[:, n_full *
+                                                    n_average:].mean(axis=1)
+                this_data = averaged
+
+                if is_power:
+                    # Convert power back to log units.
+                    np.log10(this_data, out=this_data)
+                    this_data *= 10.0
+
+            # Assign new values to the output array shifted by the offset.
+            resampled_data[rows, group_dest:group_dest +
+                           this_data.shape[1]] = this_data
+
+        # Return the resampled data.
+        return resampled_data
 
 
     def _vertical_shift(self, data, sample_offsets, unique_sample_offsets,
@@ -1176,9 +1352,13 @@ class PingData(object):
                     else:
                         data[:] = value
                 else:
-                    # Create the 2d array(s).
+                    # Create the 2d array(s).  Integer arrays can't hold
+                    # NaNs so they are filled with their fill value.
                     data = np.empty((n_pings, self.n_samples), dtype=attr.dtype)
-                    data[:, :] = value
+                    if data.dtype.kind in 'iu' and np.isnan(value):
+                        data[:, :] = self._get_fill_value(data)
+                    else:
+                        data[:, :] = value
 
             # Add the attribute to our empty object.  We can skip using
             # add_attribute here because we shouldn't need to check
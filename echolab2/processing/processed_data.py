@@ -571,25 +571,41 @@ class ProcessedData(PingData):
 
         # Check if this is not a constant shift.
         if vert_ext != 0:
-            # Not a constant, work through the 2d attributes and interpolate
-            # the sample data.
-
-            # First convert to linear units if required.
-            if self.is_log:
-                is_log = True
-                self.to_linear()
-            else:
-                is_log = False
+            # Not a constant, shift the sample data of each ping.  Relative
+            # to the new axis, the samples of a ping are shifted down by
+            # (vert_shift - min_shift) / sample_thickness samples.  Shifts
+            # within 1/10000 of a sample of a whole sample are treated as
+            # whole sample shifts.
+            sample_shift = (np.asarray(vert_shift, dtype='float64') -
+                            min_shift) / self.sample_thickness
+            whole_shift = np.round(sample_shift)
+            is_whole = np.abs(sample_shift - whole_shift) < 1e-4
+            whole_shift = whole_shift.astype(np.int64)
+
+            # Pings shifted by whole samples are copied to their new
+            # position.  This doesn't require interpolation so it's done in
+            # the units of the data.
+            whole_pings = np.flatnonzero(is_whole)
+            if whole_pings.shape[0] > 0:
+                self._shift_samples(whole_pings, whole_shift[whole_pings],
+                                    old_samps)
+
+            # The remaining pings are linearly interpolated in linear units.
+            frac_pings = np.flatnonzero(~is_whole)
+            if frac_pings.shape[0] > 0:
+                # First convert to linear units if required.
+                if self.is_log:
+                    is_log = True
+                    self.to_linear()
+                else:
+                    is_log = False
 
-            # Iterate through the pings and interpolate.
-            for ping in range(self.n_pings):
-                self.data[ping, :] = np.interp(
-                    new_axis, vert_axis + vert_shift[ping],
-                    self.data[ping, :old_samps], left=np.nan, right=np.nan)
+                self._shift_samples(frac_pings, sample_shift[frac_pings],
+                                    old_samps)
 
-            # Convert back to log units if required.
-            if is_log:
-                self.to_log()
+                # Convert back to log units if required.
+                if is_log:
+                    self.to_log()
 
         # Assign the new axis.
         if to_depth:
@@ -602,22 +618,83 @@ class ProcessedData(PingData):
             vert_axis = new_axis
 
 
+    def _shift_samples(self, pings, shifts, n_samples, block_samples=1048576):
+        """Shifts the sample data of pings down by a number of samples.
+
+        The first n_samples samples of each ping are shifted down by the
+        ping's shift, linearly interpolating between the original samples
+        when the shift is not a whole number of samples.  Samples that fall
+        outside of the ping's original samples are set to NaN.  This is
+        equivalent to calling np.interp with left and right set to NaN for
+        each ping.  Data shifted by fractional samples should be in linear
+        units.
+
+        The pings are processed in blocks.  The samples of a block are first
+        moved by the whole part of their shift, grouping the pings that
+        share it, and then interpolated between neighboring samples using
+        the fractional part.
+
+        Args:
+            pings (array): The indices of the pings to shift.
+            shifts (array): The shift of each ping in samples.
+            n_samples (int): The number of samples of the pings before the
+                shift.
+            block_samples (int): The approximate number of samples shifted
+                at a time.
+        """
+        whole = np.floor(shifts).astype(np.int64)
+        fraction = (shifts - whole).astype(self.data.dtype)
+        block_pings = max(1, block_samples // max(self.n_samples, 1))
+
+        for start in range(0, pings.shape[0], block_pings):
+            rows = pings[start:start + block_pings]
+            block_whole = whole[start:start + block_pings]
+            block_fraction = fraction[start:start + block_pings]
+
+            # Move the samples by the whole part of the shift.  The samples
+            # are copied out first since the source and destination overlap.
+            samples = self.data[rows, 0:n_samples]
+            block = np.full((rows.shape[0], self.n_samples), np.nan,
+                            dtype=self.data.dtype)
+            unique_whole, group = np.unique(block_whole, return_inverse=True)
+            for shift_idx, shift in enumerate(unique_whole):
+                in_group = group == shift_idx
+                n_copy = min(n_samples, self.n_samples - shift)
+                block[in_group, shift:shift + n_copy] = \
+                        samples[in_group, 0:n_copy]
+
+            # Interpolate the fractional part.  Sample j is interpolated
+            # between the moved samples j - 1 and j with a weight of fraction
+            # for sample j - 1.
+            if np.any(block_fraction != 0):
+                block_fraction = block_fraction[:, np.newaxis]
+                interpolated = np.empty_like(block)
+                interpolated[:, 0] = np.nan
+                np.multiply(block[:, :-1], block_fraction,
+                            out=interpolated[:, 1:])
+                block *= 1 - block_fraction
+                interpolated[:, 1:] += block[:, 1:]
+                block = interpolated
+
+            self.data[rows, :] = block
+
+
     def to_linear(self):
         """Converts sample data from log to linear."""
         # Check if we're already in linear form.
         if not self.is_log:
             return
 
-        # Convert the "known" types.
+        # Convert in place.  We're going to assume you know what you're
+        # doing if the data isn't one of the "known" types.
+        self.data /= 10.0
+        np.power(10.0, self.data, out=self.data)
+
+        # Update the "known" types.
         if self.data_type == 'Sv':
-            self.data[:] = 10.0 ** (self.data / 10.0)
             self.data_type = 'sv'
         elif self.data_type == 'Sp':
-            self.data[:] = 10.0 ** (self.data / 10.0)
             self.data_type = 'sp'
-        else:
-            # We're going to assume you know what you're doing.
-            self.data[:] = 10.0 ** (self.data / 10.0)
 
         # Set the is_log flag.
         self.is_log = False
@@ -629,16 +706,16 @@ class ProcessedData(PingData):
         if self.is_log:
             return
 
-        # Convert the "known" types.
+        # Convert in place.  We're going to assume you know what you're
+        # doing if the data isn't one of the "known" types.
+        np.log10(self.data, out=self.data)
+        self.data *= 10.0
+
+        # Update the "known" types.
         if self.data_type == 'sv':
-            self.data[:] = 10.0 * np.log10(self.data)
             self.data_type = 'Sv'
         elif self.data_type == 'sp':
-            self.data[:] = 10.0 * np.log10(self.data)
             self.data_type = 'Sp'
-        else:
-            # We're going to assume you know what you're doing.
-            self.data[:] = 10.0 * np.log10(self.data)
 
         # Set the is_log flag.
         self.is_log = True
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+This script compares the time required to read .raw files using the per
+datagram RawData.append_ping path and the bulk RawData.append_pings path.
+Both paths are run with the buffered and mmap backends and the results are
+checked to make sure they are identical.
+
+usage: python perf_bulk_decode.py file1.raw [file2.raw ...]
+"""
+
+import sys
+import time
+import numpy as np
+from echolab2.instruments import EK60
+
+
+def read(raw_files, **kwargs):
+    '''
+    read reads the files and returns the EK60 object and the elapsed time
+    '''
+    ek60 = EK60.EK60()
+    s = time.time()
+    ek60.read_raw(raw_files, **kwargs)
+    e = time.time()
+
+    return ek60, e - s
+
+
+def compare(ek60_a, ek60_b):
+    '''
+    compare checks that the power and angle data are identical
+    '''
+    for channel_id in ek60_a.channel_ids:
+        raw_a = ek60_a.get_raw_data(channel_id=channel_id)
+        raw_b = ek60_b.get_raw_data(channel_id=channel_id)
+        for attr in ['power', 'angles_alongship_e', 'angles_athwartship_e',
+                     'ping_time', 'sample_count']:
+            if not np.array_equal(getattr(raw_a, attr), getattr(raw_b, attr),
+                                  equal_nan=attr != 'ping_time' and
+                                  attr != 'sample_count'):
+                return False
+
+    return True
+
+
+if len(sys.argv) < 2:
+    print(__doc__)
+    sys.exit(1)
+
+raw_files = sys.argv[1:]
+
+#  read the files once to warm up the OS file cache
+read(raw_files)
+
+for backend in ['buffered', 'mmap']:
+    ek60_ping, t_ping = read(raw_files, backend=backend)
+    ek60_bulk, t_bulk = read(raw_files, backend=backend, bulk=True)
+
+    print('backend: ' + backend)
+    print('    append_ping  (s): ' + str(t_ping))
+    print('    append_pings (s): ' + str(t_bulk))
+    print('    speedup: ' + str(t_ping / t_bulk))
+    print('    identical: ' + str(compare(ek60_ping, ek60_bulk)))
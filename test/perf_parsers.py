@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+This script times the datagram parsers in echolab2.instruments.util.parsers.
+A synthetic datagram is created for each datagram type and parsed using
+from_string (a bytes object containing a single datagram) and unpack_from
+(a datagram within a larger buffer, as when reading a memory mapped file).
+
+usage: python perf_parsers.py [n_iterations]
+"""
+
+import sys
+import struct
+import timeit
+import numpy as np
+from echolab2.instruments.util import parsers
+from echolab2.instruments.util.date_conversion import unix_to_nt
+
+
+n_iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+n_samples = 1000
+n_transceivers = 5
+
+low_date, high_date = unix_to_nt(1500000000.0)
+
+
+def header(parser, type_, *values):
+    '''
+    header packs the common type and timestamp fields followed by values
+    '''
+    return parser.header_struct(0).pack(type_, low_date, high_date, *values)
+
+
+con_parser = parsers.SimradConfigParser()
+raw_parser = parsers.SimradRawParser()
+nme_parser = parsers.SimradNMEAParser()
+tag_parser = parsers.SimradAnnotationParser()
+bot_parser = parsers.SimradBottomParser()
+dep_parser = parsers.SimradDepthParser()
+
+#  create one datagram of each type (without the leading and trailing size)
+txcvr_size = con_parser._transducer_structs['ER60'][1].size
+datagrams = {
+    'CON0': (con_parser, header(con_parser, b'CON0', b'survey', b'transect',
+                                b'ER60', b'2.4.3', b'', n_transceivers) +
+             b'\x00' * txcvr_size * n_transceivers),
+    'RAW0': (raw_parser, header(raw_parser, b'RAW0', 1, 3, 5.0, 38000.0,
+                                1000.0, 0.001024, 2425.0, 0.000256, 1500.0,
+                                0.01, 0.0, 0.0, 0.0, 10.0, 0.0, 0, b'', 0,
+                                n_samples) +
+             np.arange(n_samples * 2, dtype='int16').tobytes()),
+    'NME0': (nme_parser, header(nme_parser, b'NME0') +
+             b'$GPGGA,000000,4800.000,N,12300.000,W,1,08,0.9,0.0,M,0.0,M,,*47\x00'),
+    'TAG0': (tag_parser, header(tag_parser, b'TAG0') + b'annotation\x00\x00'),
+    'BOT0': (bot_parser, header(bot_parser, b'BOT0', n_transceivers) +
+             struct.pack('=%dd' % n_transceivers, *range(n_transceivers))),
+    'DEP0': (dep_parser, header(dep_parser, b'DEP0', n_transceivers) +
+             struct.pack('=%df' % (3 * n_transceivers),
+                         *range(3 * n_transceivers))),
+}
+
+print('Datagram parse times (microseconds per datagram, %d iterations)' %
+      n_iterations)
+print('type    from_string    unpack_from')
+
+for type_ in sorted(datagrams.keys()):
+    parser, datagram = datagrams[type_]
+
+    #  place the datagram in a larger buffer with its size fields
+    buffer = bytearray(parser.finalize_datagram(datagram)) + bytearray(1024)
+
+    t_string = timeit.timeit(lambda: parser.from_string(datagram),
+                             number=n_iterations)
+    t_from = timeit.timeit(lambda: parser.unpack_from(buffer, 4,
+                           len(datagram)), number=n_iterations)
+
+    print('%s    %11.2f    %11.2f' % (type_, t_string / n_iterations * 1e6,
+                                      t_from / n_iterations * 1e6))
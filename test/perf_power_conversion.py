@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+This script compares the time required to convert power to Sv, sv, Sp and
+sp using the original float64 numpy expression and the in place, blocked
+conversion in echolab2.instruments.util.power_conversion with each of the
+available engines. The results of each engine are checked against the
+original expression.
+
+usage: python perf_power_conversion.py [n_pings n_samples]
+"""
+
+import sys
+import time
+import numpy as np
+from echolab2.instruments.util import power_conversion
+
+
+def reference(power, tvg, c_range, alpha, gains, linear):
+    '''
+    reference converts power the way RawData._convert_power did before
+    the conversion engines were added
+    '''
+    data = np.outer(2.0 * alpha, c_range)
+    data += power + tvg
+    data -= gains[:, np.newaxis]
+    if linear:
+        data[:] = 10**(data / 10.0)
+
+    return data
+
+
+if len(sys.argv) == 3:
+    n_pings, n_samples = int(sys.argv[1]), int(sys.argv[2])
+elif len(sys.argv) == 1:
+    n_pings, n_samples = 10000, 4000
+else:
+    print(__doc__)
+    sys.exit(1)
+
+#  create a synthetic power array and the conversion terms
+rng = np.random.RandomState(0)
+power = rng.uniform(-160, -20, (n_pings, n_samples)).astype('float32')
+thickness = 0.192
+c_range = np.arange(n_samples) * thickness - 2 * thickness
+c_range[c_range < 0] = 0
+alpha = np.full(n_pings, 0.0098, dtype='float32')
+gains = rng.uniform(-60, -50, n_pings).astype('float32')
+
+print('array size: %i x %i' % (n_pings, n_samples))
+for convert_to in ['Sv', 'sv', 'Sp', 'sp']:
+    linear = convert_to.islower()
+    tvg = c_range.copy()
+    tvg[tvg <= 0] = 1
+    if convert_to in ['Sv', 'sv']:
+        tvg = 20.0 * np.log10(tvg)
+    else:
+        tvg = 40.0 * np.log10(tvg)
+    tvg[tvg < 0] = 0
+
+    s = time.time()
+    expected = reference(power, tvg, c_range, alpha, gains, linear)
+    t_ref = time.time() - s
+
+    print(convert_to)
+    print('    reference (s): ' + str(t_ref))
+    for engine in power_conversion.available_engines():
+        data = power.copy()
+        if engine == 'numba':
+            #  compile the kernel outside of the timed call
+            power_conversion.convert_power(data[:1].copy(), tvg, c_range,
+                    alpha[:1], gains[:1], linear=linear, engine=engine)
+        s = time.time()
+        power_conversion.convert_power(data, tvg, c_range, alpha, gains,
+                                       linear=linear, engine=engine)
+        t_engine = time.time() - s
+
+        if linear:
+            error = np.max(np.abs(data - expected) / np.abs(expected))
+        else:
+            error = np.max(np.abs(data - expected))
+        print('    %-9s (s): %s  max error: %g' % (engine, t_engine, error))